@@ -0,0 +1,76 @@
+# dataset_codec.py
+"""
+壓縮資料檔的量測腳本（python -m bench.dataset_codec）：
+同一份假資料（bench/fake_data.py）分別存成未壓縮、gzip、zstd，
+以抓取腳本（pandas compression="infer"）相同的預設壓縮等級寫出（gzip 9、zstd 3），比較
+- 檔案大小，也就是從 CSV_DOWNLOAD_URL 下載時傳輸的位元組數；
+- read_store_csv() 的讀取時間（多次取最快）與 tracemalloc 量到的記憶體峰值：
+  邊解壓邊解析時，峰值不會多出一份解壓後的完整內容。
+沒有安裝 zstandard 時略過 zstd。
+"""
+# --- 套件匯入 ---
+import os
+import gzip
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+os.environ.setdefault("LINE_CHANNEL_SECRET", "bench-secret")
+os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench-token")
+
+from bench.fake_data import write_fake_dataset
+from handlers.dataset_codec import with_suffix, zstandard
+from handlers.store_records import read_store_csv
+
+def compress(plain_path: str, codec: str) -> str:
+    """把未壓縮的 CSV 另存成 codec 格式，回傳新路徑。"""
+    path = with_suffix(plain_path, codec)
+    with open(plain_path, "rb") as f:
+        data = f.read()
+    if codec == "gzip":
+        data = gzip.compress(data, compresslevel=9)
+    elif codec == "zstd":
+        data = zstandard.ZstdCompressor(level=3).compress(data)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+def measure(path: str, repeat: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        records = read_store_csv(path)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    read_store_csv(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"bytes": os.path.getsize(path), "rows": len(records), "load_ms": best * 1000, "peak_mb": peak / 1024 / 1024}
+
+def main():
+    parser = argparse.ArgumentParser(description="未壓縮、gzip、zstd 資料檔的大小與讀取時間")
+    parser.add_argument("--rows", type=int, default=10_000, help="假資料筆數")
+    parser.add_argument("--repeat", type=int, default=5, help="讀取次數（取最快的一次）")
+    args = parser.parse_args()
+
+    codecs = ["", "gzip"] + (["zstd"] if zstandard is not None else [])
+    with tempfile.TemporaryDirectory() as directory:
+        plain = write_fake_dataset(os.path.join(directory, "stores.csv"), args.rows)
+        paths = {codec: compress(plain, codec) if codec else plain for codec in codecs}
+        expected = [record.to_dict() for record in read_store_csv(plain)]
+        for path in paths.values():
+            assert [record.to_dict() for record in read_store_csv(path)] == expected, path
+
+        results = {codec: measure(path, args.repeat) for codec, path in paths.items()}
+    plain_bytes = results[""]["bytes"]
+    print(f"{args.rows:,} 筆假資料，三種格式讀出的內容相同\n")
+    print("| 格式 | 檔案大小（傳輸量） | 相對未壓縮 | 讀取時間 | 記憶體峰值 |")
+    print("| --- | --- | --- | --- | --- |")
+    for codec, r in results.items():
+        print(f"| {codec or '未壓縮'} | {r['bytes'] / 1024:,.0f} KB | {r['bytes'] / plain_bytes:.0%} "
+              f"| {r['load_ms']:.0f} ms | {r['peak_mb']:.1f} MB |")
+
+# --- 腳本啟動點 ---
+if __name__ == "__main__":
+    main()
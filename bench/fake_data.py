@@ -0,0 +1,47 @@
+# fake_data.py
+"""
+量測腳本共用的假店家資料：欄位與 fetch_data 產生的 TaichungEats_reviews.csv 相同
+（utf-8-sig、全部加引號），評論以空行分隔，混合常見短句與隨機常用字，
+壓縮率與真實評論相近（gzip 約剩 1/4）。固定亂數種子，同樣的筆數每次產生相同的內容。
+"""
+# --- 套件匯入 ---
+import csv
+import random
+
+from constants import FOOD_TYPES, REGIONS
+
+HEADER = ["place_id", "區域", "美食類型", "店名", "營業時間", "地址", "電話", "評論"]
+PHRASES = [
+    "餐點份量很足，價格也很實在", "老闆很親切，會主動介紹招牌菜", "假日人潮很多，建議提早來",
+    "湯頭清爽不油膩，麵條很有嚼勁", "環境乾淨舒適，適合家庭聚餐", "出餐速度快，中午上班族很方便",
+    "甜點是必點，口感綿密不會太甜", "停車不太方便，附近要找一下車位", "CP 值很高，會想再來第二次",
+    "調味偏重口味，配飯剛剛好", "服務人員有點忙，但態度很好", "食材新鮮，看得出用心",
+]
+# 隨機組句用的常用字
+CHARACTERS = (
+    "的一是不了人我在有他這中大來上個國到說們為子和你地出道也時年得就那要下以生會自著去之過家學對可她裡後小麼心多天而能好都然沒日於起還發成事只作當想看文無開手十用主行方又如前所本見經頭面公同三已老從動兩長"
+    "吃喝飯麵湯肉魚蝦菜雞豬牛蛋豆甜鹹辣香酥脆嫩軟熱冷味道店員老闆價格便宜貴排隊座位環境乾淨服務態度推薦再來朋友家人"
+)
+HOURS = "星期一: 11:00–20:00\n星期二: 11:00–20:00\n星期三: 休息\n星期四: 11:00–20:00\n星期五: 11:00–21:00"
+
+def fake_rows(count: int, seed: int = 0):
+    """產生 count 筆店家資料（不含標題列）；類型與區域平均分布。"""
+    rng = random.Random(seed)
+    for i in range(count):
+        reviews = [
+            "，".join(rng.sample(PHRASES, rng.randint(1, 2)) + ["".join(rng.choices(CHARACTERS, k=rng.randint(8, 40)))]) + "。"
+            for _ in range(rng.randint(1, 5))
+        ]
+        yield [
+            f"ChIJbench{i:08d}", REGIONS[i % len(REGIONS)], FOOD_TYPES[(i // len(REGIONS)) % len(FOOD_TYPES)],
+            f"測試店家{i}號", HOURS if i % 5 else "", f"台中市測試路{i}號", f"04 {2200_0000 + i}",
+            "\n\n".join(reviews),
+        ]
+
+def write_fake_dataset(path: str, count: int, seed: int = 0) -> str:
+    """寫出 count 筆假資料的 CSV，回傳 path。"""
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(HEADER)
+        writer.writerows(fake_rows(count, seed))
+    return path
@@ -0,0 +1,94 @@
+# router_dispatch.py
+"""
+handlers/router.py 路由表的量測腳本（python -m bench.router_dispatch）：
+- 先確認目前的路由表（handlers/dispatcher.py）與改用路由表之前的 if 鏈，對同一批輸入選到相同的路由。
+- 比較兩者每次比對的耗時（ns），再另外登錄 N 條 exact + suffix 路由（以及同樣數量的 pattern 路由），
+  看比對成本隨路由數的變化：exact 與 suffix 不隨數量增加；pattern 只比對 priority 在目前候選之前的幾條，
+  但沒有任何候選的輸入（例如 "hello"）會逐條比對，成本隨 pattern 數線性增加。
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import time
+import logging
+import argparse
+
+os.environ.setdefault("LINE_CHANNEL_SECRET", "bench-secret")
+os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench-token")
+
+from constants import FOOD_TYPES
+from handlers.dispatcher import router
+from handlers.router import Router
+
+logging.disable(logging.CRITICAL)
+
+# 常見輸入：選單按鈕、店家輪播、店家詳細資訊與沒有對應的文字
+TEXTS = ["美食推薦", "自助饗宴", "必吃便當-北區", "店家1號的地址", "hello"]
+# 等價性檢查另外涵蓋邊界情況
+EDGE_CASES = ["文青早點", "必吃便當-", "必吃便當-北區的地址", "美食推薦的評論", "a-b", "-北區", "自助饗宴-中區-x", "的評論", "評論"]
+
+def if_chain(text: str):
+    """改用路由表之前 dispatch_event 的判斷順序，回傳路由名稱。"""
+    category = district = None
+    if "-" in text:
+        category, district = text.split("-", 1)
+    if text.endswith("的地址") or text.endswith("的電話") or text.endswith("的評論"):
+        return "store_detail"
+    if district and category in FOOD_TYPES:
+        return "restaurant_carousel"
+    if text == "美食推薦":
+        return "menu"
+    if text in ["文青早點", "在地美食", "高檔餐廳"]:
+        return "categories"
+    if text in FOOD_TYPES:
+        return "region_selector"
+    return None
+
+def router_name(text: str):
+    matched = router.match(text)
+    return matched.route.name if matched else None
+
+def ns_per_match(match, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        for text in TEXTS:
+            match(text)
+    return (time.perf_counter() - started) / (number * len(TEXTS)) * 1e9
+
+def build_router(extra: int, patterns: bool) -> Router:
+    """與 dispatcher 相同的 5 條路由，再加上 extra 條 exact 與 suffix 路由（patterns 為 True 時再加 extra 條 pattern）。"""
+    handler = lambda *args: None
+    r = Router()
+    r.suffix(["的地址", "的電話", "的評論"], handler, "store_detail", 1)
+    r.pattern(r"(?s)(?P<category>{})-(?P<district>.+)".format("|".join(FOOD_TYPES)), handler, "restaurant_carousel", 2)
+    r.exact("美食推薦", handler, "menu", 3)
+    r.exact(["文青早點", "在地美食", "高檔餐廳"], handler, "categories", 4)
+    r.exact(FOOD_TYPES, handler, "region_selector", 5)
+    for i in range(extra):
+        r.exact(f"指令{i}", handler, f"exact{i}", 10 + i)
+        r.suffix(f"後綴{i}", handler, f"suffix{i}", 10 + i)
+        if patterns:
+            r.pattern(rf"樣式{i}-(?P<value>\d+)", handler, f"pattern{i}", 10 + extra + i)
+    return r
+
+def main():
+    parser = argparse.ArgumentParser(description="路由表與 if 鏈的比對耗時")
+    parser.add_argument("--number", type=int, default=20000, help="每個輸入重複比對的次數")
+    args = parser.parse_args()
+
+    for text in TEXTS + EDGE_CASES:
+        assert router_name(text) == if_chain(text), (text, router_name(text), if_chain(text))
+    print(f"路由表與 if 鏈對 {len(TEXTS + EDGE_CASES)} 個輸入選到相同的路由\n")
+
+    print("| 比對方式 | 路由數 | 每次比對 |")
+    print("| --- | --- | --- |")
+    print(f"| if 鏈 | 5 | {ns_per_match(if_chain, args.number):.0f} ns |")
+    print(f"| 路由表 (dispatcher) | 5 | {ns_per_match(router.match, args.number):.0f} ns |")
+    for patterns in (False, True):
+        kinds = "exact + suffix + pattern" if patterns else "exact + suffix"
+        for extra in (10, 100, 1000):
+            r = build_router(extra, patterns)
+            print(f"| 路由表 | 5 + {extra} 條 {kinds} | {ns_per_match(r.match, max(args.number // 5, 1)):.0f} ns |")
+
+# --- 腳本啟動點 ---
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# serving_memory.py
+"""
+不依賴 pandas 的店家資料路徑的量測腳本（python -m bench.serving_memory）：
+每種方式各在一個全新的子行程執行，量測匯入時間、讀取假資料（bench/fake_data.py）的時間與行程 RSS 增量：
+- pandas：import pandas，pd.read_csv() 後整理店名欄（改版前 data_loader 的做法）。
+- stdlib：import handlers.store_records，read_store_csv() 再建 StoreDataset 索引（現在的做法）。
+另外確認 import main 之後 sys.modules 裡沒有 pandas。
+"""
+# --- 套件匯入 ---
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def rss_mb() -> float:
+    """目前行程的 RSS（MB），讀 /proc/self/status（Linux）。"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+# --- 子行程：實際量測 ---
+# 兩種方式都先匯入 config（日誌與環境變數設定），只量資料路徑本身多匯入的模組
+def run_pandas(path: str) -> dict:
+    import config
+    rss_before, started = rss_mb(), time.perf_counter()
+    import pandas as pd
+    imported, rss_imported = time.perf_counter(), rss_mb()
+    df = pd.read_csv(path, encoding="utf-8", dtype={"評論": str})
+    df.columns = df.columns.str.strip()
+    df["店名"] = df["店名"].astype(str).str.strip()
+    loaded = time.perf_counter()
+    return {
+        "rows": len(df), "import_ms": (imported - started) * 1000, "load_ms": (loaded - imported) * 1000,
+        "import_mb": rss_imported - rss_before, "load_mb": rss_mb() - rss_imported,
+    }
+
+def run_stdlib(path: str) -> dict:
+    import config
+    rss_before, started = rss_mb(), time.perf_counter()
+    from handlers.data_loader import StoreDataset
+    from handlers.store_records import read_store_csv
+    imported, rss_imported = time.perf_counter(), rss_mb()
+    dataset = StoreDataset(read_store_csv(path), source="csv")
+    loaded = time.perf_counter()
+    return {
+        "rows": len(dataset.records), "import_ms": (imported - started) * 1000, "load_ms": (loaded - imported) * 1000,
+        "import_mb": rss_imported - rss_before, "load_mb": rss_mb() - rss_imported,
+    }
+
+def run_main(path: str) -> dict:
+    import main # 只檢查匯入後載入了哪些模組
+    return {"pandas_loaded": "pandas" in sys.modules}
+
+WORKERS = {"pandas": run_pandas, "stdlib": run_stdlib, "main": run_main}
+
+def in_subprocess(kind: str, path: str) -> dict:
+    env = dict(
+        os.environ, LINE_CHANNEL_SECRET="bench-secret", LINE_CHANNEL_ACCESS_TOKEN="bench-token",
+        LOG_LEVEL="WARNING", WARMUP_IN_MASTER="true", # 不啟動背景預熱，量到的只有匯入本身
+    )
+    output = subprocess.run(
+        [sys.executable, "-m", "bench.serving_memory", "--worker", kind, path],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+# --- 主流程 ---
+def main():
+    parser = argparse.ArgumentParser(description="pandas 與標準函式庫讀取店家資料的匯入時間與記憶體")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 50_000], help="假資料筆數")
+    parser.add_argument("--worker", choices=WORKERS, help=argparse.SUPPRESS) # 子行程內部使用
+    parser.add_argument("path", nargs="?", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(WORKERS[args.worker](args.path)))
+        return
+
+    from bench.fake_data import write_fake_dataset
+    print("| 筆數 | 方式 | 匯入 | 讀取 + 建索引 | RSS 增量（匯入 / 資料） |")
+    print("| --- | --- | --- | --- | --- |")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            path = write_fake_dataset(os.path.join(directory, f"stores-{rows}.csv"), rows)
+            for kind in ("pandas", "stdlib"):
+                r = in_subprocess(kind, path)
+                print(f"| {r['rows']:,} | {kind} | {r['import_ms']:.0f} ms | {r['load_ms']:.0f} ms "
+                      f"| {r['import_mb']:.1f} MB / {r['load_mb']:.1f} MB |")
+        print(f"\nimport main 之後載入了 pandas：{in_subprocess('main', path)['pandas_loaded']}")
+
+# --- 腳本啟動點 ---
+if __name__ == "__main__":
+    main()
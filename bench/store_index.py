@@ -0,0 +1,82 @@
+# store_index.py
+"""
+data_loader 索引查詢的量測腳本（python -m bench.store_index）：
+對 1k / 10k / 100k 筆假資料（bench/fake_data.py），比較
+- 改用索引之前：pandas DataFrame 每次查詢建立布林遮罩（店名 ==、美食類型 == & 區域 ==），再 iloc[0].to_dict()，
+  評論在每次組店家詳細資訊時才 split("\\n\\n")；
+- 現在：StoreDataset 載入時建好的 dict 索引（by_name / by_category），評論已切好。
+輸出建索引的時間與每次查詢的 µs。
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import logging
+import argparse
+import tempfile
+import timeit
+
+os.environ.setdefault("LINE_CHANNEL_SECRET", "bench-secret")
+os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench-token")
+
+import pandas as pd
+
+from bench.fake_data import write_fake_dataset
+from handlers import data_loader
+from handlers.store_records import read_store_csv
+
+logging.disable(logging.CRITICAL)
+
+CATEGORY, DISTRICT = "必吃便當", "北區"
+
+def best_us(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+def measure(path: str, rows: int) -> dict:
+    name = f"測試店家{rows - 1}號" # 最後一筆：布林遮罩一定要掃完整個欄位
+
+    # 改用索引之前的查詢（與原本的 data_loader / store_detail_reply 相同）
+    df = pd.read_csv(path, encoding="utf-8", dtype={"評論": str})
+    df.columns = df.columns.str.strip()
+    df["店名"] = df["店名"].astype(str).str.strip()
+    def pandas_by_name():
+        found = df[df["店名"] == name]
+        record = found.iloc[0].to_dict()
+        return str(record["評論"]).split("\n\n")
+    def pandas_by_category():
+        return df[(df["美食類型"] == CATEGORY) & (df["區域"] == DISTRICT)]
+
+    # 現在的索引
+    records = read_store_csv(path)
+    build_ms = min(timeit.repeat(lambda: data_loader.StoreDataset(records), number=1, repeat=3)) * 1000
+    data_loader._publish(data_loader.StoreDataset(records, source="csv"))
+    def index_by_name():
+        return data_loader.get_store_info_by_name(name)["評論清單"]
+    def index_by_category():
+        return data_loader.query_by_category_and_district(CATEGORY, DISTRICT)
+
+    assert pandas_by_name() == index_by_name()
+    assert list(pandas_by_category()["店名"]) == [record["店名"] for record in index_by_category()]
+    return {
+        "build_ms": build_ms,
+        "pandas_name_us": best_us(pandas_by_name, 20),
+        "index_name_us": best_us(index_by_name, 20000),
+        "pandas_category_us": best_us(pandas_by_category, 20),
+        "index_category_us": best_us(index_by_category, 20000),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="pandas 布林遮罩與 dict 索引的查詢耗時")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="假資料筆數")
+    args = parser.parse_args()
+
+    print("| 筆數 | 建索引 | 依店名 pandas | 依店名索引 | 類型 + 區域 pandas | 類型 + 區域索引 |")
+    print("| --- | --- | --- | --- | --- | --- |")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            path = write_fake_dataset(os.path.join(directory, f"stores-{rows}.csv"), rows)
+            r = measure(path, rows)
+            print(f"| {rows:,} | {r['build_ms']:.1f} ms | {r['pandas_name_us']:.0f} µs | {r['index_name_us']:.2f} µs "
+                  f"| {r['pandas_category_us']:.0f} µs | {r['index_category_us']:.2f} µs |")
+
+# --- 腳本啟動點 ---
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# throughput.py
+"""
+README「非同步入口」吞吐量表格的量測腳本（python -m bench.throughput）：
+- 在本機啟動假的 LINE Messaging API：每次 reply 等 --latency 秒（預設 0.2）才回 200，並計算收到幾則回覆。
+- 依序以子行程啟動兩個入口，LINE_API_BASE_URL 指向假 API：
+  main:app 用 gunicorn gthread（gunicorn.conf.py，1 worker × 8 threads），main_async:app 用 uvicorn（1 worker）。
+- 每個入口同時送出 --events 則（預設 200）已簽章的 webhook，每則是不同使用者的「美食推薦」，
+  量測從送出到假 API 收齊所有回覆的時間，換算成每秒回覆數。
+單核結果可用 taskset -c 0 python -m bench.throughput 重現。
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import sys
+import hmac
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import logging
+import argparse
+import subprocess
+
+import aiohttp
+from aiohttp import web
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET = "bench-secret"
+
+# 入口 → (啟動指令, 監聽埠)
+SERVERS = {
+    "main:app": ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"], 9201),
+    "main_async:app": ([sys.executable, "-m", "uvicorn", "main_async:app", "--port", "9202", "--log-level", "warning"], 9202),
+}
+
+# --- 假的 LINE Messaging API ---
+class FakeLineApi:
+    """POST /v2/bot/message/reply：等 latency 秒後回 200，記錄收到的回覆數。"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.replies = 0
+        self.url = ""
+
+    async def reply(self, request: web.Request) -> web.Response:
+        await request.read()
+        await asyncio.sleep(self.latency)
+        self.replies += 1
+        return web.json_response({"sentMessages": [{"id": str(self.replies), "quoteToken": "bench"}]})
+
+    async def start(self) -> web.AppRunner:
+        """監聽 127.0.0.1 上任一空閒埠，self.url 為實際位址。"""
+        app = web.Application()
+        app.router.add_post("/v2/bot/message/reply", self.reply)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        host, port = runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        return runner
+
+# --- webhook 產生與送出 ---
+def signed_webhook(index: int) -> tuple:
+    """回傳 (body, X-Line-Signature)；每則事件是不同使用者，不受頻率限制與去重影響。"""
+    event = {
+        "type": "message", "mode": "active", "timestamp": int(time.time() * 1000),
+        "source": {"type": "user", "userId": f"Ubench{index}"},
+        "webhookEventId": f"bench-{index}-{time.time_ns()}",
+        "deliveryContext": {"isRedelivery": False}, "replyToken": f"bench-token-{index}",
+        "message": {"type": "text", "id": str(index), "text": "美食推薦", "quoteToken": "bench"},
+    }
+    body = json.dumps({"destination": "Ubench", "events": [event]}, ensure_ascii=False).encode("utf-8")
+    signature = base64.b64encode(hmac.new(SECRET.encode(), body, hashlib.sha256).digest()).decode()
+    return body, signature
+
+async def wait_until_up(session: aiohttp.ClientSession, url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} 在 {timeout} 秒內沒有啟動")
+
+async def measure(session: aiohttp.ClientSession, api: FakeLineApi, port: int, events: int) -> dict:
+    """同時送出 events 則 webhook，等假 API 收齊回覆；回傳耗時與每秒回覆數。"""
+    url = f"http://127.0.0.1:{port}/callback"
+    api.replies = 0
+    started = time.perf_counter()
+
+    async def send(index: int) -> int:
+        body, signature = signed_webhook(index)
+        headers = {"X-Line-Signature": signature, "Content-Type": "application/json"}
+        async with session.post(url, data=body, headers=headers) as response:
+            await response.read()
+            return response.status
+
+    statuses = await asyncio.gather(*(send(i) for i in range(events)))
+    while api.replies < events and time.perf_counter() - started < 120:
+        await asyncio.sleep(0.02)
+    elapsed = time.perf_counter() - started
+    return {
+        "statuses": sorted(set(statuses)),
+        "replies": api.replies,
+        "seconds": round(elapsed, 2),
+        "replies_per_sec": round(api.replies / elapsed, 1),
+    }
+
+# --- 主流程 ---
+async def run(events: int, latency: float) -> dict:
+    api = FakeLineApi(latency)
+    runner = await api.start()
+    results = {}
+    timeout = aiohttp.ClientTimeout(total=180)
+    # 不限制同時連線數，webhook 全部同時送出；每則用新連線（與 LINE 平台投遞 webhook 相同），不佔住 worker 的 keep-alive 名額
+    connector = aiohttp.TCPConnector(limit=0, force_close=True)
+    try:
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            for name, (command, port) in SERVERS.items():
+                env = dict(
+                    os.environ,
+                    LINE_CHANNEL_SECRET=SECRET, LINE_CHANNEL_ACCESS_TOKEN="bench-token",
+                    LINE_API_BASE_URL=api.url, LOG_LEVEL="WARNING",
+                    PORT=str(port), WEB_CONCURRENCY="1", GUNICORN_WORKER_CLASS="gthread", GUNICORN_THREADS="8",
+                    # gthread worker 的連線數到達 worker_connections 後只等進行中的請求，已 accept 但還沒讀取的連線
+                    # 不會再被處理，整批 webhook 可能卡住；留足名額，量到的才是 8 個執行緒的上限
+                    GUNICORN_WORKER_CONNECTIONS=str(events + 100),
+                )
+                process = subprocess.Popen(command, cwd=ROOT, env=env)
+                try:
+                    await wait_until_up(session, f"http://127.0.0.1:{port}/")
+                    results[name] = await measure(session, api, port, events)
+                finally:
+                    process.terminate()
+                    process.wait(timeout=30)
+                logger.info("%s：%s", name, results[name])
+    finally:
+        await runner.cleanup()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="main:app 與 main_async:app 的回覆吞吐量比較")
+    parser.add_argument("--events", type=int, default=200, help="同時送出的 webhook 數")
+    parser.add_argument("--latency", type=float, default=0.2, help="假 LINE API 每次回覆的延遲秒數")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.events, args.latency))
+    print(f"\n{args.events} 則 webhook，LINE API 延遲 {args.latency * 1000:.0f} ms")
+    print("| 入口 | 耗時 | 回覆吞吐量 |")
+    print("| --- | --- | --- |")
+    for name, result in results.items():
+        print(f"| `{name}` | {result['seconds']} 秒 | 約 {result['replies_per_sec']} 則/秒 |")
+
+# --- 腳本啟動點 ---
+if __name__ == "__main__":
+    main()
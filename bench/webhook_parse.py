@@ -0,0 +1,75 @@
+# webhook_parse.py
+"""
+README「Webhook 快速解析」的量測腳本（python -m bench.webhook_parse）：
+同一份已簽章的 webhook body（文字訊息 / postback / 追蹤事件輪流），
+比較 SDK 的 WebhookParser.parse() 與 handlers/fast_webhook.py 的 FastWebhookParser.parse()，
+兩者都包含驗章；輸出平均每筆事件的解析時間（µs）。
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import logging
+import argparse
+import timeit
+
+os.environ.setdefault("LINE_CHANNEL_SECRET", "bench-secret")
+os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench-token")
+
+from linebot.v3.webhook import WebhookParser
+
+from handlers.fast_webhook import FastWebhookParser
+
+logging.disable(logging.CRITICAL) # 只看解析本身，不量日誌
+
+SECRET = "bench-secret"
+
+def _event(index: int) -> dict:
+    """依序產生文字訊息、postback、追蹤事件，欄位與 LINE 平台送來的相同。"""
+    event = {
+        "mode": "active", "timestamp": int(time.time() * 1000),
+        "source": {"type": "user", "userId": f"Ubench{index}"},
+        "webhookEventId": f"bench-{index}", "deliveryContext": {"isRedelivery": False},
+        "replyToken": f"bench-token-{index}",
+    }
+    kind = index % 3
+    if kind == 0:
+        event.update(type="message", message={"type": "text", "id": str(index), "text": "必吃便當-北區", "quoteToken": "bench"})
+    elif kind == 1:
+        event.update(type="postback", postback={"data": f"action=view_info&shop_id=bench{index}"})
+    else:
+        event.update(type="follow", follow={"isUnblocked": False})
+    return event
+
+def signed_body(events: int) -> tuple:
+    body = json.dumps({"destination": "Ubench", "events": [_event(i) for i in range(events)]}, ensure_ascii=False).encode("utf-8")
+    signature = base64.b64encode(hmac.new(SECRET.encode(), body, hashlib.sha256).digest()).decode()
+    return body, signature
+
+def measure(events: int, number: int) -> dict:
+    """回傳 SDK 與快速解析每筆事件的平均 µs。"""
+    body, signature = signed_body(events)
+    sdk, fast = WebhookParser(SECRET), FastWebhookParser(SECRET)
+    # 與 main.py 原本的路徑相同：SDK 需要先把 bytes 解碼成 str
+    sdk_us = timeit.timeit(lambda: sdk.parse(body.decode("utf-8"), signature, as_payload=True), number=number)
+    fast_us = timeit.timeit(lambda: fast.parse(body, signature), number=number)
+    scale = 1e6 / number / events
+    return {"sdk_us": round(sdk_us * scale, 1), "fast_us": round(fast_us * scale, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description="SDK WebhookParser 與 FastWebhookParser 的解析時間")
+    parser.add_argument("--number", type=int, default=2000, help="每種 body 重複解析的次數")
+    args = parser.parse_args()
+
+    print("| 每個 body 的事件數 | SDK | 快速解析 | 倍數 |")
+    print("| --- | --- | --- | --- |")
+    for events in (1, 3, 10):
+        result = measure(events, args.number)
+        print(f"| {events} | {result['sdk_us']} µs | {result['fast_us']} µs | {result['sdk_us'] / result['fast_us']:.1f}x |")
+
+# --- 腳本啟動點 ---
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,12 @@
 # 這個檔案用來存放應用程式的配置設定
 import os
 import sys
+import queue
+import atexit
+import random
 import logging
 from dotenv import load_dotenv # 透過 .env 檔案管理環境變數
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 # 當日誌檔案達到一定大小或數量時，會自動進行輪替
 
 # --- 載入 .env 檔案中的環境變數 ---
@@ -19,12 +22,141 @@ LOG_FILE = os.getenv("LOG_FILE",  "main.log")
 # 把字串轉成 logging 模組用的數字等級，找不到就退回 INFO
 LOG_LEVEL = getattr(logging, LOG_LEVEL_NAME, logging.INFO)
 
+# --- 日誌佇列、抽樣與截斷設定 ---
+# LOG_QUEUE_SIZE：請求執行緒與輸出執行緒之間的佇列上限，滿了就丟棄（不阻塞請求）
+# LOG_SAMPLE_RATES：依 logger 名稱設定 INFO 以下訊息的保留比例，例如 "main=0.1,handlers.dispatcher=0.5"
+# LOG_MAX_CHARS / LOG_MAX_CHARS_BY_LOGGER：單筆訊息最多保留的字數（0 表示不截斷），格式同上
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_MAX_CHARS = int(os.getenv("LOG_MAX_CHARS", "2000"))
+LOG_MAX_CHARS_BY_LOGGER = os.getenv("LOG_MAX_CHARS_BY_LOGGER", "")
+
+def _parse_logger_table(spec: str, cast) -> dict:
+    """把 "a=1,b.c=2" 轉成 {"a": 1, "b.c": 2}，格式錯誤的項目直接略過。"""
+    table = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if not sep:
+            continue
+        try:
+            table[name.strip()] = cast(value.strip())
+        except ValueError:
+            continue
+    return table
+
+def _lookup_by_logger(name: str, table: dict, default):
+    """依 logger 名稱由內而外找設定：handlers.dispatcher → handlers → 預設值。"""
+    while name:
+        if name in table:
+            return table[name]
+        name = name.rpartition(".")[0]
+    return table.get("root", default)
+
+class LazyLogArg:
+    """
+    延後計算的日誌參數：只有訊息真的要輸出時，才會在輸出執行緒呼叫 func()。
+    用法：logger.debug("...%s", LazyLogArg(lambda: json.dumps(data)))
+    """
+    __slots__ = ("_func",)
+
+    def __init__(self, func):
+        self._func = func
+
+    def __str__(self) -> str:
+        return str(self._func())
+
+    __repr__ = __str__
+
+class _SamplingFilter(logging.Filter):
+    """依 logger 名稱抽樣 INFO 以下的訊息；WARNING 以上一律保留。"""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self._rates = rates
+        self._cache = {} # logger 名稱 → 抽樣比例，避免每筆訊息都走一次查找
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._cache.get(record.name)
+        if rate is None:
+            rate = self._cache[record.name] = _lookup_by_logger(record.name, self._rates, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+class _TruncatingFormatter(logging.Formatter):
+    """只截斷訊息本文，時間、等級與 traceback 保持完整。"""
+
+    def __init__(self, fmt: str, default_limit: int, limits: dict):
+        super().__init__(fmt)
+        self._default_limit = default_limit
+        self._limits = limits
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        limit = _lookup_by_logger(record.name, self._limits, self._default_limit)
+        message = record.message
+        if limit and len(message) > limit:
+            record.message = f"{message[:limit]}…(已截斷 {len(message) - limit} 字)"
+        return super().formatMessage(record)
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    請求執行緒只把 LogRecord 放進佇列：
+    - 不在這裡格式化訊息（預設的 prepare() 會），參數的 str() 交給輸出執行緒。
+    - 佇列滿時丟棄並計數，絕不阻塞請求。
+    """
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NonBlockingQueueHandler.dropped += 1
+
+_log_listener = None # 目前行程的 QueueListener
+_log_listener_running = False # 只經由 _start_log_listener() / _stop_log_listener() 改變
+
+def _start_log_listener(qh: QueueHandler, handlers: list) -> None:
+    global _log_listener, _log_listener_running
+    qh.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _log_listener = QueueListener(qh.queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    _log_listener_running = True
+
+def _stop_log_listener() -> None:
+    """寫完佇列並停止 listener；已停止時不再呼叫 stop()，Python 3.11 重複 stop() 會拋出例外。"""
+    global _log_listener_running
+    if _log_listener is not None and _log_listener_running:
+        _log_listener.stop()
+        _log_listener_running = False
+
+def flush_logs() -> None:
+    """
+    把佇列中的日誌寫完再繼續（gunicorn master 在 fork 前呼叫）：
+    gevent 下 listener 是 greenlet，會跟著 fork 到子行程，沒寫完的日誌會在每個 worker 各印一次。
+    """
+    global _log_listener_running
+    if _log_listener is not None:
+        _stop_log_listener()
+        _log_listener.start()
+        _log_listener_running = True
+
+def log_stats() -> dict:
+    """日誌佇列目前長度與因佇列已滿而丟棄的筆數。"""
+    depth = _log_listener.queue.qsize() if _log_listener else 0
+    return {"queue_depth": depth, "dropped": _NonBlockingQueueHandler.dropped}
+
 # --- 建立全域 Logger 設定函式 ---
 def setup_logging() -> None:
     """
     這段將所有日誌輸出邏輯集中到一個地方：
     避免在多個檔案重複撰寫 handler 與 formatter。
     只要呼叫一次即可，全專案共享相同設定。
+
+    根日誌器只掛一個 QueueHandler，console / 檔案輸出由 QueueListener 的背景執行緒負責，
+    webhook 請求執行緒寫日誌時只做抽樣判斷與放入佇列。
     """
     root = logging.getLogger() # 為整個應用程式配置一次根日誌器，方便集中管理日誌和全域配置
     if root.handlers:       # 若已經設定過 Handler，則直接返回，避免重複設定
@@ -32,23 +164,35 @@ def setup_logging() -> None:
 
     root.setLevel(LOG_LEVEL) # 設定根日誌器的最低日誌等級
 
-    # 共用的格式：時間 - logger 名稱 - 等級 - 訊息
-    fmt = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    # 共用的格式：時間 - logger 名稱 - 等級 - 訊息（過長的訊息會被截斷）
+    fmt = _TruncatingFormatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        LOG_MAX_CHARS, _parse_logger_table(LOG_MAX_CHARS_BY_LOGGER, int)
     )
+    handlers = []
 
     # console : 適合在開發或部署到雲端查看，預設 INFO
     ch = logging.StreamHandler(sys.stdout)
     ch.setLevel(LOG_LEVEL)
     ch.setFormatter(fmt)
-    root.addHandler(ch)
+    handlers.append(ch)
 
     # rotating file：記錄更完整的 DEBUG 資訊到檔案，可追蹤歷史
     if os.getenv("ENABLE_FILE_LOG", "False").lower() == "true":
         fh = RotatingFileHandler(LOG_FILE, maxBytes=1_000_000, backupCount=3)
         fh.setLevel(logging.DEBUG)
         fh.setFormatter(fmt)
-        root.addHandler(fh)
+        handlers.append(fh)
+
+    qh = _NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    qh.addFilter(_SamplingFilter(_parse_logger_table(LOG_SAMPLE_RATES, float)))
+    root.addHandler(qh)
+    _start_log_listener(qh, handlers)
+
+    # 結束前把佇列內剩下的日誌寫完
+    atexit.register(_stop_log_listener)
+    # fork 出來的子行程（gunicorn worker）沒有父行程的輸出執行緒，要重建佇列與 listener
+    os.register_at_fork(after_in_child=lambda: _start_log_listener(qh, handlers))
 
 setup_logging() # 呼叫函式以初始化 logging
 logger = logging.getLogger(__name__) # 供其他模組引用此檔案時使用的預設 logger
@@ -63,4 +207,86 @@ if LINE_CHANNEL_SECRET is None:
     logger.error("環境變數 LINE_CHANNEL_SECRET 未設定。請確認已設定並重新啟動程式。")
 
 if LINE_CHANNEL_ACCESS_TOKEN is None:
-    logger.error("環境變數 LINE_CHANNEL_ACCESS_TOKEN 未設定。請確認已設定並重新啟動程式。")
\ No newline at end of file
+    logger.error("環境變數 LINE_CHANNEL_ACCESS_TOKEN 未設定。請確認已設定並重新啟動程式。")
+
+# --- Webhook 背景處理設定 ---
+# WEBHOOK_ASYNC=True 時，/callback 驗章後立即回 200，事件交給背景工作池處理
+WEBHOOK_ASYNC = os.getenv("WEBHOOK_ASYNC", "False").lower() == "true"
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))                       # 背景執行緒數量
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "200"))               # 佇列上限
+WEBHOOK_ENQUEUE_TIMEOUT = float(os.getenv("WEBHOOK_ENQUEUE_TIMEOUT", "0.05"))  # 佇列滿時最多等待秒數
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "10"))        # 關閉時清空佇列的秒數上限
+WEBHOOK_BATCH_WORKERS = int(os.getenv("WEBHOOK_BATCH_WORKERS", "8"))           # 同步模式下，同一批事件平行處理的執行緒數
+# WEBHOOK_FAST_PATH=True 時改用 handlers/fast_webhook.py：對原始 bytes 驗章、只解析 handler 用到的欄位
+WEBHOOK_FAST_PATH = os.getenv("WEBHOOK_FAST_PATH", "False").lower() == "true"
+
+# --- Webhook 事件去重設定 ---
+# 以 webhookEventId 判斷重送事件；EVENT_DEDUP_DB 指定 SQLite 檔案路徑時，紀錄可跨 worker 與重啟保存
+EVENT_DEDUP_TTL = float(os.getenv("EVENT_DEDUP_TTL", "600"))         # 紀錄保存秒數
+EVENT_DEDUP_MAX_ENTRIES = int(os.getenv("EVENT_DEDUP_MAX_ENTRIES", "10000")) # 記憶體層最多筆數
+EVENT_DEDUP_DB = os.getenv("EVENT_DEDUP_DB", "")
+
+# --- 每位使用者的頻率限制 (token bucket) ---
+# RATE_LIMIT_PER_SEC 設為 0 即關閉；RATE_LIMIT_MODE 為 reply（回覆提示文字）或 drop（直接丟棄）
+RATE_LIMIT_PER_SEC = float(os.getenv("RATE_LIMIT_PER_SEC", "1"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_MAX_USERS = int(os.getenv("RATE_LIMIT_MAX_USERS", "10000"))
+RATE_LIMIT_MODE = os.getenv("RATE_LIMIT_MODE", "reply").lower()
+
+# --- 回覆期限 (reply token 有效時間) ---
+# 事件發生後 REPLY_DEADLINE_SECONDS 秒內必須回覆；剩不到 REPLY_DEGRADE_MARGIN 秒時改用簡化回覆
+REPLY_DEADLINE_SECONDS = float(os.getenv("REPLY_DEADLINE_SECONDS", "25"))
+REPLY_DEGRADE_MARGIN = float(os.getenv("REPLY_DEGRADE_MARGIN", "5"))
+DEGRADED_CAROUSEL_SIZE = int(os.getenv("DEGRADED_CAROUSEL_SIZE", "3")) # 簡化後的店家輪播張數
+
+# --- 店家輪播快取 ---
+# 依 (類型, 區域, 張數, 資料版本) 快取組好的輪播；0 即關閉。組合數約為 FOOD_TYPES × REGIONS × 2
+CAROUSEL_CACHE_SIZE = int(os.getenv("CAROUSEL_CACHE_SIZE", "200"))
+
+# --- 店家資料快照 (handlers/store_snapshot.py) ---
+# 第一次從 CSV 載入後寫出，之後的啟動直接讀快照；相對路徑以專案根目錄為準，設為空字串即不使用
+STORE_SNAPSHOT_PATH = os.getenv("STORE_SNAPSHOT_PATH", "fetch_data/TaichungEats_reviews.snapshot")
+if STORE_SNAPSHOT_PATH:
+    STORE_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), STORE_SNAPSHOT_PATH)
+
+# --- 店家資料壓縮 (handlers/dataset_codec.py) ---
+# 抓取腳本輸出與 Web 行程讀取的檔名：gzip → TaichungEats_reviews.csv.gz、zstd → .csv.zst（需安裝 zstandard），留空即不壓縮；
+# 讀取時依檔頭判斷，CSV_DOWNLOAD_URL 直接提供壓縮檔也能讀
+DATASET_COMPRESSION = os.getenv("DATASET_COMPRESSION", "").strip().lower()
+
+# --- 背景重新載入店家資料 (handlers/data_reloader.py) ---
+# 每 DATA_RELOAD_INTERVAL 秒檢查本地 CSV 是否更新（0 即關閉）；有 CSV_DOWNLOAD_URL 時每 DATA_RELOAD_REMOTE_INTERVAL 秒重新下載（0 即不下載）
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", "60"))
+DATA_RELOAD_REMOTE_INTERVAL = float(os.getenv("DATA_RELOAD_REMOTE_INTERVAL", "1800"))
+# 載入失敗（下載失敗、CSV 損毀）後在背景重試：等待秒數從 DATA_LOAD_RETRY_MIN 起每次加倍，最多 DATA_LOAD_RETRY_MAX
+DATA_LOAD_RETRY_MIN = float(os.getenv("DATA_LOAD_RETRY_MIN", "5"))
+DATA_LOAD_RETRY_MAX = float(os.getenv("DATA_LOAD_RETRY_MAX", "300"))
+# 冷啟動時資料還在背景載入：需要店家資料的回覆最多等 DATA_WAIT_SECONDS 秒，仍未載入就先回覆「資料準備中」
+DATA_WAIT_SECONDS = float(os.getenv("DATA_WAIT_SECONDS", "3"))
+
+# --- 預先編譯的回覆包 ---
+# 由 python -m fetch_data.build_reply_bundle 產生（fetch_all 最後一步）；相對路徑以專案根目錄為準，設為空字串即不使用
+REPLY_BUNDLE_PATH = os.getenv("REPLY_BUNDLE_PATH", "fetch_data/reply_bundle.bin")
+if REPLY_BUNDLE_PATH:
+    REPLY_BUNDLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), REPLY_BUNDLE_PATH)
+
+# --- 預先序列化的回覆 (handlers/raw_reply.py) ---
+# 正式環境不逐節點驗證 Flex JSON；REPLY_VALIDATE=True（預設跟著 DEBUG）時才以 SDK 模型驗證
+REPLY_VALIDATE = os.getenv("REPLY_VALIDATE", os.getenv("DEBUG", "False")).lower() == "true"
+
+# --- LINE Messaging API 連線設定 ---
+# 連線池大小（keep-alive 連線數）、連線/讀取逾時秒數，以及開機時預先建立的 TLS 連線數
+LINE_API_POOL_SIZE = int(os.getenv("LINE_API_POOL_SIZE", "10"))
+LINE_API_CONNECT_TIMEOUT = float(os.getenv("LINE_API_CONNECT_TIMEOUT", "3"))
+LINE_API_READ_TIMEOUT = float(os.getenv("LINE_API_READ_TIMEOUT", "10"))
+LINE_API_WARM_CONNECTIONS = int(os.getenv("LINE_API_WARM_CONNECTIONS", "2"))
+# 空字串即 SDK 預設的 https://api.line.me；效能量測 (bench/) 時指向本機假的 Messaging API
+LINE_API_BASE_URL = os.getenv("LINE_API_BASE_URL", "")
+
+# --- 開機預熱 ---
+# gunicorn.conf.py 會設為 True：由 master 在 fork 前預熱，main.py 就不再另起背景預熱
+WARMUP_IN_MASTER = os.getenv("WARMUP_IN_MASTER", "False").lower() == "true"
+
+# --- 非同步入口 (main_async.py) 設定 ---
+# aiohttp 連線池上限 = 同時進行中的 reply 呼叫數；SDK 預設為 CPU 數 × 5，單核機器只有 5
+ASYNC_API_MAX_CONNECTIONS = int(os.getenv("ASYNC_API_MAX_CONNECTIONS", "100"))
@@ -0,0 +1,128 @@
+# build_reply_bundle.py
+"""
+建立預先編譯的回覆包（fetch_all.py 的最後一步，也可單獨執行 python -m fetch_data.build_reply_bundle）：
+- 依序模擬每個按鈕會送出的文字與 postback，呼叫與線上相同的 dispatch_event / handle_postback_event，
+  錄下實際的回覆內容，寫成 handlers/reply_bundle.py 的檔案格式。
+- 涵蓋：主選單、3 個風格選單、各料理類型的區域輪播、每組「類型-區域」的店家輪播，
+  以及每家店的詳細資訊（「店名的地址/電話/評論」文字指令與輪播按鈕的 postback）。
+- postback data 直接從組好的輪播按鈕取出，與線上送出的按鈕完全一致。
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import json
+import time
+import logging
+from types import SimpleNamespace
+from typing import Dict, Iterator, Optional
+
+from linebot.v3.webhooks.models import TextMessageContent
+
+from config import REPLY_BUNDLE_PATH
+from constants import FOOD_TYPES, REGIONS
+from handlers import reply_bundle
+from handlers.category_reply import CATEGORY_MENUS
+from handlers.data_loader import all_store_names, dataset_digest
+from handlers.dispatcher import dispatch_event
+from handlers.postback_handler import handle_postback_event
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+REPLY_TOKEN = "reply-bundle"
+
+# --- 錄下回覆的 messaging_api 替身 ---
+class _RecordingApi:
+    """
+    只接受 reply_raw() 產生的回覆；走到 reply_message() 代表是錯誤處理路徑（例如例外時的提示文字），
+    這類回覆不放進回覆包，留給線上即時處理。
+    """
+
+    def __init__(self):
+        self.messages_json: Optional[bytes] = None
+        self.fallback = False
+
+    def reply_raw(self, body: bytes):
+        messages = json.loads(body)["messages"]
+        self.messages_json = json.dumps(messages, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def reply_message(self, reply_message_request, *args, **kwargs):
+        self.fallback = True
+
+def _source() -> SimpleNamespace:
+    return SimpleNamespace(type="user", user_id="reply-bundle-builder")
+
+def _record_text(text: str) -> Optional[bytes]:
+    api = _RecordingApi()
+    event = SimpleNamespace(
+        message=TextMessageContent.construct(type="text", text=text),
+        reply_token=REPLY_TOKEN, timestamp=None, source=_source()
+    )
+    dispatch_event(event, api)
+    return None if api.fallback else api.messages_json
+
+def _record_postback(data: str) -> Optional[bytes]:
+    api = _RecordingApi()
+    event = SimpleNamespace(
+        postback=SimpleNamespace(data=data, params=None),
+        reply_token=REPLY_TOKEN, timestamp=None, source=_source()
+    )
+    handle_postback_event(event, api)
+    return None if api.fallback else api.messages_json
+
+def _postback_data(messages_json: bytes) -> Iterator[str]:
+    """取出訊息中所有 postback 按鈕的 data。"""
+    def walk(node):
+        if isinstance(node, dict):
+            if node.get("type") == "postback" and "data" in node:
+                yield node["data"]
+            for value in node.values():
+                yield from walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                yield from walk(item)
+    yield from walk(json.loads(messages_json))
+
+# --- 主流程 ---
+def build() -> Dict[str, bytes]:
+    """回傳 {key: messages JSON bytes}；key 為觸發文字，或 POSTBACK_PREFIX + postback data。"""
+    texts = ["美食推薦", *CATEGORY_MENUS, *FOOD_TYPES]
+    texts += [f"{food_type}-{region}" for food_type in FOOD_TYPES for region in REGIONS]
+    for name in all_store_names():
+        texts += [f"{name}的地址", f"{name}的電話", f"{name}的評論"]
+
+    entries: Dict[str, bytes] = {}
+    postbacks = []
+    for text in texts:
+        payload = _record_text(text)
+        if payload is None:
+            logger.warning("「%s」沒有產生可預先編譯的回覆，略過", text)
+            continue
+        entries[text] = payload
+        postbacks.extend(_postback_data(payload))
+
+    for data in dict.fromkeys(postbacks):
+        payload = _record_postback(data)
+        if payload is None:
+            logger.warning("postback「%s」沒有產生可預先編譯的回覆，略過", data)
+            continue
+        entries[reply_bundle.POSTBACK_PREFIX + data] = payload
+    return entries
+
+def main():
+    if not REPLY_BUNDLE_PATH:
+        logger.error("REPLY_BUNDLE_PATH 為空，不建立回覆包")
+        return
+    reply_bundle.disable() # 建檔時一律即時產生回覆，不能讀到舊的回覆包
+
+    started = time.perf_counter()
+    entries = build()
+    payloads = reply_bundle.write_bundle(REPLY_BUNDLE_PATH, entries, dataset_digest())
+    logger.info(
+        "✅ 回覆包已寫入 %s：%d 個 key / %d 則不重複回覆，%.1f KB，耗時 %.1f 秒",
+        REPLY_BUNDLE_PATH, len(entries), payloads,
+        os.path.getsize(REPLY_BUNDLE_PATH) / 1024, time.perf_counter() - started
+    )
+
+# --- 腳本啟動點 ---
+if __name__ == "__main__":
+    main()
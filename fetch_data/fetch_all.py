@@ -1,6 +1,6 @@
 # fetch_all.py
 """
-一鍵執行店家抓取 + 評論抓取。
+一鍵執行店家抓取 + 評論抓取，最後重建回覆包。
 兩支腳本若執行失敗，會立刻停止並印出錯誤訊息。
 """
 # --- 套件與 Logger 初始化 ---
@@ -28,14 +28,17 @@ def run_module(module_name: str):
 # --- 主流程 ---
 def main():
     """
-    一鍵執行兩個模組：
-    1. main_fetch_stores.py：先抓取所有店家資訊，輸出 TaichungEats.csv。
+    一鍵執行三個模組：
+    1. main_fetch_stores.py：先抓取所有店家資訊，輸出 TaichungEats.csv（DATASET_COMPRESSION 設定時為 .csv.gz / .csv.zst）。
     2. main_fetch_reviews.py：再對每間店查評論，輸出 TaichungEats_reviews.csv。
+    3. build_reply_bundle.py：依最新的 TaichungEats_reviews.csv 預先組好所有按鈕的回覆，輸出 reply_bundle.bin；
+       載入資料時也會順帶寫出店家資料快照 (TaichungEats_reviews.snapshot)。
 
     資料有相依性：評論查詢要靠前一步產出的 place_id，要有明確的執行順序，並確保每步都成功才繼續下一步。
     """
     run_module("fetch_data.main_fetch_stores")
     run_module("fetch_data.main_fetch_reviews")
+    run_module("fetch_data.build_reply_bundle")
 
 # --- 腳本啟動點 ---
 if __name__ == "__main__":
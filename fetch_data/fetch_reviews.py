@@ -12,6 +12,7 @@ import logging
 import requests
 from pathlib import Path
 from dotenv import load_dotenv
+from handlers.dataset_codec import with_suffix
 
 # --- Logger 初始化 ---
 logging.basicConfig(
@@ -24,11 +25,13 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
 TRANSLATE_KEY = os.getenv("GOOGLE_TRANSLATE_KEY")
+DATASET_COMPRESSION = os.getenv("DATASET_COMPRESSION", "").strip().lower() # gzip / zstd / 留空
 
 # --- 檔案路徑與參數 ---
 BASE_DIR   = Path(__file__).resolve().parent
-input_csv  = BASE_DIR / "TaichungEats.csv"
-output_csv = BASE_DIR / "TaichungEats_reviews.csv"
+# 設定 DATASET_COMPRESSION 時輸入／輸出都是壓縮檔（.csv.gz / .csv.zst），pandas 依副檔名自動壓縮、解壓
+input_csv  = with_suffix(str(BASE_DIR / "TaichungEats.csv"), DATASET_COMPRESSION)
+output_csv = with_suffix(str(BASE_DIR / "TaichungEats_reviews.csv"), DATASET_COMPRESSION)
 max_rev    = 3            # 每間店最多抓幾則評論
 SAVE_FULL_REVIEWS = False # 若為 True，會另存原文+翻譯完整評論檔案
 
@@ -74,7 +77,8 @@ def search_place_id(query: str) -> str | None:
 
     resp  = requests.post(url, headers=headers, json=payload, timeout=10)
     data  = resp.json()
-    logger.debug(json.dumps(data, indent=2, ensure_ascii=False)) # 印出 API 回傳內容以利除錯
+    if logger.isEnabledFor(logging.DEBUG): # 只有開啟 DEBUG 時才花時間排版 JSON
+        logger.debug(json.dumps(data, indent=2, ensure_ascii=False)) # 印出 API 回傳內容以利除錯
 
     if data.get("places"):
         place_id = data["places"][0]["id"]
@@ -102,7 +106,8 @@ def get_reviews(place_id: str) -> dict | None:
     
         if isinstance(det, dict):
             logger.info(f"✅ 成功取得詳細資料")
-            logger.debug(json.dumps(det, indent=2, ensure_ascii=False))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(json.dumps(det, indent=2, ensure_ascii=False))
             return det
         else:
             logger.warning(f"❌ 回傳不是 dict，而是 {type(det)}")
@@ -12,6 +12,7 @@ import pandas as pd
 from pathlib import Path
 from dotenv import load_dotenv
 from constants import FOOD_TYPES, REGIONS, AREA_COORDS
+from handlers.dataset_codec import with_suffix
 from .api_quota_utils import request_with_quota_check
 
 # --- Logger 初始化 ---
@@ -21,9 +22,11 @@ logger = logging.getLogger(__name__)
 # --- 載入 .env 環境變數 ---
 load_dotenv()  # 讀取 .env
 API_KEY = os.getenv("GOOGLE_API_KEY")
+DATASET_COMPRESSION = os.getenv("DATASET_COMPRESSION", "").strip().lower() # gzip / zstd / 留空
 
 # --- 設定最終輸出的 CSV 路徑 ---
-CSV_PATH = Path(__file__).resolve().parent / "TaichungEats.csv"
+# DATASET_COMPRESSION=gzip / zstd 時輸出 .csv.gz / .csv.zst，pandas 依副檔名自動壓縮
+CSV_PATH = with_suffix(str(Path(__file__).resolve().parent / "TaichungEats.csv"), DATASET_COMPRESSION)
 
 # --- 搜尋店家列表（TextSearch） ---
 def search_places(food_type, location, max_results=3):
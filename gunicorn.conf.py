@@ -0,0 +1,58 @@
+# gunicorn.conf.py
+# gunicorn 設定：預載模式 (preload_app)、gthread / gevent worker
+# master 先載入 main:app、讀好店家 CSV、組好靜態 Flex 回覆，再 fork 出 worker。
+# 搭配 gc.freeze()，這些物件在 worker 之間以 copy-on-write 共用，不必每個 worker 各讀一次。
+# 啟動方式：gunicorn -c gunicorn.conf.py main:app
+import os
+import gc
+
+# --- 基本設定 ---
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"  # Render 會給 PORT
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+
+# --- worker 類型 ---
+# 預設 gthread：每個 worker GUNICORN_THREADS 條執行緒，等待 LINE API 回應時其他請求照常處理。
+# 設為 gevent（需另外 pip install gevent）時，每個 worker 以 greenlet 處理最多 GUNICORN_WORKER_CONNECTIONS 個連線。
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "100"))
+if worker_class == "gevent":
+    # 預載模式下 app 在 master 就已 import：必須在那之前 monkey patch，
+    # 模組層級建立的 threading.Lock 等才會是 greenlet 版本，否則 greenlet 之間互等會卡住整個 worker
+    from gevent import monkey
+    monkey.patch_all()
+
+# --- 預載模式 ---
+preload_app = True
+# 告訴 main.py：預熱交給 master 的 when_ready，worker 不用再各自預熱
+os.environ["WARMUP_IN_MASTER"] = "True"
+
+def when_ready(server):
+    """app 已在 master 載入、worker 尚未 fork：預熱後凍結 GC。"""
+    from handlers.warmup import warm_up
+    warm_up()
+    # gc.freeze() 把目前所有物件移出 GC 追蹤範圍，worker 做 GC 時不會寫入這些分頁而觸發複製
+    gc.collect()
+    gc.freeze()
+    server.log.info("預熱完成，已凍結 %d 個物件，開始 fork worker", gc.get_freeze_count())
+
+def pre_fork(server, worker):
+    """fork 前把 master 佇列中的日誌寫完，worker 才不會重複輸出（gevent 下尤其會發生）。"""
+    from config import flush_logs
+    flush_logs()
+
+def post_fork(server, worker):
+    """每個 worker 各自建立到 LINE API 的 TLS 連線，並啟動背景重新載入店家資料（執行緒不會跟著 fork）。"""
+    from config import LINE_API_WARM_CONNECTIONS, DATA_RELOAD_INTERVAL, DATA_RELOAD_REMOTE_INTERVAL
+    from main import messaging_api
+    from handlers.data_reloader import start_reloader
+    messaging_api.warm_up(LINE_API_WARM_CONNECTIONS)
+    start_reloader(DATA_RELOAD_INTERVAL, DATA_RELOAD_REMOTE_INTERVAL)
+
+def worker_exit(server, worker):
+    """worker 結束前清空背景 webhook 佇列（WEBHOOK_ASYNC=True 時）。"""
+    from config import WEBHOOK_ASYNC, WEBHOOK_DRAIN_TIMEOUT
+    if WEBHOOK_ASYNC:
+        from main import event_pool
+        event_pool.shutdown(WEBHOOK_DRAIN_TIMEOUT)
@@ -0,0 +1,86 @@
+# cold_start.py
+"""
+冷啟動時的回覆策略與量測：
+- 主選單、風格選單、區域選擇與歡迎訊息（第一～三層）不需要店家資料，資料還在背景載入時照常立即回覆。
+- 需要店家資料的回覆（店家輪播、店家詳細資訊、postback）先呼叫 ensure_data()：
+  最多等 DATA_WAIT_SECONDS 秒，仍未載入就回覆一則「資料準備中」，不讓 reply token 耗在等待上。
+- record_first_reply() 記下行程啟動到第一則 static / data 回覆的時間，
+  輸出到 linebot_first_reply_seconds{kind} 與 /stats 的 cold_start。
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import time
+import logging
+import threading
+from typing import Dict
+
+from config import DATA_WAIT_SECONDS
+from handlers.data_loader import wait_for_data
+from handlers.metrics import FIRST_REPLY_SECONDS
+from handlers.raw_reply import send_reply, text_message
+
+logger = logging.getLogger(__name__)
+
+STATIC = "static"
+DATA = "data"
+WARMING_UP_TEXT = "資料準備中，請稍候幾秒再試一次🙏"
+
+_booted_at = time.monotonic()
+_first_reply: Dict[str, float] = {} # kind → 啟動後幾秒送出第一則回覆
+_stats = {"data_waits": 0, "warming_replies": 0, "max_wait_ms": 0.0}
+_lock = threading.Lock()
+
+def _reset_after_fork() -> None:
+    """gunicorn 預載模式：master import 本模組，worker 的啟動時間從 fork 起算。"""
+    global _booted_at
+    _booted_at = time.monotonic()
+    _first_reply.clear()
+    _stats.update(data_waits=0, warming_replies=0, max_wait_ms=0.0)
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+# --- 資料相依的回覆 ---
+def ensure_data(messaging_api, reply_token: str) -> bool:
+    """
+    店家資料已載入回傳 True；否則限時等待背景載入。
+    逾時仍未載入時回覆「資料準備中」並回傳 False，呼叫端直接結束。
+    """
+    started = time.perf_counter()
+    if wait_for_data(DATA_WAIT_SECONDS):
+        waited_ms = (time.perf_counter() - started) * 1000
+        if waited_ms >= 1: # 資料早已載入時不計
+            with _lock:
+                _stats["data_waits"] += 1
+                _stats["max_wait_ms"] = max(_stats["max_wait_ms"], round(waited_ms, 1))
+        return True
+
+    with _lock:
+        _stats["warming_replies"] += 1
+    logger.warning("店家資料 %.1f 秒內未載入完成，先回覆資料準備中", DATA_WAIT_SECONDS)
+    send_reply(messaging_api, reply_token, [text_message(WARMING_UP_TEXT)])
+    return False
+
+# --- 第一則回覆的時間 ---
+def record_first_reply(kind: str) -> None:
+    """kind 為 STATIC / DATA；每種只記第一次，之後只是一次 dict 查詢。"""
+    if kind in _first_reply:
+        return
+    with _lock:
+        if kind in _first_reply:
+            return
+        elapsed = time.monotonic() - _booted_at
+        _first_reply[kind] = elapsed
+    FIRST_REPLY_SECONDS.observe(elapsed, kind)
+    logger.info("啟動後 %.2f 秒送出第一則 %s 回覆", elapsed, kind)
+
+def first_reply_pending() -> bool:
+    """static 與 data 的第一則回覆是否還沒都記到。"""
+    return len(_first_reply) < 2
+
+def stats() -> dict:
+    """/stats 用：各類第一則回覆距啟動的毫秒數，以及等待資料、回覆資料準備中的次數。"""
+    result = dict(_stats)
+    for kind in (STATIC, DATA):
+        elapsed = _first_reply.get(kind)
+        result[f"first_{kind}_reply_ms"] = round(elapsed * 1000, 1) if elapsed is not None else None
+    return result
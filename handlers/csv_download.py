@@ -0,0 +1,118 @@
+# csv_download.py
+"""
+店家 CSV 的下載工具（data_loader.download_csv() 使用）：
+- 以 stream=True 分塊寫入同目錄的暫存檔，不把整個回應放進記憶體。
+- 寫完後檢查大小（Content-Length）與 SHA-256（有指定時），fsync 後以 os.replace() 一次換上；
+  中途斷線或行程當掉只會留下暫存檔，原本的 CSV 保持完整。
+- 把伺服器給的 ETag / Last-Modified 記在旁邊的 .download.json，下次帶 If-None-Match / If-Modified-Since，
+  資料沒變時只收到 304，不必重新傳輸。
+"""
+# --- 套件匯入 ---
+import os
+import json
+import hashlib
+import tempfile
+from typing import Dict, Optional
+
+import requests
+
+CHUNK_SIZE = 1 << 16 # 每次寫入 64 KB
+
+class DownloadError(Exception):
+    """下載內容不完整或校驗失敗；本地檔案維持原樣。"""
+
+def _meta_path(path: str) -> str:
+    return f"{path}.download.json"
+
+def _read_meta(path: str) -> Dict[str, str]:
+    """上次下載記下的 ETag / Last-Modified；本地檔案不在或紀錄壞掉時為空。"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(_meta_path(path), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+def _write_meta(path: str, meta: Dict[str, str]) -> None:
+    """與 CSV 相同先寫暫存檔再 os.replace()，其他 worker 不會讀到寫了一半的紀錄。"""
+    meta_path = _meta_path(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(meta_path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(meta_path) or ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def conditional_headers(path: str) -> Dict[str, str]:
+    """依上次下載的紀錄組出 If-None-Match / If-Modified-Since。"""
+    meta = _read_meta(path)
+    if not meta or meta.get("size") != os.path.getsize(path):
+        return {} # 沒有紀錄，或本地檔案已被換掉（例如手動複製）：完整下載
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+def download_file(url: str, path: str, headers: Optional[Dict[str, str]] = None,
+                  expected_sha256: str = "", timeout: float = 30) -> bool:
+    """
+    下載 url 到 path；回傳 True 表示換上了新檔案，False 表示伺服器回 304（本地檔案已是最新）。
+    HTTP 錯誤拋出 requests 的例外，大小或 SHA-256 不符時拋出 DownloadError。
+    """
+    request_headers = dict(headers or {})
+    request_headers.update(conditional_headers(path))
+    with requests.get(url, headers=request_headers, timeout=timeout, stream=True) as response:
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # 暫存檔放在同一個目錄，os.replace() 才會是同一檔案系統內的原子改名；多個 worker 同時下載也不會互相覆蓋
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".part", dir=directory)
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # 有 Content-Encoding 時 Content-Length 是壓縮後的大小，無法與解壓後的位元組數比較
+            expected_size = response.headers.get("Content-Length")
+            if expected_size is not None and not response.headers.get("Content-Encoding"):
+                if size != int(expected_size):
+                    raise DownloadError(f"下載不完整：收到 {size} bytes，預期 {expected_size} bytes")
+            if size == 0:
+                raise DownloadError("下載的檔案是空的")
+            if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+                raise DownloadError(f"SHA-256 不符：{digest.hexdigest()}，預期 {expected_sha256}")
+
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    _write_meta(path, {
+        "etag": response.headers.get("ETag", ""),
+        "last_modified": response.headers.get("Last-Modified", ""),
+        "sha256": digest.hexdigest(),
+        "size": size,
+    })
+    return True
@@ -1,19 +1,39 @@
 # data_loader.py
 """
 集中管理美食店家資料的載入與查詢工具：
-- 讀取專案根目錄下的 TaichungEats_reviews.csv（一次）並快取。
-- 依店名、類型+區域條件查詢。
-- 部署於雲端時，若本地無 CSV，從雲端下載並存檔。
+- 讀取專案根目錄下的 TaichungEats_reviews.csv（一次）並快取；以標準函式庫讀成 StoreRecord
+  (handlers/store_records.py)，Web 行程不必載入 pandas。
+- 載入時一次建好索引：店名 → 資料、店家 ID（place_id）→ 資料、(美食類型, 區域) → 依 CSV 順序的資料清單，
+  查詢都是 dict 查表，不必逐筆比對。
+- 評論在載入時就切成清單（REVIEWS_KEY），回覆時不必每次 split。
+- 第一次從 CSV 載入後寫出二進位快照 (handlers/store_snapshot.py)，之後的冷啟動直接讀快照；
+  CSV 已更新或快照損毀時自動改讀 CSV。
+- 部署於雲端時，若本地無 CSV 也沒有快照，從雲端下載並存檔（串流寫入暫存檔、校驗後原子換上；
+  以 ETag / Last-Modified 條件請求，資料沒變時只收到 304）。
+- 第一次載入是 single-flight；start_background_load() / wait_for_data() 讓請求端在冷啟動時於背景載入、限時等待
+  （handlers/cold_start.py），不必卡在整個 CSV 解析上。
+- 資料與索引包成一個 StoreDataset，查詢只讀一次目前的參考；reload_store_data() 在背景建好新的資料集後
+  一次換上（單一參考指定），進行中的查詢仍用舊資料集，不會看到新舊混雜的結果。
 - 從環境變數讀取 CSV 直連下載 URL 與存取 Token（如果有）。
 """
 # --- 套件匯入 & Logger ---
-# 只需要 os 處理路徑、logging 便於偵錯及 pandas 讀取 CSV
+# 只需要 os 處理路徑、logging 便於偵錯；CSV 以標準函式庫 csv 讀取
 import os
+import gc
+import time
 import logging
-import requests
-import pandas as pd
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
 from dotenv import load_dotenv
 
+from handlers.metrics import DATA_QUERY_SECONDS, DATA_RELOAD_SECONDS
+from config import STORE_SNAPSHOT_PATH, DATASET_COMPRESSION, DATA_LOAD_RETRY_MIN, DATA_LOAD_RETRY_MAX
+from handlers.store_records import StoreRecord, REVIEWS_KEY, read_store_csv
+from handlers.store_snapshot import file_digest, read_snapshot, write_snapshot
+from handlers.csv_download import download_file
+from handlers.dataset_codec import with_suffix, detect_codec
+
 logger = logging.getLogger(__name__)
 
 # --- 載入 .env 檔案中的環境變數 ---
@@ -23,19 +43,109 @@ load_dotenv()
 # --- 本地 CSV 檔案路徑 ---
 # 動態獲取專案根目錄的路徑
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
-# 指向特定 CSV 檔案的完整絕對路徑
-CSV_FILE_PATH = os.path.join(PROJECT_ROOT, '..', 'fetch_data', 'TaichungEats_reviews.csv')
+# 指向特定 CSV 檔案的完整絕對路徑；DATASET_COMPRESSION=gzip / zstd 時為 .csv.gz / .csv.zst
+CSV_FILE_PATH = with_suffix(os.path.join(PROJECT_ROOT, '..', 'fetch_data', 'TaichungEats_reviews.csv'), DATASET_COMPRESSION)
 
 # 環境變數讀取
 CSV_DOWNLOAD_URL = os.getenv("CSV_DOWNLOAD_URL", "")
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", None)  # 如果沒有 Token 可設為 None
+CSV_DOWNLOAD_SHA256 = os.getenv("CSV_DOWNLOAD_SHA256", "")  # 選填：下載內容必須符合的 SHA-256
+
+# --- 資料集：資料與索引一起換上 ---
+class StoreDataset:
+    """一次載入的店家資料與索引（唯讀）；值都是同一批 StoreRecord。"""
+    __slots__ = ("records", "by_id", "by_name", "by_category", "digest", "source", "file_stat", "version", "loaded_at")
+
+    def __init__(self, records: List[StoreRecord], digest: str = "", source: str = "empty", file_stat=None):
+        self.records = records
+        self.by_id = {}       # 店家 ID → 資料，postback 按鈕用
+        self.by_name = {}     # 店名 → 資料（同名只取第一筆）
+        self.by_category = {} # (美食類型, 區域) → [資料, ...]（依 CSV 順序）
+        self.digest = digest  # 來源 CSV 的 SHA-256（回覆包、快照以此判斷是否為同一份資料）
+        self.source = source  # csv / snapshot / empty
+        self.file_stat = file_stat # 載入時 CSV 的 (mtime_ns, size)，背景檢查是否有新檔
+        self.version = 0      # 換上時由 _publish() 指定
+        self.loaded_at = time.time()
+        if records and "店名" in records[0]:
+            has_category = "美食類型" in records[0] and "區域" in records[0]
+            if not has_category:
+                logger.error("CSV 缺少必要欄位（美食類型 或 區域）")
+            for record in records:
+                self.by_id.setdefault(store_id(record), record) # 同 ID 只取第一筆，與依店名查詢一致
+                self.by_name.setdefault(record["店名"], record)
+                if has_category:
+                    self.by_category.setdefault((record["美食類型"], record["區域"]), []).append(record)
+
+# 目前的資料集；None 代表尚未載入。查詢端不加鎖，只讀這一個參考
+_dataset: Optional[StoreDataset] = None
+# 資料版本：每次（重新）載入 +1，依資料產生的快取以此判斷是否失效
+_data_version = 0
+_publish_lock = threading.Lock()
+_reload_lock = threading.Lock()
+# 第一次載入（與失敗後的重試）同時只有一個執行緒在跑，其他執行緒等它完成後直接用結果
+_load_lock = threading.Lock()
+# 第一次換上資料集（含載入失敗的空資料）後 set；wait_for_data() 以此限時等待
+_loaded = threading.Event()
+# 載入失敗後下一次重試的時間 (time.monotonic()) 與目前的退避秒數
+_retry_at = 0.0
+_retry_delay = 0.0
+_reload_stats = {
+    "reloads": 0, "unchanged": 0, "failures": 0, "last_duration_ms": 0.0, "last_checked_at": None,
+    "downloads": 0, "downloaded_bytes": 0, "not_modified": 0, "download_failures": 0,
+    "loads": 0, "load_waits": 0, "load_failures": 0, "load_retries": 0,
+}
+
+def _publish(dataset: StoreDataset, only_if_unloaded: bool = False) -> None:
+    """
+    索引都建好才換上；單一參考的指定是原子的，查詢不會看到新舊混雜的資料。
+    only_if_unloaded=True（載入失敗的空資料）時，只在還沒有任何資料集時換上，不會蓋掉別的執行緒剛換上的資料。
+    """
+    global _dataset, _data_version
+    with _publish_lock:
+        if only_if_unloaded and _dataset is not None:
+            return
+        _data_version += 1
+        dataset.version = _data_version
+        _dataset = dataset
+    _loaded.set()
+
+def _describe_file() -> str:
+    """記錄用：本地 CSV 的壓縮方式與檔案大小，例如「gzip，812.3 KB」。"""
+    return f"{detect_codec(CSV_FILE_PATH) or '未壓縮'}，{os.path.getsize(CSV_FILE_PATH) / 1024:.1f} KB"
 
-# --- 資料快取變數 ---
-# 全局變數用於存儲數據，避免每次查詢都重新讀取
-_store_data = None
+def csv_file_stat():
+    """本地 CSV 的 (mtime_ns, size)；檔案不存在時為 None。"""
+    try:
+        st = os.stat(CSV_FILE_PATH)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def store_id(record) -> str:
+    """
+    店家的穩定 ID：有 place_id 就用 place_id（不隨店名或資料順序改變），否則退回店名。
+    record 為 StoreRecord 或 dict。
+    """
+    place_id = record.get("place_id")
+    if isinstance(place_id, str) and place_id.strip():
+        return place_id.strip()
+    return str(record["店名"])
+
+def dataset_digest() -> str:
+    """目前資料來源 CSV 的 SHA-256；沒有資料時為空字串。"""
+    dataset = _dataset
+    return dataset.digest if dataset is not None else ""
+
+def data_version() -> int:
+    """目前店家資料的版本號；尚未載入時為 0。"""
+    dataset = _dataset
+    return dataset.version if dataset is not None else 0
 
 def download_csv():
-    """從雲端 URL 下載 CSV 並寫入本地。"""
+    """
+    從雲端 URL 下載 CSV 並寫入本地（見 handlers/csv_download.py）：分塊寫入暫存檔、檢查大小與 SHA-256 後才換上；
+    帶上次的 ETag / Last-Modified，資料沒變時伺服器回 304，本地檔案不動。回傳本地是否有可用的最新 CSV。
+    """
     if not CSV_DOWNLOAD_URL:
         logger.error("未設定環境變數 CSV_DOWNLOAD_URL，無法下載 CSV")
         return False
@@ -46,87 +156,261 @@ def download_csv():
 
     try:
         logger.info(f"從雲端下載 CSV：{CSV_DOWNLOAD_URL}")
-        response = requests.get(CSV_DOWNLOAD_URL, headers=headers, timeout=30)
-        response.raise_for_status()
-        os.makedirs(os.path.dirname(CSV_FILE_PATH), exist_ok=True)
-        with open(CSV_FILE_PATH, 'wb') as f:
-            f.write(response.content)
-        logger.info(f"CSV 成功下載並存到本地：{CSV_FILE_PATH}")
+        started = time.perf_counter()
+        if not download_file(CSV_DOWNLOAD_URL, CSV_FILE_PATH, headers, CSV_DOWNLOAD_SHA256):
+            _reload_stats["not_modified"] += 1
+            logger.info("雲端 CSV 沒有更新 (304)，沿用本地檔案")
+            return True
+        _reload_stats["downloads"] += 1
+        _reload_stats["downloaded_bytes"] += os.path.getsize(CSV_FILE_PATH)
+        logger.info(f"CSV 成功下載並存到本地：{CSV_FILE_PATH}（{_describe_file()}，{(time.perf_counter() - started) * 1000:.0f} ms）")
         return True
     except Exception as e:
-        logger.error(f"下載 CSV 失敗：{e}")
+        _reload_stats["download_failures"] += 1
+        logger.error(f"下載 CSV 失敗（本地檔案維持原樣）：{e}")
         return False
 
 # --- 載入 CSV：load_store_data() ---
-# 確保只讀取一次並且處理欄位清理/型別轉換
+# 確保只讀取一次並且處理欄位清理/型別轉換；有未過期的快照時直接讀快照
 def load_store_data():
-    global _store_data
-    if _store_data is not None:
+    """
+    第一次呼叫時載入資料；gthread / gevent worker 同時進來的請求只會有一個真正讀檔，其餘等它完成（single-flight）。
+    載入失敗時先換上空資料（回覆退回「找不到」等訊息），並依退避時間在背景重試，不會一直停在空資料。
+    """
+    dataset = _dataset
+    if dataset is not None:
+        if dataset.source == "empty" and time.monotonic() >= _retry_at:
+            _start_retry()
         return
+
+    with _load_lock:
+        if _dataset is not None: # 別的執行緒已經載入完成
+            _reload_stats["load_waits"] += 1
+            return
+        _load()
+
+def start_background_load() -> None:
+    """在背景執行緒開始載入；已載入或已有執行緒在載入時不做事。"""
+    if _dataset is not None or _load_lock.locked():
+        return
+    threading.Thread(target=load_store_data, name="store-data-load", daemon=True).start()
+
+def wait_for_data(timeout: float) -> bool:
+    """
+    資料已載入就立即回傳 True；否則確保背景正在載入，最多等 timeout 秒，回傳是否已載入。
+    請求端用這個取代 load_store_data()，冷啟動時不會被整個 CSV 解析卡住。
+    """
+    if _dataset is not None:
+        return True
+    start_background_load()
+    return _loaded.wait(timeout)
+
+def _load() -> bool:
+    """實際的載入流程（呼叫端持有 _load_lock）；成功回傳 True，失敗時換上空資料並排定重試。"""
+    _reload_stats["loads"] += 1
+    csv_digest = file_digest(CSV_FILE_PATH) # CSV 不存在時為空字串
+    if _load_snapshot(csv_digest or None):
+        return _load_succeeded()
     
     # 如果本地 CSV 不存在，嘗試從雲端下載（部署環境）
-    if not os.path.exists(CSV_FILE_PATH):
+    if not csv_digest:
         logger.warning(f"本地 CSV 不存在：{CSV_FILE_PATH}")
         if CSV_DOWNLOAD_URL:
             success = download_csv()
             if not success:
-                _store_data = pd.DataFrame()  # 下載失敗，回傳空 DataFrame 避免錯誤
-                return
+                return _load_failed()  # 下載失敗，設為空資料避免錯誤
+            csv_digest = file_digest(CSV_FILE_PATH)
         else:
             logger.error("無法下載 CSV，且本地 CSV 不存在")
-            _store_data = pd.DataFrame()
+            return _load_failed()
+
+    try:
+        # 讀取 CSV：欄位名稱與店名去空白、空欄位視為 None、評論切成清單（見 store_records.py）
+        started = time.perf_counter()
+        file_stat = csv_file_stat()
+        with _gc_paused():
+            records = read_store_csv(CSV_FILE_PATH)
+        _publish(StoreDataset(records, csv_digest, "csv", file_stat)) # 整理完才換上，查詢不會看到一半的資料
+        logger.info(f"已成功載入 {len(records)} 筆店家數據 from {CSV_FILE_PATH}（{_describe_file()}，{(time.perf_counter() - started) * 1000:.1f} ms）")
+
+    except Exception as e:
+        logger.exception(f"載入 CSV 檔案時發生未預期的錯誤：{e}")
+        return _load_failed()
+
+    _save_snapshot(records, csv_digest)
+    return _load_succeeded()
+
+def _load_succeeded() -> bool:
+    global _retry_delay
+    _retry_delay = 0.0
+    return True
+
+def _load_failed() -> bool:
+    """
+    還沒有任何資料時換上空資料（已有資料集時保留，包括背景重新載入剛換上的資料），
+    並把下一次重試往後延（指數退避）。
+    """
+    global _retry_at, _retry_delay
+    _reload_stats["load_failures"] += 1
+    _retry_delay = min(max(_retry_delay * 2, DATA_LOAD_RETRY_MIN), DATA_LOAD_RETRY_MAX)
+    _retry_at = time.monotonic() + _retry_delay
+    _publish(StoreDataset([]), only_if_unloaded=True)
+    logger.warning("店家資料載入失敗，%.1f 秒後重試", _retry_delay)
+    return False
+
+def _start_retry() -> None:
+    """到了重試時間：由一條背景執行緒重新載入，觸發的請求不等待，照常以目前（空的）資料回覆。"""
+    global _retry_at
+    if not _load_lock.acquire(blocking=False):
+        return # 已經有執行緒在載入
+    try:
+        if time.monotonic() < _retry_at:
+            return
+        _retry_at = float("inf") # 這一輪重試結束前不再觸發
+    finally:
+        _load_lock.release()
+    threading.Thread(target=_retry_load, name="store-data-retry", daemon=True).start()
+
+def _retry_load() -> None:
+    # 同時持有 _reload_lock：與 reload_store_data() 依序執行，不會在它換上新資料的同時換上別的結果
+    with _load_lock, _reload_lock:
+        dataset = _dataset
+        if dataset is not None and dataset.source != "empty": # 背景重新載入已經換上新資料
             return
+        _reload_stats["load_retries"] += 1
+        if _load():
+            logger.info("重試載入店家資料成功")
 
+@contextmanager
+def _gc_paused():
+    """
+    大量建立物件時暫停循環 GC：資料裡沒有循環參照，途中的 GC 只是一再掃描剛建好的資料
+    （10 萬筆時約佔載入時間的一半）。
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
     try:
-        # 讀取 CSV；確保「評論」欄為字串型態
-        _store_data = pd.read_csv(CSV_FILE_PATH, encoding='utf-8', dtype={"評論": str})
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
 
-        # 去除欄位名稱多餘空白，避免日後 KeyError
-        _store_data.columns = _store_data.columns.str.strip()
+def _load_snapshot(csv_digest) -> bool:
+    """
+    讀取快照並換上；成功回傳 True。csv_digest 為 None（本地沒有 CSV）時不比對來源，
+    直接使用隨部署一起放上的快照，不必再下載 CSV。
+    """
+    if not STORE_SNAPSHOT_PATH or not os.path.exists(STORE_SNAPSHOT_PATH):
+        return False
+    try:
+        started = time.perf_counter()
+        with _gc_paused():
+            records, header = read_snapshot(STORE_SNAPSHOT_PATH, csv_digest)
+    except (OSError, ValueError, EOFError, TypeError) as e: # marshal 讀到損毀的資料會拋出 EOFError / TypeError
+        logger.info("不使用快照 %s：%s，改讀 CSV", STORE_SNAPSHOT_PATH, e)
+        return False
+    _publish(StoreDataset(records, header["dataset"], "snapshot", csv_file_stat()))
+    logger.info(
+        "已從快照載入 %d 筆店家數據（%.1f ms，建於 %s）",
+        len(records), (time.perf_counter() - started) * 1000, header.get("built_at")
+    )
+    return True
 
-        # 將 '店名' 轉為 str 並去空白，增進匹配準確度
-        _store_data['店名'] = _store_data['店名'].astype(str).str.strip()
-        logger.info(f"已成功載入店家數據 from {CSV_FILE_PATH}")
+def _save_snapshot(records, csv_digest: str) -> None:
+    if not STORE_SNAPSHOT_PATH or not records:
+        return
+    try:
+        size = write_snapshot(STORE_SNAPSHOT_PATH, records, csv_digest)
+        logger.info("已寫出店家資料快照 %s（%.1f KB）", STORE_SNAPSHOT_PATH, size / 1024)
+    except OSError as e: # 唯讀的檔案系統等：不影響服務，下次啟動仍讀 CSV
+        logger.warning("寫出店家資料快照失敗：%s", e)
 
-    except Exception as e:
-        logger.exception(f"載入 CSV 檔案時發生未預期的錯誤：{e}")
-        _store_data = pd.DataFrame()
+# --- 重新載入：reload_store_data() ---
+def reload_store_data(force: bool = False) -> bool:
+    """
+    本地 CSV 的 mtime/大小有變（或 force=True）時，在呼叫端的執行緒讀檔、建索引，完成後一次換上；回傳是否換上新資料。
+    內容與目前資料相同（只是被 touch）、CSV 不存在或讀出來是空的都保留目前的資料。讀檔失敗時拋出例外，目前的資料不受影響。
+    """
+    with _reload_lock:
+        current = _dataset
+        _reload_stats["last_checked_at"] = time.time()
+        file_stat = csv_file_stat()
+        if file_stat is None or (not force and current is not None and file_stat == current.file_stat):
+            return False
+
+        started = time.perf_counter()
+        try:
+            digest = file_digest(CSV_FILE_PATH)
+            if current is not None and digest == current.digest:
+                current.file_stat = file_stat # 內容沒變，下次不必再算雜湊
+                _reload_stats["unchanged"] += 1
+                return False
+            with _gc_paused():
+                records = read_store_csv(CSV_FILE_PATH)
+            if not records:
+                raise ValueError(f"{CSV_FILE_PATH} 沒有任何店家資料，保留目前的資料")
+            dataset = StoreDataset(records, digest, "csv", file_stat)
+        except Exception:
+            _reload_stats["failures"] += 1
+            DATA_RELOAD_SECONDS.observe(time.perf_counter() - started, "error")
+            raise
+
+        _publish(dataset)
+        elapsed = time.perf_counter() - started
+        DATA_RELOAD_SECONDS.observe(elapsed, "ok")
+        _reload_stats["reloads"] += 1
+        _reload_stats["last_duration_ms"] = round(elapsed * 1000, 1)
+        logger.info("已重新載入 %d 筆店家數據（%s，版本 %d，%.1f ms）", len(records), _describe_file(), dataset.version, elapsed * 1000)
+        _save_snapshot(records, digest)
+    return True
+
+def dataset_stats() -> dict:
+    """/stats 用：目前資料集的版本、筆數、來源與重新載入的統計。"""
+    dataset = _dataset
+    stats = dict(_reload_stats)
+    stats.update(
+        version=dataset.version if dataset else 0,
+        rows=len(dataset.records) if dataset else 0,
+        source=dataset.source if dataset else "not_loaded",
+        digest=dataset.digest[:12] if dataset else "",
+        loaded_at=round(dataset.loaded_at, 3) if dataset else None,
+    )
+    return stats
 
 # --- 依店名查詢：get_store_info_by_name() ---
-def get_store_info_by_name(store_name):
+@DATA_QUERY_SECONDS.timed("by_name")
+def get_store_info_by_name(store_name) -> Optional[StoreRecord]:
     """
     根據店名查詢店家資訊:
     store_name (str): 要查詢的店家名稱。
-    dict or None: 如果找到，返回包含店家資訊的字典；否則返回 None。
+    StoreRecord or None: 如果找到，返回店家資料（可用 record["欄位"] / record.get() 取值）；否則返回 None。
     """
     load_store_data() # 確保資料已載入
 
-    if _store_data.empty:
-        logger.debug("店家數據為空，無法查詢。")
-        return None
-    
-    # 精確匹配：按鈕點擊傳來完整店名，使用 ==
-    df_found = _store_data[_store_data['店名'] == store_name]
-
-    if not df_found.empty:
-        logger.debug(f"找到店名：{store_name}")
-        return df_found.iloc[0].to_dict() # 返回第一條匹配的記錄（如果有多條同名店家，只返回第一條）
+    # 精確匹配：按鈕點擊傳來完整店名；同名店家只返回第一條
+    store_info = _dataset.by_name.get(store_name)
+    if store_info is not None:
+        logger.debug("找到店名：%s", store_name)
     else:
-        logger.debug(f"找不到店名：{store_name}")
-        return None
-    
+        logger.debug("找不到店名：%s", store_name)
+    return store_info
+
+# --- 依店家 ID 查詢：get_store_by_id() ---
+@DATA_QUERY_SECONDS.timed("by_id")
+def get_store_by_id(shop_id: str) -> Optional[StoreRecord]:
+    """依 store_id() 產生的 ID 查表，回傳整筆資料；找不到時回傳 None。"""
+    load_store_data()
+    return _dataset.by_id.get(shop_id)
+
 # --- 依類型 + 區域查詢：query_by_category_and_district() ---
-def query_by_category_and_district(category: str, district: str) -> pd.DataFrame:
-    """根據類型與區域條件回傳符合的店家"""
+@DATA_QUERY_SECONDS.timed("by_category_district")
+def query_by_category_and_district(category: str, district: str) -> List[StoreRecord]:
+    """根據類型與區域條件回傳符合的店家（依 CSV 順序；沒有時為空清單）"""
     load_store_data()
+    return _dataset.by_category.get((category, district), [])
 
-    if _store_data.empty:
-        logger.debug("店家數據為空，無法查詢。")
-        return pd.DataFrame()
-    
-    # 確保欄位存在
-    if "美食類型" not in _store_data.columns or "區域" not in _store_data.columns:
-        logger.error("CSV 缺少必要欄位（美食類型 或 區域）")
-        return pd.DataFrame()
-    
-    return _store_data[(_store_data["美食類型"] == category) & (_store_data["區域"] == district)]
\ No newline at end of file
+# --- 所有店名：all_store_names() ---
+def all_store_names() -> list:
+    """回傳所有店名（依 CSV 順序、去除重複），供建立回覆包等離線工作使用。"""
+    load_store_data()
+    return list(_dataset.by_name)
@@ -0,0 +1,100 @@
+# data_reloader.py
+"""
+背景重新載入店家資料：
+- 每 DATA_RELOAD_INTERVAL 秒檢查本地 CSV 的 mtime/大小，有變動且下一次檢查時已不再變動，
+  就呼叫 data_loader.reload_store_data()，在這條背景執行緒讀檔、建索引，完成後一次換上；請求端完全不等待。
+- 設定了 CSV_DOWNLOAD_URL 時，每 DATA_RELOAD_REMOTE_INTERVAL 秒重新下載一次，下載後同樣走本地檢查。
+  多個 worker 共用 CSV 旁的 .download.lock：拿到檔案鎖、且鎖檔記錄的上次下載時間已超過間隔的 worker 才下載，
+  其他 worker 只看本地檔案的變動，整個服務每個間隔最多下載一次。
+- 執行緒不會跟著 fork 到子行程：gunicorn 預載模式在每個 worker 的 post_fork 各自啟動。
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import time
+import fcntl
+import logging
+import threading
+from typing import Optional
+
+from handlers import data_loader
+
+logger = logging.getLogger(__name__)
+
+class DataReloader:
+    def __init__(self, interval: float, remote_interval: float):
+        self._interval = interval
+        self._remote_interval = remote_interval if data_loader.CSV_DOWNLOAD_URL else 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_download = time.monotonic() + self._remote_interval
+        self._last_stat = data_loader.csv_file_stat()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="data-reloader", daemon=True)
+        self._thread.start()
+        logger.info("背景重新載入已啟動：每 %.0f 秒檢查 CSV%s", self._interval,
+                    f"、每 {self._remote_interval:.0f} 秒重新下載" if self._remote_interval else "")
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("重新載入店家資料失敗，繼續使用目前的資料")
+
+    def check(self) -> bool:
+        """需要時重新下載，再檢查本地 CSV；回傳是否換上新資料。"""
+        if self._remote_interval and time.monotonic() >= self._next_download:
+            self._next_download = time.monotonic() + self._remote_interval
+            self._download_if_due()
+        data_loader.load_store_data() # 先前載入失敗時，到了退避時間就在背景重試（沒有請求進來也會觸發）
+        # 檔案要連續兩次檢查都沒變才讀，避免讀到還在寫入（複製、下載）中的半個檔案
+        file_stat = data_loader.csv_file_stat()
+        if file_stat != self._last_stat:
+            self._last_stat = file_stat
+            return False
+        return data_loader.reload_store_data()
+
+    def _download_if_due(self) -> bool:
+        """跨 worker 只下載一次：非阻塞地鎖住鎖檔，鎖檔內容是上次下載的時間（epoch 秒）；回傳是否有下載。"""
+        lock_path = data_loader.CSV_FILE_PATH + ".download.lock"
+        os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+        with open(lock_path, "a+", encoding="utf-8") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False # 其他 worker 正在下載
+            f.seek(0)
+            try:
+                last_download = float(f.read().strip() or 0)
+            except ValueError:
+                last_download = 0.0
+            if time.time() - last_download < self._remote_interval:
+                return False # 其他 worker 這個間隔內已經下載過
+            data_loader.download_csv()
+            f.seek(0)
+            f.truncate()
+            f.write(f"{time.time():.0f}")
+            return True # 關檔時釋放檔案鎖
+
+# --- 每個行程一個 ---
+_reloader: Optional[DataReloader] = None
+_reloader_pid: Optional[int] = None
+_lock = threading.Lock()
+
+def start_reloader(interval: float, remote_interval: float) -> Optional[DataReloader]:
+    """啟動本行程的背景重新載入；interval <= 0 代表關閉。重複呼叫（同一行程）只會啟動一次。"""
+    global _reloader, _reloader_pid
+    if interval <= 0:
+        return None
+    with _lock:
+        if _reloader is None or _reloader_pid != os.getpid(): # fork 後父行程的執行緒不存在，要重新啟動
+            _reloader = DataReloader(interval, remote_interval)
+            _reloader_pid = os.getpid()
+            _reloader.start()
+    return _reloader
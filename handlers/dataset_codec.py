@@ -0,0 +1,52 @@
+# dataset_codec.py
+"""
+店家資料 CSV 的壓縮支援（gzip / zstd）：
+- 資料大多是重複性高的中文評論，壓縮後約剩 1/3～1/4，下載與存放都省。
+- 讀取時看檔頭的 magic bytes 判斷格式，與副檔名無關：下載回來的 .gz 存成 .csv 也能讀；
+  寫出時（抓取腳本）依副檔名 .gz / .zst 決定壓縮方式（pandas 的 compression="infer"）。
+- open_dataset() 回傳邊解壓邊解碼的文字串流，直接交給 csv.reader，不會先在記憶體或磁碟產生一份解壓後的完整副本。
+- zstd 需要另外安裝 zstandard 套件；沒有安裝時只有讀到 zstd 檔才會報錯。
+"""
+# --- 套件匯入 ---
+import io
+import gzip
+from typing import IO
+
+try:
+    import zstandard
+except ImportError: # 選用：只用 gzip 或不壓縮時不需要
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# DATASET_COMPRESSION 設定值 → 副檔名
+SUFFIXES = {"": "", "gzip": ".gz", "zstd": ".zst"}
+
+def with_suffix(path: str, codec: str) -> str:
+    """依壓縮方式在路徑後加上 .gz / .zst；codec 不支援時拋出 ValueError。"""
+    if codec not in SUFFIXES:
+        raise ValueError(f"不支援的壓縮方式：{codec!r}（可用 gzip、zstd 或留空）")
+    return path + SUFFIXES[codec]
+
+def detect_codec(path: str) -> str:
+    """依檔頭判斷壓縮方式：gzip / zstd / ""（未壓縮）。"""
+    with open(path, "rb") as f:
+        head = f.read(len(ZSTD_MAGIC))
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return ""
+
+def open_dataset(path: str, encoding: str = "utf-8-sig") -> IO[str]:
+    """開啟（可能壓縮過的）CSV，回傳逐塊解壓、解碼的文字串流；newline="" 交給 csv 模組處理換行。"""
+    codec = detect_codec(path)
+    if codec == "gzip":
+        return gzip.open(path, "rt", encoding=encoding, newline="")
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"{path} 是 zstd 壓縮檔，需要安裝 zstandard 套件")
+        raw = open(path, "rb")
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(io.BufferedReader(reader), encoding=encoding, newline="")
+    return open(path, encoding=encoding, newline="")
@@ -0,0 +1,56 @@
+# deadline.py
+"""
+回覆期限 (reply token 有效時間) 的判斷：
+- 每個事件的期限 = 事件 timestamp + REPLY_DEADLINE_SECONDS，不需額外傳遞狀態。
+- 剩餘時間少於 REPLY_DEGRADE_MARGIN 時，handler 改用較便宜的回覆（較短的輪播或固定文字）。
+- 已超過期限就不再呼叫 reply_message（token 已失效，送了也沒用）。
+- 依 handler 名稱統計降級與逾時次數。
+"""
+# --- 套件與 Logger 初始化 ---
+import time
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict
+
+from config import REPLY_DEADLINE_SECONDS, REPLY_DEGRADE_MARGIN
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"degraded": 0, "expired": 0})
+
+# --- 剩餘時間 ---
+def remaining_seconds(event) -> float:
+    """距離回覆期限還剩幾秒；沒有 timestamp 的事件視為剛發生。"""
+    timestamp = getattr(event, "timestamp", None)
+    if not timestamp:
+        return REPLY_DEADLINE_SECONDS
+    return timestamp / 1000 + REPLY_DEADLINE_SECONDS - time.time()
+
+def _count(handler: str, kind: str) -> None:
+    with _lock:
+        _counters[handler][kind] += 1
+
+# --- 對外 API ---
+def should_degrade(event, handler: str) -> bool:
+    """剩餘時間不足 REPLY_DEGRADE_MARGIN 秒時回傳 True，並記一次降級。"""
+    remaining = remaining_seconds(event)
+    if remaining >= REPLY_DEGRADE_MARGIN:
+        return False
+    _count(handler, "degraded")
+    logger.info("[%s] 剩餘 %.1f 秒，改用簡化回覆", handler, remaining)
+    return True
+
+def is_expired(event, handler: str) -> bool:
+    """已超過回覆期限時回傳 True，並記一次逾時；呼叫端應放棄回覆。"""
+    remaining = remaining_seconds(event)
+    if remaining > 0:
+        return False
+    _count(handler, "expired")
+    logger.warning("[%s] 已超過回覆期限 %.1f 秒，放棄回覆", handler, -remaining)
+    return True
+
+def deadline_stats() -> Dict[str, Dict[str, int]]:
+    with _lock:
+        return {handler: dict(counts) for handler, counts in _counters.items()}
@@ -2,31 +2,80 @@
 """
 集中事件路由：
 - 接收 main.py 傳入的 MessageEvent。
-- 根據使用者輸入文字決定呼叫哪一層 handler。
+- 根據使用者輸入文字決定呼叫哪一層 handler：路由表 (handlers/router.py) 依 priority 比對，
+  完全相符的文字直接查表，不必逐一走過 if 判斷。
 - 將 UI / 業務處理分散到 handlers 目錄，保持單一職責。
+- 每一層的耗時記到 linebot_dispatch_seconds{layer=...}，呼叫次數與平均耗時見 /stats 的 routes。
+- 第一～三層不需要店家資料，冷啟動時照常立即回覆；第四、五層先經 ensure_data() 限時等待背景載入
+  (handlers/cold_start.py)。
 """
 # --- 套件與處理器匯入 ---
+import re
 import logging
-from typing import Optional
 
 from linebot.v3.messaging import MessagingApi
 from linebot.v3.messaging.models import TextMessage, ReplyMessageRequest
 from linebot.v3.webhooks.models import MessageEvent, TextMessageContent
 
+from config import LazyLogArg
 from constants import FOOD_TYPES, REGIONS
 from handlers.menu_reply import reply_menu
 from handlers.category_reply import reply_categories
 from handlers.region_reply import reply_region_selector
 from handlers.restaurant_carousel_reply import reply_food_by_type_and_region
 from handlers.store_detail_reply import reply_store_detail
+from handlers.metrics import DISPATCH_SECONDS
+from handlers.reply_bundle import reply_from_bundle
+from handlers.router import Router, RouteMatch
+from handlers.cold_start import ensure_data, record_first_reply, first_reply_pending, STATIC, DATA
 
 logger = logging.getLogger(__name__)
 
+# --- 路由表：priority 數字越小越先比對（與原本 if 判斷的順序相同）---
+router = Router()
+
+# 1. 第五層 : 店家詳細資訊（地址/電話/評價）
+def _route_store_detail(match: RouteMatch, event, messaging_api):
+    if ensure_data(messaging_api, event.reply_token):
+        reply_store_detail(match.text, event, messaging_api)
+        record_first_reply(DATA)
+
+# 2. 第四層 : 依美食類型與區域回覆店家輪播（"類型-區域"）
+def _route_restaurant_carousel(match: RouteMatch, event, messaging_api):
+    logger.debug("分割 → 類別=%s, 區域=%s", match.groups["category"], match.groups["district"])
+    if ensure_data(messaging_api, event.reply_token):
+        reply_food_by_type_and_region(match.groups["category"], match.groups["district"], event, messaging_api)
+        record_first_reply(DATA)
+
+# 3. 第一層 : 主選單觸發
+def _route_menu(match: RouteMatch, event, messaging_api):
+    reply_menu(event, messaging_api)
+
+# 4. 第二層 : 主類別 → 回覆子類別選單
+def _route_categories(match: RouteMatch, event, messaging_api):
+    reply_categories(event, messaging_api, match.text)
+
+# 5. 第三層 : 單一美食類型 → 區域選擇
+def _route_region_selector(match: RouteMatch, event, messaging_api):
+    reply_region_selector(match.text, REGIONS, event, messaging_api)
+
+router.suffix(["的地址", "的電話", "的評論"], _route_store_detail, name="store_detail", priority=1)
+router.pattern(
+    r"(?s)(?P<category>{})-(?P<district>.+)".format("|".join(map(re.escape, FOOD_TYPES))),
+    _route_restaurant_carousel, name="restaurant_carousel", priority=2
+)
+router.exact("美食推薦", _route_menu, name="menu", priority=3)
+router.exact(["文青早點", "在地美食", "高檔餐廳"], _route_categories, name="categories", priority=4)
+router.exact(FOOD_TYPES, _route_region_selector, name="region_selector", priority=5)
+
+# 需要店家資料的路由；其餘（與 fallback）都是靜態回覆
+DATA_ROUTES = frozenset({"store_detail", "restaurant_carousel"})
+
 # --- 對外 API：dispatch_event() ---
 def dispatch_event(event: MessageEvent, messaging_api: MessagingApi) -> None:
     """
     從 main.py 呼叫的入口點。
-    任何 MessageEvent 進入此函式，由條件判斷決定下一步應回覆的邏輯層。
+    任何 MessageEvent 進入此函式，由路由表決定下一步應回覆的邏輯層。
     若為非文字事件則直接忽略。
     """
     # 前置檢查：是否為文字訊息
@@ -37,49 +86,33 @@ def dispatch_event(event: MessageEvent, messaging_api: MessagingApi) -> None:
     # 取出並標準化使用者文字
     user_text: str = event.message.text.strip()
     logger.info("使用者傳來：%s", user_text)
-    logger.debug("user_text 長度=%d, ASCII=%s", len(user_text), [ord(c) for c in user_text])
-
-    # 若符合 "類型-區域" 格式，事先分割
-    category: Optional[str] = None
-    district: Optional[str] = None
-    if "-" in user_text:
-        category, district = user_text.split("-", 1)
-        logger.debug("分割 → 類別=%s, 區域=%s", category, district)
+    # ord() 清單只在 DEBUG 訊息真的輸出時才計算
+    logger.debug("user_text 長度=%d, ASCII=%s", len(user_text), LazyLogArg(lambda: [ord(c) for c in user_text]))
 
-    # 依優先順序進行事件分派
     try:
-        # 1. 第五層 : 店家詳細資訊（地址/電話/評價）
-        if user_text.endswith("的地址") or user_text.endswith("的電話") or user_text.endswith("的評論"):
-            reply_store_detail(user_text, event, messaging_api)
+        # 0. 預先編譯的回覆包：按鈕觸發的固定回覆直接查表送出，不必組訊息
+        if reply_from_bundle(messaging_api, event.reply_token, user_text):
+            if first_reply_pending(): # 還沒記到第一則回覆時才分類，平常不多做比對
+                matched = router.match(user_text)
+                record_first_reply(DATA if matched is not None and matched.route.name in DATA_ROUTES else STATIC)
             return
 
-        # 2. 第四層 : 依美食類型與區域回覆店家輪播
-        if district and category in FOOD_TYPES:
-            reply_food_by_type_and_region(category, district, event, messaging_api)
-            return
-
-        # 3. 第一層 : 主選單觸發
-        if user_text == "美食推薦":
-            reply_menu(event, messaging_api)
-            return
-
-        # 4. 第二層 : 主類別 → 回覆子類別選單
-        if user_text in ["文青早點", "在地美食", "高檔餐廳"]:
-            reply_categories(event, messaging_api, user_text)
-            return
-
-        # 5. 第三層 : 單一美食類型 → 區域選擇
-        if user_text in FOOD_TYPES:
-            reply_region_selector(user_text, REGIONS, event, messaging_api)
+        # 1.～5. 依路由表分派（資料相依的路由自己記錄第一則回覆）
+        route = router.dispatch(user_text, event, messaging_api)
+        if route is not None:
+            if route.name not in DATA_ROUTES:
+                record_first_reply(STATIC)
             return
 
         # 6. Fallback : 皆不符合時回覆提示
-        messaging_api.reply_message(
-            ReplyMessageRequest(
-                reply_token=event.reply_token,
-                messages=[TextMessage(text="請點選選單或輸入正確的格式")]
+        with DISPATCH_SECONDS.time("fallback"):
+            messaging_api.reply_message(
+                ReplyMessageRequest(
+                    reply_token=event.reply_token,
+                    messages=[TextMessage(text="請點選選單或輸入正確的格式")]
+                )
             )
-        )
+        record_first_reply(STATIC)
 
     # --- 全域例外攔截 ---
     # 避免因未捕捉錯誤導致 webhook 超時；同時回覆友善訊息
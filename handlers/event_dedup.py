@@ -0,0 +1,121 @@
+# event_dedup.py
+"""
+Webhook 事件去重：
+- LINE 在我們回應過慢時會重送事件 (deliveryContext.isRedelivery)，webhookEventId 不變。
+- 以 webhookEventId 為 key 記錄已處理的事件，TTL 到期或超過上限 (LRU) 時淘汰。
+- 可選擇以 SQLite 檔案保存紀錄，讓 worker 重啟或多個 gunicorn worker 之間也能去重。
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- 去重快取 ---
+class EventDeduplicator:
+    """
+    seen(event_id) 第一次看到某個 ID 回傳 False 並記錄；TTL 內再次出現回傳 True。
+    記憶體層是 OrderedDict（插入順序即到期順序），db_path 有值時再以 SQLite 做持久層。
+    """
+
+    def __init__(self, ttl: float, max_entries: int, db_path: Optional[str] = None):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._db_path = db_path or None
+        self._entries: "OrderedDict[str, float]" = OrderedDict() # event_id → 到期時間
+        self._lock = threading.Lock()
+        self._local = threading.local() # 每個執行緒各自的 SQLite 連線，查詢時不必互相等待
+        self._db_writes = 0
+        self._stats = {"hits": 0, "misses": 0, "evicted": 0, "db_hits": 0, "db_errors": 0}
+
+    def seen(self, event_id: Optional[str]) -> bool:
+        """回傳 True 代表這個事件已處理過，呼叫端應直接略過。"""
+        if not event_id:
+            return False # 沒有 ID 的事件無法判斷，一律當成新事件
+
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            if event_id in self._entries:
+                self._stats["hits"] += 1
+                return True
+            self._entries[event_id] = now + self._ttl
+            if len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evicted"] += 1
+            if not self._db_path:
+                self._stats["misses"] += 1
+                return False
+            self._db_writes += 1
+            prune = self._db_writes % 500 == 0
+
+        # 記憶體層已記下這個 ID，同一行程內的重送會在上面就被擋下；
+        # SQLite 查詢（可能等檔案鎖）在鎖外進行，不讓其他事件的記憶體層檢查排隊等它
+        duplicate = self._seen_in_db(event_id, prune)
+        with self._lock:
+            if duplicate:
+                self._stats["hits"] += 1
+                self._stats["db_hits"] += 1
+            else:
+                self._stats["misses"] += 1
+        return duplicate
+
+    # 從最舊的一端移除已過期的紀錄
+    def _evict(self, now: float) -> None:
+        entries = self._entries
+        while entries:
+            expires_at = next(iter(entries.values()))
+            if expires_at > now:
+                break
+            entries.popitem(last=False)
+            self._stats["evicted"] += 1
+
+    # --- SQLite 持久層 ---
+    def _connection(self) -> sqlite3.Connection:
+        # fork 後不能沿用父行程的連線，依 PID 重新開啟
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self._db_path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS processed_events ("
+                "event_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+            )
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def _seen_in_db(self, event_id: str, prune: bool) -> bool:
+        """寫入持久層並回傳是否為重複事件；prune 為 True 時順便清掉過期紀錄。不需持有 self._lock。"""
+        # 持久層跨行程使用，所以用牆上時間而不是 monotonic
+        now = time.time()
+        try:
+            conn = self._connection()
+            if prune:
+                conn.execute("DELETE FROM processed_events WHERE expires_at <= ?", (now,))
+            cur = conn.execute(
+                "INSERT INTO processed_events (event_id, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(event_id) DO UPDATE SET expires_at = excluded.expires_at "
+                "WHERE processed_events.expires_at <= ?",
+                (event_id, now + self._ttl, now)
+            )
+            # rowcount 0 表示主鍵已存在且尚未過期 → 重複事件
+            return cur.rowcount == 0
+        except sqlite3.Error:
+            # 持久層失敗時只靠記憶體層，不能因此擋下事件
+            with self._lock:
+                self._stats["db_errors"] += 1
+            logger.exception("去重資料庫 %s 存取失敗", self._db_path)
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """回傳命中/未命中等計數器快照。"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["size"] = len(self._entries)
+        snapshot["backend"] = "sqlite" if self._db_path else "memory"
+        return snapshot
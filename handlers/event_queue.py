@@ -0,0 +1,170 @@
+# event_queue.py
+"""
+Webhook 背景工作池：
+- /callback 驗章後把事件放進有上限的佇列，立即回 200 給 LINE，不必等 reply_message 完成。
+- 固定數量的背景執行緒從佇列取出事件，呼叫 main.py 指定的處理函式。
+- 佇列滿時先短暫等待（背壓），仍然滿就交還呼叫端自行處理，並記錄溢位次數。
+- 收到 SIGTERM 或程式結束時，先把佇列內的事件處理完再離開。
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import time
+import queue
+import atexit
+import signal
+import logging
+import threading
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# 通知工作執行緒結束的哨兵值
+_STOP = object()
+
+# --- 背景工作池 ---
+class EventWorkerPool:
+    """
+    有上限的佇列 + 固定數量的工作執行緒。
+    執行緒在第一次 submit() 時才啟動，並記錄建立時的 PID：
+    若行程被 fork（例如 gunicorn 預載模式），子行程會重新建立自己的執行緒。
+    """
+
+    def __init__(self, workers: int, maxsize: int, enqueue_timeout: float = 0.05, name: str = "webhook-worker"):
+        self._workers = max(1, workers)
+        self._maxsize = maxsize
+        self._enqueue_timeout = enqueue_timeout
+        self._name = name
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self._threads: List[threading.Thread] = []
+        self._pid = None
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,   # 成功放進佇列的事件數
+            "processed": 0,   # 處理完成的事件數
+            "failed": 0,      # 處理時拋出例外的事件數
+            "overflow": 0,    # 佇列已滿、退回呼叫端的事件數
+            "max_depth": 0,   # 觀察到的最大佇列長度
+            "max_wait_ms": 0.0, # 事件在佇列中等待的最長時間
+        }
+
+    # 確保本行程的工作執行緒已啟動
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # fork 之後父行程的執行緒不存在於子行程，佇列也要重建
+            self._queue = queue.Queue(maxsize=self._maxsize)
+            self._threads = [
+                threading.Thread(target=self._run, name=f"{self._name}-{i}", daemon=True)
+                for i in range(self._workers)
+            ]
+            for t in self._threads:
+                t.start()
+            self._pid = os.getpid()
+            logger.info("Webhook 工作池已啟動：%d 個執行緒，佇列上限 %d", self._workers, self._maxsize)
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> bool:
+        """
+        將 func(*args) 排入佇列。
+        回傳 False 代表工作池正在關閉或佇列已滿，呼叫端應自行同步處理。
+        """
+        if self._stopping:
+            return False
+        self._ensure_started()
+
+        try:
+            self._queue.put((func, args, time.monotonic()), timeout=self._enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self._stats["overflow"] += 1
+            logger.warning("Webhook 佇列已滿 (%d)，改由請求執行緒同步處理", self._maxsize)
+            return False
+
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats["submitted"] += 1
+            if depth > self._stats["max_depth"]:
+                self._stats["max_depth"] = depth
+        return True
+
+    # 工作執行緒主迴圈
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                func, args, enqueued_at = item
+                wait_ms = (time.monotonic() - enqueued_at) * 1000
+                try:
+                    func(*args)
+                except Exception:
+                    logger.exception("背景處理 webhook 事件時出錯")
+                    outcome = "failed"
+                else:
+                    outcome = "processed"
+                with self._lock:
+                    self._stats[outcome] += 1
+                    if wait_ms > self._stats["max_wait_ms"]:
+                        self._stats["max_wait_ms"] = round(wait_ms, 2)
+            finally:
+                self._queue.task_done()
+
+    def shutdown(self, timeout: float) -> bool:
+        """
+        停止接收新事件，並在 timeout 秒內等待佇列清空。
+        回傳 True 表示所有事件都已處理完。
+        """
+        self._stopping = True
+        if self._pid != os.getpid():
+            return True  # 本行程從未啟動過執行緒，沒有東西要清
+
+        deadline = time.monotonic() + timeout
+        q = self._queue
+        with q.all_tasks_done:
+            while q.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("Webhook 佇列清空逾時，仍有 %d 筆未處理", q.unfinished_tasks)
+                    return False
+                q.all_tasks_done.wait(remaining)
+
+        for _ in self._threads:
+            q.put_nowait(_STOP)
+        logger.info("Webhook 佇列已清空，工作池關閉")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """回傳目前的計數器快照，供監控端點使用。"""
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot["depth"] = self._queue.qsize()
+        snapshot["capacity"] = self._maxsize
+        snapshot["workers"] = self._workers
+        return snapshot
+
+# --- SIGTERM / 程式結束時清空佇列 ---
+def install_drain_hooks(pool: EventWorkerPool, timeout: float) -> None:
+    """
+    收到 SIGTERM 時先清空佇列，再交給原本的 signal handler（例如 gunicorn worker 的 handle_exit）。
+    signal 只能在主執行緒註冊，其他情況只掛 atexit。
+    """
+    atexit.register(pool.shutdown, timeout)
+
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def _on_sigterm(signum, frame):
+        logger.info("收到 SIGTERM，先處理完 webhook 佇列再結束")
+        pool.shutdown(timeout)
+        if callable(previous):
+            previous(signum, frame)
+        else:
+            raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, _on_sigterm)
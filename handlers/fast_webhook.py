@@ -0,0 +1,120 @@
+# fast_webhook.py
+"""
+Webhook 快速解析路徑（WEBHOOK_FAST_PATH=True 時啟用）：
+- 直接對原始 request bytes 計算 HMAC，不必先 decode 成字串再 encode 回去。
+- 以 orjson 解析（未安裝時退回標準 json），只取 handler 會用到的欄位：
+  type、replyToken、source、timestamp、webhookEventId、message.text、postback.data。
+- 文字訊息、postback、追蹤事件以 pydantic 的 construct() 直接建立 SDK 模型、跳過逐欄驗證，
+  handler 端的 isinstance 判斷與屬性存取都不用改。
+- 其他事件型別（貼圖、圖片、退追蹤 …）或欄位不齊時，該筆事件交回 SDK 的 Event.from_dict()；
+  SDK 也不認得的型別與 WebhookParser 相同，轉成 UnknownEvent，不讓整批事件失敗。
+"""
+# --- 套件匯入 ---
+import hmac
+import base64
+import hashlib
+import logging
+from typing import Callable, Dict, List
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError: # 沒裝 orjson 仍可運作，只是 JSON 解析慢一些
+    import json
+    _loads = json.loads
+
+from linebot.v3.exceptions import InvalidSignatureError
+from linebot.v3.webhook import UnknownEvent
+from linebot.v3.webhooks.models import (
+    Event, MessageEvent, PostbackEvent, FollowEvent,
+    TextMessageContent, PostbackContent, FollowDetail, DeliveryContext,
+    UserSource, GroupSource, RoomSource
+)
+
+from handlers.metrics import SIGNATURE_SECONDS, FAST_PATH_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# --- 建立 SDK 模型（不驗證）---
+def _source(raw: dict):
+    source_type = raw["type"]
+    if source_type == "user":
+        return UserSource.construct(type="user", user_id=raw["userId"])
+    if source_type == "group":
+        return GroupSource.construct(type="group", group_id=raw["groupId"], user_id=raw.get("userId"))
+    if source_type == "room":
+        return RoomSource.construct(type="room", room_id=raw["roomId"], user_id=raw.get("userId"))
+    raise KeyError(source_type)
+
+def _common(raw: dict) -> dict:
+    """各種事件共有的欄位。"""
+    delivery = raw.get("deliveryContext") or {}
+    return {
+        "type": raw["type"],
+        "source": _source(raw["source"]),
+        "timestamp": raw["timestamp"],
+        "mode": raw.get("mode"),
+        "webhook_event_id": raw.get("webhookEventId"),
+        "delivery_context": DeliveryContext.construct(is_redelivery=delivery.get("isRedelivery", False)),
+        "reply_token": raw.get("replyToken"),
+    }
+
+def _message_event(raw: dict):
+    message = raw["message"]
+    if message["type"] != "text":
+        return None # 非文字訊息交回 SDK，保留完整模型
+    content = TextMessageContent.construct(
+        type="text", id=message["id"], text=message["text"], quote_token=message.get("quoteToken")
+    )
+    return MessageEvent.construct(message=content, **_common(raw))
+
+def _postback_event(raw: dict):
+    postback = raw["postback"]
+    content = PostbackContent.construct(data=postback["data"], params=postback.get("params"))
+    return PostbackEvent.construct(postback=content, **_common(raw))
+
+def _follow_event(raw: dict):
+    follow = FollowDetail.construct(is_unblocked=(raw.get("follow") or {}).get("isUnblocked", False))
+    return FollowEvent.construct(follow=follow, **_common(raw))
+
+_BUILDERS: Dict[str, Callable[[dict], object]] = {
+    "message": _message_event,
+    "postback": _postback_event,
+    "follow": _follow_event,
+}
+
+def _build_event(raw: dict):
+    builder = _BUILDERS.get(raw.get("type"))
+    if builder is not None:
+        try:
+            event = builder(raw)
+        except (KeyError, TypeError, AttributeError):
+            event = None # 欄位不齊：交給 SDK 處理（必要時由 SDK 報錯）
+        if event is not None:
+            FAST_PATH_EVENTS.inc("fast")
+            return event
+    FAST_PATH_EVENTS.inc("sdk")
+    try:
+        return Event.from_dict(raw)
+    except ValueError: # SDK 版本還不認得的事件型別：與 WebhookParser.parse() 相同，不中斷其他事件
+        logger.info("Unknown event type. type=%s", raw.get("type"))
+        return UnknownEvent.new_from_json_dict(raw)
+
+# --- 對外 API ---
+class FastWebhookParser:
+    """parse(body_bytes, signature) → 事件列表；簽章錯誤時拋出 InvalidSignatureError，與 SDK 相同。"""
+
+    def __init__(self, channel_secret: str):
+        self._secret = channel_secret.encode("utf-8")
+
+    def verify(self, body: bytes, signature: str) -> None:
+        with SIGNATURE_SECONDS.time():
+            digest = base64.b64encode(hmac.new(self._secret, body, hashlib.sha256).digest())
+            valid = hmac.compare_digest(digest, (signature or "").encode("utf-8"))
+        if not valid:
+            raise InvalidSignatureError(f"Invalid signature. signature={signature}")
+
+    def parse(self, body: bytes, signature: str) -> List[object]:
+        self.verify(body, signature)
+        payload = _loads(body)
+        return [_build_event(raw) for raw in payload.get("events", ())]
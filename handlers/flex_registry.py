@@ -0,0 +1,50 @@
+# flex_registry.py
+"""
+靜態 Flex 訊息登錄表：
+- 主選單、三種風格選單、各料理類型的區域輪播、歡迎訊息只依 FOOD_TYPES / REGIONS 與固定文字而定，
+  組一次即可，之後每個事件只查表。
+- 各 handler 模組在 import 時以 register(key, builder) 登記自己的訊息；builder 回傳 LINE API 格式的 dict
+  （handlers/raw_reply.py 的 flex_message()）。
+- build() 由開機預熱 (handlers/warmup.py) 呼叫；尚未預熱時，第一次 get() 會自動補建。
+"""
+# --- 套件與 Logger 初始化 ---
+import time
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from handlers.metrics import FLEX_BUILD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_builders: Dict[str, Callable[[], dict]] = {}
+_messages: Dict[str, dict] = {}
+_lock = threading.Lock()
+
+# --- 登記 ---
+def register(key: str, builder: Callable[[], dict]) -> None:
+    """登記一則靜態訊息；key 例如 "menu"、"category:在地美食"、"region:必吃便當"。"""
+    _builders[key] = builder
+
+# --- 建立 ---
+def build() -> int:
+    """把所有已登記的訊息組好，回傳訊息數；重複呼叫只會組一次。"""
+    with _lock:
+        if len(_messages) == len(_builders):
+            return len(_messages)
+        started = time.perf_counter()
+        with FLEX_BUILD_SECONDS.time("static_registry"):
+            for key, builder in _builders.items():
+                if key not in _messages:
+                    _messages[key] = builder()
+        logger.info("靜態 Flex 訊息已建立 %d 則，耗時 %.1f ms", len(_messages), (time.perf_counter() - started) * 1000)
+        return len(_messages)
+
+# --- 查詢 ---
+def get(key: str) -> Optional[dict]:
+    """取得組好的訊息；key 未登記時回傳 None。"""
+    message = _messages.get(key)
+    if message is None and key in _builders:
+        build()
+        message = _messages.get(key)
+    return message
@@ -0,0 +1,162 @@
+# line_api_client.py
+"""
+共用的 LINE Messaging API 用戶端：
+- 連線池大小、連線/讀取逾時都由 config 設定，避免一條卡住的 TLS 連線讓 worker 永遠等待。
+- 開機時在背景預先建立 TLS 連線，第一位使用者不必等握手。
+- 包住 MessagingApi，統計每次 reply_message 的延遲、錯誤與連線池飽和次數。
+- reply_raw() 直接送出預先序列化的 JSON bytes（handlers/raw_reply.py），跳過 SDK 的模型轉換。
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+import urllib3
+from linebot.v3.messaging import ApiClient, Configuration, MessagingApi
+from linebot.v3.messaging.exceptions import ApiException
+from linebot.v3.messaging.rest import RESTResponse
+
+from handlers.metrics import REPLY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# --- 建立共用用戶端 ---
+def create_api_client(access_token: str, pool_size: int, host: str = "") -> ApiClient:
+    """建立 ApiClient；connection_pool_maxsize 即 urllib3 對同一主機保留的 keep-alive 連線數，host 空字串為 SDK 預設主機。"""
+    configuration = Configuration(access_token=access_token, host=host or None)
+    configuration.connection_pool_maxsize = pool_size
+    return ApiClient(configuration)
+
+# --- 帶統計的 MessagingApi ---
+class InstrumentedMessagingApi:
+    """
+    handlers 仍以 messaging_api.reply_message(...) 呼叫，介面不變。
+    - 每次呼叫自動帶上 (connect, read) 逾時。
+    - 同時進行中的呼叫數超過連線池大小時，urllib3 會另開用完即丟的連線，記為一次「飽和」。
+    其他方法（push_message 等）直接轉給原本的 MessagingApi。
+    """
+
+    def __init__(self, api_client: ApiClient, pool_size: int, timeout: Tuple[float, float]):
+        self._api_client = api_client
+        self._api = MessagingApi(api_client)
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._warmed_pid = None
+        # fork 出來的子行程不能沿用父行程已建立的 TLS 連線（gunicorn 預載模式）
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+        self._stats = {
+            "calls": 0,
+            "errors": 0,
+            "saturated": 0,        # 呼叫當下進行中的呼叫數已超過連線池大小
+            "max_in_flight": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+        }
+
+    def reply_message(self, reply_message_request, **kwargs):
+        kwargs.setdefault("_request_timeout", self._timeout)
+        return self._tracked(self._api.reply_message, reply_message_request, **kwargs)
+
+    def reply_raw(self, body: bytes):
+        """送出 raw_reply.encode_reply() 產生的 request body；非 2xx 時與 SDK 相同拋出 ApiException。"""
+        return self._tracked(self._post_reply, body)
+
+    def _post_reply(self, body: bytes):
+        url = (self._api_client.configuration.host or self._api.line_base_path) + "/v2/bot/message/reply"
+        headers = dict(self._api_client.default_headers)
+        headers["Content-Type"] = "application/json"
+        response = self._api_client.rest_client.pool_manager.request(
+            "POST", url, body=body, headers=headers,
+            timeout=urllib3.Timeout(connect=self._timeout[0], read=self._timeout[1])
+        )
+        if not 200 <= response.status <= 299:
+            raise ApiException(http_resp=RESTResponse(response))
+        return response
+
+    def _tracked(self, call: Callable, *args, **kwargs):
+        """執行一次 reply 呼叫並更新統計。"""
+        with self._lock:
+            self._in_flight += 1
+            if self._in_flight > self._pool_size:
+                self._stats["saturated"] += 1
+            if self._in_flight > self._stats["max_in_flight"]:
+                self._stats["max_in_flight"] = self._in_flight
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            return call(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            elapsed_ms = elapsed * 1000
+            REPLY_SECONDS.observe(elapsed, "error" if failed else "ok")
+            with self._lock:
+                self._in_flight -= 1
+                self._stats["calls"] += 1
+                self._stats["errors"] += failed
+                self._stats["total_ms"] += elapsed_ms
+                if elapsed_ms > self._stats["max_ms"]:
+                    self._stats["max_ms"] = elapsed_ms
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._api, name)
+
+    def _reset_after_fork(self) -> None:
+        self._api_client.rest_client.pool_manager.clear()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    # --- TLS 連線預熱 ---
+    def warm_up(self, connections: int) -> None:
+        """
+        在背景執行緒先建立 connections 條 TLS 連線並放回連線池。
+        連線不能跨 fork 共用，所以以 PID 判斷，每個 worker 各自預熱一次。
+        """
+        if connections <= 0 or self._warmed_pid == os.getpid():
+            return
+        self._warmed_pid = os.getpid()
+        threading.Thread(target=self._warm_up, args=(connections,), name="line-api-warmup", daemon=True).start()
+
+    def _warm_up(self, connections: int) -> None:
+        # 與 ApiClient 相同：configuration.host 有設定就用它，否則用 MessagingApi 的預設主機
+        host = self._api_client.configuration.host or self._api.line_base_path
+        started = time.perf_counter()
+        pool = self._api_client.rest_client.pool_manager.connection_from_url(host)
+        timeout = urllib3.Timeout(connect=self._timeout[0], read=self._timeout[1])
+        responses = []
+        try:
+            # 每個 HEAD 請求都先不歸還連線，下一個請求才會另開一條 TLS 連線；回應內容（多半是 404）不重要
+            for _ in range(min(connections, self._pool_size)):
+                responses.append(pool.urlopen(
+                    "HEAD", "/", preload_content=False, release_conn=False,
+                    retries=False, redirect=False, timeout=timeout
+                ))
+        except Exception as e:
+            logger.warning("LINE API 連線預熱失敗：%s", e)
+            return
+        finally:
+            # 不論成功與否都放回連線池，避免佔住連線池的位置
+            for response in responses:
+                response.release_conn()
+        logger.info(
+            "LINE API 已預熱 %d 條連線，耗時 %.1f ms",
+            len(responses), (time.perf_counter() - started) * 1000
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["in_flight"] = self._in_flight
+        calls = snapshot["calls"]
+        snapshot["avg_ms"] = round(snapshot["total_ms"] / calls, 2) if calls else 0.0
+        snapshot["total_ms"] = round(snapshot["total_ms"], 2)
+        snapshot["max_ms"] = round(snapshot["max_ms"], 2)
+        snapshot["pool_size"] = self._pool_size
+        return snapshot
@@ -3,24 +3,19 @@
 『美食推薦』第一層入口選單：
 - 當使用者輸入「美食推薦」時，顯示三大風格分類按鈕。
 - 以 Flex Message 氣泡形式建構，包含圖片、標題、描述與三個按鈕的互動式選單。
-- 將 UI 組裝集中在此函式，方便未來替換圖像或文字。
+- 將 UI 組裝集中在此模組，方便未來替換圖像或文字。
+- 選單內容固定，開機時組好一次放進 handlers/flex_registry.py，回覆時只查表。
 """
 # --- 套件與 Logger ---
 import logging
-from linebot.v3.messaging.models import (
-    FlexMessage, FlexContainer, ReplyMessageRequest
-)
 
-logger = logging.getLogger(__name__)
+from handlers import flex_registry
+from handlers.raw_reply import flex_message, send_reply
 
-# --- 定義 reply_menu 函式，用於回覆使用者主選單 ---
-def reply_menu(event, messaging_api):
-    """
-    event：  LINE Webhook 事件，包含 reply_token。
-    messaging_api： MessagingApi 物件，用於發送回覆訊息。
-    """
-    logger.debug("進入 reply_menu() 函式") # 協助追蹤流程
+logger = logging.getLogger(__name__)
 
+# --- 組主選單訊息（只在建立登錄表時執行一次）---
+def _build_menu_message() -> dict:
     # --- 定義 Flex Message 氣泡卡片 JSON 結構 ---
     """
     使用一致的氣泡結構：hero 圖片 + body 文字 + 多顆按鈕。
@@ -91,22 +86,22 @@ def reply_menu(event, messaging_api):
         }
     }
 
-    # --- 建立 FlexMessage 物件 ---
-    # 將定義好的 JSON 字典轉換為 LineBot SDK 的 FlexMessage 物件
-    flex_message = FlexMessage(
-        alt_text="請選擇想要推薦的風格餐廳：", # 當使用者環境不支援 Flex Message 時顯示的替代文字
-        contents=FlexContainer.from_dict(flex_json)  # 正確轉換方式：將 JSON 字典轉換為 FlexContainer 物件
-    )
+    # --- 組成 Flex 訊息 (LINE API 格式的 dict) ---
+    # alt_text：當使用者環境不支援 Flex Message 時顯示的替代文字
+    return flex_message("請選擇想要推薦的風格餐廳：", flex_json)
 
-    logger.debug("準備呼叫 reply_message")
+flex_registry.register("menu", _build_menu_message)
+
+# --- 定義 reply_menu 函式，用於回覆使用者主選單 ---
+def reply_menu(event, messaging_api):
+    """
+    event：  LINE Webhook 事件，包含 reply_token。
+    messaging_api： MessagingApi 物件，用於發送回覆訊息。
+    """
+    logger.debug("進入 reply_menu() 函式") # 協助追蹤流程
 
     # --- 回覆訊息給使用者 ---
-    # 使用 messaging_api 回覆訊息
-    messaging_api.reply_message(
-        ReplyMessageRequest(
-            reply_token=event.reply_token, # 每個事件都有一個唯一的 reply_token，用於回覆該事件
-            messages=[flex_message]  # 回覆的訊息內容，必須是一個訊息物件的list (即使只有一個)
-        )
-    )
+    # 直接取用登錄表中組好的選單
+    send_reply(messaging_api, event.reply_token, [flex_registry.get("menu")])
 
-    logger.debug("已呼叫 reply_message")
\ No newline at end of file
+    logger.debug("已送出主選單")
@@ -0,0 +1,161 @@
+# metrics.py
+"""
+Prometheus 文字格式的指標：
+- 不依賴 prometheus_client，只實作本專案用到的 Counter 與 Histogram。
+- 每個指標各自一把鎖，臨界區只有幾個整數加法，正式環境可以常駐開啟。
+- render() 輸出 /metrics 的內容；/stats 的數值也會轉成 gauge 一併輸出。
+"""
+# --- 套件匯入 ---
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 預設的延遲分桶（秒）：涵蓋字典查詢到 LINE API 逾時
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+# --- Counter ---
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = self._header()
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+# --- Histogram ---
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {} # labels → [各分桶計數..., +Inf 計數, 總和]
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        index = bisect.bisect_left(self._buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self._buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += seconds
+
+    @contextmanager
+    def time(self, *labels: str):
+        """with HISTOGRAM.time("label"): ... 量測區塊耗時（出錯也會記錄）。"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def timed(self, *labels: str):
+        """裝飾器版本的 time()。"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(*labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series_list = [(labels, list(series)) for labels, series in self._series.items()]
+        lines = self._header()
+        for labels, series in series_list:
+            cumulative = 0
+            for bound, count in zip(self._buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                le_label = 'le="' + le + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le_label)} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {series[-1]}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+# --- 本專案的指標 ---
+WEBHOOK_SECONDS = Histogram("linebot_webhook_seconds", "Time spent handling a /callback request", ["mode"])
+WEBHOOK_REQUESTS = Counter("linebot_webhook_requests_total", "Webhook requests by result", ["result"])
+SIGNATURE_SECONDS = Histogram("linebot_signature_verify_seconds", "Time spent verifying X-Line-Signature")
+DISPATCH_SECONDS = Histogram("linebot_dispatch_seconds", "Time spent in each dispatch layer", ["layer"])
+DATA_QUERY_SECONDS = Histogram("linebot_data_query_seconds", "Time spent in data_loader queries", ["query"])
+DATA_RELOAD_SECONDS = Histogram("linebot_data_reload_seconds", "Background store reload (read + index build) duration", ["result"])
+FLEX_BUILD_SECONDS = Histogram("linebot_flex_build_seconds", "Time spent building Flex messages", ["builder"])
+FAST_PATH_EVENTS = Counter("linebot_fast_path_events_total", "Webhook events parsed by the fast path or handed to the SDK", ["parser"])
+BUNDLE_LOOKUPS = Counter("linebot_reply_bundle_lookups_total", "Reply bundle lookups by result", ["result"])
+REPLY_SECONDS = Histogram("linebot_reply_message_seconds", "Outbound reply_message latency", ["result"])
+FIRST_REPLY_SECONDS = Histogram(
+    "linebot_first_reply_seconds", "Time from process start to its first reply, by route kind (static / data)", ["kind"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+
+# --- /stats 數值轉 gauge ---
+def _stats_to_gauges(stats: dict) -> List[str]:
+    """
+    {"webhook_queue": {"depth": 3}} → linebot_webhook_queue_depth 3
+    {"reply_deadline": {"handler": {"expired": 1}}} → linebot_reply_deadline_expired{key="handler"} 1
+    """
+    lines = []
+    for section, values in stats.items():
+        if not isinstance(values, dict):
+            continue
+        for key, value in values.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines.append(f"linebot_{section}_{key} {value}")
+            elif isinstance(value, dict):
+                for sub_key, sub_value in value.items():
+                    if isinstance(sub_value, (int, float)) and not isinstance(sub_value, bool):
+                        lines.append(f'linebot_{section}_{sub_key}{{key="{_escape(key)}"}} {sub_value}')
+    return lines
+
+def render(stats: Optional[dict] = None) -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    if stats:
+        lines.extend(_stats_to_gauges(stats))
+    return "\n".join(lines) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
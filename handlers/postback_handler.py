@@ -2,79 +2,112 @@
 """
 處理 LINE PostbackEvent : 
 - 支援「查看店家資訊」與「分享店家」兩種自訂 action。
-- 解析 URL query-string 格式的 data 後路由至對應 helper。
+- data 格式為「action:店家 ID」（例如 view:ChIJ...），店家 ID 見 data_loader.store_id()；
+  只用 str.partition 切開，不經 parse_qs。舊版 query-string 格式（action=view_info&shop_id=店名）仍可解析。
+- 每次點擊只查一次資料，查到的整筆資料直接交給回覆函式。
 """
 # --- 匯入套件與 Logger ---
 import logging
 import urllib.parse
+from typing import Optional, Tuple
 
 from linebot.v3.messaging import MessagingApi
 from linebot.v3.messaging.models import TextMessage, ReplyMessageRequest
 from linebot.v3.webhooks.models import PostbackEvent
 
-from handlers.data_loader import get_store_info_by_name
-from handlers.store_detail_reply import reply_store_detail
+from handlers.data_loader import get_store_by_id, get_store_info_by_name
+from handlers.store_detail_reply import reply_store_info
+from handlers.metrics import DISPATCH_SECONDS
+from handlers.raw_reply import text_message, send_reply
+from handlers.reply_bundle import reply_from_bundle, POSTBACK_PREFIX
+from handlers.cold_start import ensure_data, record_first_reply, DATA
 
 logger = logging.getLogger(__name__)
 
+# --- postback data 的產生與解析 ---
+VIEW_INFO = "view"
+SHARE_SHOP = "share"
+# 舊版按鈕的 action 名稱 → 目前的 action
+_LEGACY_ACTIONS = {"view_info": VIEW_INFO, "share_shop": SHARE_SHOP}
+
+def postback_data(action: str, shop_id: str) -> str:
+    """組按鈕的 postback data，例如 postback_data(VIEW_INFO, "ChIJ...") → "view:ChIJ..."。"""
+    return f"{action}:{shop_id}"
+
+def parse_postback_data(data: str) -> Tuple[str, str, bool]:
+    """
+    回傳 (action, 店家 ID 或店名, 是否為舊版格式)。
+    舊版格式 action=view_info&shop_id=<URL 編碼店名> 的第三個值為 True，此時第二個值是店名。
+    """
+    if not data.startswith("action="):
+        action, _, shop_id = data.partition(":")
+        return action, shop_id, False
+
+    fields = {}
+    for pair in data.split("&"):
+        key, _, value = pair.partition("=")
+        fields.setdefault(key, value)
+    action = _LEGACY_ACTIONS.get(fields["action"], fields["action"])
+    shop_name = urllib.parse.unquote(fields.get("shop_id") or fields.get("shop_name") or "")
+    return action, shop_name, True
+
 # --- 入口：handle_postback_event() ---
 def handle_postback_event(event: PostbackEvent, messaging_api: MessagingApi) -> None:
     """
     解析 postback data → 根據 action 做不同操作。
     若解析或處理過程出錯，使用共用 _reply 輕量回覆。
     支援的操作:
-    action=view_info  → 查看店家詳細資訊（地址/電話/評價）
-    action=share_shop → 分享店家資訊
+    view:店家 ID  → 查看店家詳細資訊（地址/電話/評價）
+    share:店家 ID → 分享店家資訊
     """
     try:
         # 1. 解析 postback data
         data_str = event.postback.data or ""
-        data = urllib.parse.parse_qs(data_str)
-        action = data.get("action", [""])[0]
+        # 按鈕產生的 postback 先查預先編譯的回覆包
+        if reply_from_bundle(messaging_api, event.reply_token, POSTBACK_PREFIX + data_str):
+            record_first_reply(DATA)
+            return
+        action, shop_id, legacy = parse_postback_data(data_str)
 
         # 2. 不同 action 分支
-        if action == "view_info":
-            _handle_view_info(event, data, messaging_api)
-        elif action == "share_shop":
-            _handle_share_shop(event, data, messaging_api)
-        else:
+        if action not in (VIEW_INFO, SHARE_SHOP):
             logger.warning("Unknown postback action: %s", action)
             _reply(messaging_api, event.reply_token, "抱歉，無法識別的操作😥")
+            return
+        if not shop_id:
+            raise ValueError("postback data 中缺少店家 ID")
+        if not ensure_data(messaging_api, event.reply_token): # 冷啟動時資料還沒載入，已回覆資料準備中
+            return
+
+        # 查一次資料，整筆交給後續的回覆函式
+        store_info = get_store_info_by_name(shop_id) if legacy else get_store_by_id(shop_id)
+        if action == VIEW_INFO:
+            with DISPATCH_SECONDS.time("postback_view_info"):
+                _handle_view_info(event, store_info, messaging_api)
+        else:
+            with DISPATCH_SECONDS.time("postback_share_shop"):
+                _handle_share_shop(event, store_info, messaging_api)
+        record_first_reply(DATA)
 
     except Exception:
         logger.exception("Error while handling postback")
         _reply(messaging_api, event.reply_token, "操作失敗，請稍候再試 🙏")
 
 # --- 將實際邏輯拆小函式，易於單元測試與維護 ---
-# 查詢並回覆『店家詳細資訊』
-def _handle_view_info(
-    event: PostbackEvent, data: dict[str, list[str]], messaging_api: MessagingApi
-) -> None:
-    shop_id_encoded = data.get("shop_id", [""])[0]
-    shop_id = urllib.parse.unquote(shop_id_encoded)
-    if not shop_id:
-        raise ValueError("postback data 中缺少 shop_id")
-
-    logger.info("將 %s 的店家詳細資訊發送給用戶 %s", shop_id, event.source.user_id)
-
-    store_info = get_store_info_by_name(shop_id)
+# 回覆『店家詳細資訊』
+def _handle_view_info(event: PostbackEvent, store_info: Optional[dict], messaging_api: MessagingApi) -> None:
     if store_info is None:
         _reply(messaging_api, event.reply_token, "抱歉，找不到該店家資訊😥")
         return
 
+    logger.info("將 %s 的店家詳細資訊發送給用戶 %s", store_info["店名"], event.source.user_id)
     # 交由 store_detail_reply.py 產生 Flex 卡片
-    reply_store_detail(shop_id, event, messaging_api)
+    reply_store_info(store_info, event, messaging_api)
 
 # 將推薦文字回覆給使用者，讓使用者可轉傳給好友
-def _handle_share_shop(
-    event: PostbackEvent, data: dict[str, list[str]], messaging_api: MessagingApi
-) -> None:
-    shop_name_encoded = data.get("shop_name", [""])[0]
-    shop_name = urllib.parse.unquote(shop_name_encoded)
-
-    store_info = get_store_info_by_name(shop_name)
+def _handle_share_shop(event: PostbackEvent, store_info: Optional[dict], messaging_api: MessagingApi) -> None:
     if not store_info:
-        _reply(messaging_api, event.reply_token, f"抱歉，找不到 {shop_name} 的資訊，無法分享😥")
+        _reply(messaging_api, event.reply_token, "抱歉，找不到該店家的資訊，無法分享😥")
         return
 
     # 可以自訂分享訊息格式
@@ -87,7 +120,7 @@ def _handle_share_shop(
         f"評論：{store_info.get('評論', '無')}\n"
         f"快去看看吧！🏃‍♀️"
     )
-    _reply(messaging_api, event.reply_token, share_text)
+    send_reply(messaging_api, event.reply_token, [text_message(share_text)])
 
 # 包裝簡易文字回覆：統一呼叫，減少重複碼
 def _reply(messaging_api: MessagingApi, reply_token: str, text: str) -> None:
@@ -0,0 +1,81 @@
+# rate_limiter.py
+"""
+每位使用者的頻率限制 (token bucket)：
+- 在 dispatch_event / handle_postback_event 之前檢查，避免連點輪播按鈕時反覆查詢 CSV、組 Flex。
+- 每位使用者一個桶子，每秒補充 rate 個 token，最多累積 burst 個。
+- 桶子表以 LRU 淘汰最久沒動作的使用者，記憶體用量有上限。
+"""
+# --- 套件與 Logger 初始化 ---
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from linebot.v3.messaging.models import TextMessage, ReplyMessageRequest
+
+from handlers.webhook_events import event_owner
+
+logger = logging.getLogger(__name__)
+
+# 超過限制時的固定回覆：建立一次重複使用，不必每次組訊息
+THROTTLED_MESSAGE = TextMessage(text="點得太快了😵 請稍等一下再試～")
+
+# --- Token bucket ---
+class UserRateLimiter:
+    """allow(user_id) 回傳 True 表示可以處理；rate <= 0 代表不限制。"""
+
+    def __init__(self, rate: float, burst: int, max_users: int):
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._max_users = max_users
+        self._buckets: "OrderedDict[str, list]" = OrderedDict() # user_id → [剩餘 token, 上次補充時間]
+        self._lock = threading.Lock()
+        self._stats = {"allowed": 0, "limited": 0, "evicted": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._rate > 0
+
+    def allow(self, user_id: Optional[str]) -> bool:
+        if not self.enabled or not user_id:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = [float(self._burst), now]
+                if len(self._buckets) > self._max_users:
+                    self._buckets.popitem(last=False) # 淘汰最久沒動作的使用者
+                    self._stats["evicted"] += 1
+            else:
+                self._buckets.move_to_end(user_id)
+                bucket[0] = min(self._burst, bucket[0] + (now - bucket[1]) * self._rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self._stats["allowed"] += 1
+                return True
+
+            self._stats["limited"] += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["tracked_users"] = len(self._buckets)
+        snapshot["rate"] = self._rate
+        snapshot["burst"] = self._burst
+        return snapshot
+
+# --- 超過限制時的處理 ---
+def reply_throttled(event, messaging_api, mode: str) -> None:
+    """mode="reply" 時回覆固定文字；"drop" 則直接丟棄事件。"""
+    logger.info("使用者 %s 操作過於頻繁，事件已%s", event_owner(event), "回覆提示" if mode == "reply" else "丟棄")
+    if mode != "reply" or not getattr(event, "reply_token", None):
+        return
+    messaging_api.reply_message(
+        ReplyMessageRequest(reply_token=event.reply_token, messages=[THROTTLED_MESSAGE])
+    )
@@ -0,0 +1,82 @@
+# raw_reply.py
+"""
+預先序列化的回覆路徑：
+- handler 直接組 LINE API 的 JSON（camelCase dict），不經 FlexContainer.from_dict 逐節點的 pydantic 驗證，
+  也不必再由 SDK 把模型轉回 dict、json.dumps 一次。
+- compact() 拿掉與 LINE 預設值相同的鍵（例如 text 的 size="md"），縮小 payload。
+- encode_reply() 以 orjson 序列化成 bytes，交給 InstrumentedMessagingApi.reply_raw() 直接送到 reply 端點。
+- REPLY_VALIDATE=True（預設跟著 DEBUG）時才用 SDK 模型驗證一次，開發時仍能抓出欄位錯誤。
+- messaging_api 沒有 reply_raw()（預熱用的替身、非同步入口的收集器 …）時，退回 reply_message()。
+"""
+# --- 套件匯入 ---
+import logging
+from typing import Any, Dict, List
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError: # 沒裝 orjson 時退回標準 json
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+from linebot.v3.messaging.models import ReplyMessageRequest
+
+from config import REPLY_VALIDATE
+
+logger = logging.getLogger(__name__)
+
+# --- Flex 元件的預設值（與 LINE 文件相同），相同的鍵不必送出 ---
+FLEX_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "text": {"size": "md", "weight": "regular", "style": "normal", "wrap": False},
+    "button": {"style": "link", "height": "md"},
+    "image": {"size": "md", "aspectRatio": "1:1", "aspectMode": "fit", "animated": False},
+}
+
+def compact(node):
+    """遞迴移除值為 None 或等於 FLEX_DEFAULTS 預設值的鍵。"""
+    if isinstance(node, list):
+        return [compact(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    defaults = FLEX_DEFAULTS.get(node.get("type"), {})
+    return {
+        key: compact(value)
+        for key, value in node.items()
+        if value is not None and not (key in defaults and defaults[key] == value)
+    }
+
+# --- 訊息物件 ---
+def flex_message(alt_text: str, contents: dict) -> dict:
+    return {"type": "flex", "altText": alt_text, "contents": compact(contents)}
+
+def text_message(text: str) -> dict:
+    return {"type": "text", "text": text}
+
+def message_size(message) -> int:
+    """訊息序列化後的位元組數（快取估算記憶體用）；None 為 0。"""
+    return len(_dumps(message)) if message is not None else 0
+
+# --- 序列化與送出 ---
+def encode_reply(reply_token: str, messages: List[dict]) -> bytes:
+    """回傳 reply 端點的 request body；REPLY_VALIDATE=True 時先以 SDK 模型驗證。"""
+    payload = {"replyToken": reply_token, "messages": messages}
+    if REPLY_VALIDATE:
+        ReplyMessageRequest.from_dict(payload) # 欄位錯誤時拋出 pydantic ValidationError
+    return _dumps(payload)
+
+def encode_prebuilt_reply(reply_token: str, messages_json: bytes) -> bytes:
+    """messages 已經序列化好（回覆包）時，只補上 replyToken。"""
+    body = b'{"replyToken":' + _dumps(reply_token) + b',"messages":' + messages_json + b'}'
+    if REPLY_VALIDATE:
+        ReplyMessageRequest.from_json(body.decode("utf-8"))
+    return body
+
+def send_reply(api, reply_token: str, messages: List[dict]) -> None:
+    """有 reply_raw() 就直接送 bytes；否則轉成 SDK 模型走 reply_message()。"""
+    reply_raw = getattr(api, "reply_raw", None)
+    if reply_raw is not None:
+        reply_raw(encode_reply(reply_token, messages))
+    else:
+        api.reply_message(ReplyMessageRequest.from_dict({"replyToken": reply_token, "messages": messages}))
@@ -3,16 +3,18 @@
 第三層流程：
 - 當使用者選定某『料理類型』後，顯示區域選擇輪播 (Carousel)。
 - 讓使用者點擊區域按鈕，進入第四層「料理類型‑區域 → 店家列表」。
+- 每種料理類型的輪播開機時組好一次放進 handlers/flex_registry.py，回覆時只查表。
 """
 # --- 匯入套件與 Logger ---
 import logging
 
 from linebot.v3.messaging import MessagingApi
-from linebot.v3.messaging.models import (
-    FlexMessage, FlexContainer, ReplyMessageRequest
-)
 from linebot.v3.webhooks.models import MessageEvent
 
+from constants import FOOD_TYPES, REGIONS
+from handlers import flex_registry
+from handlers.raw_reply import flex_message, send_reply
+
 logger = logging.getLogger(__name__)
 
 # --- 定義 reply_region_carousel 函式，用於回覆使用者選擇特定料理類型後的區域選單 ---
@@ -67,22 +69,25 @@ def reply_region_carousel(category, regions):
 
     # --- 返回 Flex Carousel 的 JSON 結構 ---
     # 這個函式的最終目的是構建並返回整個 Carousel 結構，而不是直接發送
-    # 主程式會接收這個 JSON 結構，然後將其轉換為 FlexMessage 物件並發送
+    # 由 _build_region_message() 包成 Flex 訊息後放進登錄表
     return {
         "type": "carousel", # Flex Message 的類型為 'carousel' (輪播)
         "contents": bubbles # 輪播的內容，即前面創建的氣泡列表
     }
 
+def _build_region_message(food_type: str, regions) -> dict:
+    return flex_message("請選擇區域", reply_region_carousel(food_type, regions))
+
+for _food_type in FOOD_TYPES:
+    flex_registry.register(f"region:{_food_type}", lambda food_type=_food_type: _build_region_message(food_type, REGIONS))
+
 # --- 對外 API：reply_region_selector() ---
 # 直接回覆 Flex Carousel 給使用者。
 def reply_region_selector(food_type: str, regions, event: MessageEvent, api: MessagingApi) -> None:
     """顯示區域 Carousel 供使用者選擇。"""
-    carousel_json = reply_region_carousel(food_type, regions)
-    flex_msg = FlexMessage(
-        alt_text="請選擇區域",
-        contents=FlexContainer.from_dict(carousel_json)
-    )
-    api.reply_message(
-        ReplyMessageRequest(reply_token=event.reply_token, messages=[flex_msg])
-    )
+    # 預設的 REGIONS 直接查表；傳入其他區域清單時才現場組
+    flex_msg = flex_registry.get(f"region:{food_type}") if list(regions) == REGIONS else None
+    if flex_msg is None:
+        flex_msg = _build_region_message(food_type, regions)
+    send_reply(api, event.reply_token, [flex_msg])
     logger.debug("區域選單已送出 for %s", food_type)
\ No newline at end of file
@@ -0,0 +1,94 @@
+# render_cache.py
+"""
+依資料版本失效的 LRU 快取，用於組好的店家輪播：
+- key 由呼叫端決定，例如 (類型, 區域, 張數)；資料版本 (data_loader.data_version()) 改變時整個快取清空。
+- 同一個 key 同時有多個請求 miss 時只計算一次 (single-flight)，其他請求等待同一個結果。
+- 容量以筆數為上限，淘汰最久沒用到的項目；另以序列化後的位元組數估算記憶體用量。
+"""
+# --- 套件與 Logger 初始化 ---
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+class RenderCache:
+    """get_or_compute(key, version, compute)；max_entries <= 0 代表不快取。"""
+
+    def __init__(self, max_entries: int, sizeof: Callable[[Any], int], name: str = "render-cache"):
+        self._max_entries = max_entries
+        self._sizeof = sizeof
+        self._name = name
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict() # key → (值, 估算位元組數)
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._version = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "collapsed": 0, "evicted": 0, "invalidations": 0}
+
+    def get_or_compute(self, key: Hashable, version: int, compute: Callable[[], Any]) -> Any:
+        if self._max_entries <= 0:
+            return compute()
+
+        key = (version, key) # 舊版本的計算結果不會被新版本的請求共用
+        with self._lock:
+            if version != self._version:
+                self._invalidate(version)
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            waiting = self._in_flight.get(key)
+            if waiting is None:
+                future = self._in_flight[key] = Future()
+                self._stats["misses"] += 1
+            else:
+                self._stats["collapsed"] += 1
+        if waiting is not None:
+            return waiting.result() # 已有人在算，等同一個結果（出錯時一併拋出）
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        size = self._sizeof(value)
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if version == self._version: # 計算期間資料已更新就不放進快取
+                self._entries[key] = (value, size)
+                self._bytes += size
+                while len(self._entries) > self._max_entries:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._bytes -= evicted_size
+                    self._stats["evicted"] += 1
+        future.set_result(value)
+        return value
+
+    def _invalidate(self, version: int) -> None:
+        """資料版本改變：清空快取（呼叫端須持有 _lock）。"""
+        if self._entries:
+            logger.info("%s：資料版本 %s → %s，清除 %d 筆快取", self._name, self._version, version, len(self._entries))
+            self._stats["invalidations"] += 1
+        self._entries.clear()
+        self._bytes = 0
+        self._version = version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["entries"] = len(self._entries)
+            snapshot["bytes"] = self._bytes
+            snapshot["version"] = self._version
+        lookups = snapshot["hits"] + snapshot["misses"] + snapshot["collapsed"]
+        snapshot["hit_ratio"] = round(snapshot["hits"] / lookups, 4) if lookups else 0.0
+        snapshot["max_entries"] = self._max_entries
+        return snapshot
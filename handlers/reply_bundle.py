@@ -0,0 +1,209 @@
+# reply_bundle.py
+"""
+預先編譯的回覆包 (reply bundle)：
+- 幾乎所有互動都來自本 Bot 自己的按鈕，回覆範圍有限。
+  fetch_data/build_reply_bundle.py 在抓完資料後，把每個按鈕會觸發的回覆都組好，寫成單一檔案。
+- 以觸發文字（例如「必吃便當-北區」）或 "postback:" + postback data 為 key，值為序列化好的 messages JSON。
+- Web 行程以 mmap 開啟，命中時直接查表送出、完全不組訊息；沒有命中就照常走即時產生的流程。
+- 檔頭記錄建檔時 CSV 的 SHA-256 (data_loader.dataset_digest()) 與訊息模板版本 (template_version())；
+  任一項與目前不符（資料已更新，或部署了改過訊息內容的程式碼）就代表回覆包過期，不使用。
+
+檔案格式：MAGIC | 檔頭長度 (uint32, big-endian) | 檔頭 JSON | payload 區
+檔頭 JSON：{"format": 2, "dataset": CSV 的 SHA-256, "template": 模板版本, "built_at": ..., "index": {key: [offset, length]}}
+"""
+# --- 套件與 Logger 初始化 ---
+import os
+import json
+import mmap
+import time
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional
+
+from config import REPLY_BUNDLE_PATH
+from handlers.data_loader import data_version, dataset_digest
+from handlers.metrics import BUNDLE_LOOKUPS
+from handlers.raw_reply import encode_prebuilt_reply
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LINEBUNDLE"
+FORMAT_VERSION = 2
+POSTBACK_PREFIX = "postback:"
+
+# 決定回覆內容的程式碼（相對專案根目錄）；任何一個改動，模板版本就不同，舊回覆包不再使用
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_SOURCES = (
+    "constants.py",
+    "handlers/category_reply.py",
+    "handlers/dispatcher.py",
+    "handlers/flex_registry.py",
+    "handlers/menu_reply.py",
+    "handlers/postback_handler.py",
+    "handlers/region_reply.py",
+    "handlers/restaurant_carousel_reply.py",
+    "handlers/router.py",
+    "handlers/store_detail_reply.py",
+    "handlers/welcome_flex_message.py",
+)
+_template_version: Optional[str] = None
+
+def template_version() -> str:
+    """訊息模板版本：TEMPLATE_SOURCES 內容的 SHA-256（前 16 碼），同一行程只計算一次。"""
+    global _template_version
+    if _template_version is None:
+        digest = hashlib.sha256()
+        for name in TEMPLATE_SOURCES:
+            digest.update(name.encode("utf-8"))
+            with open(os.path.join(_ROOT, name), "rb") as f:
+                digest.update(f.read())
+        _template_version = digest.hexdigest()[:16]
+    return _template_version
+
+# --- 寫入 ---
+def write_bundle(path: str, entries: Dict[str, bytes], dataset: str) -> int:
+    """
+    把 {key: messages JSON bytes} 寫成回覆包，回傳寫入的 payload 數。
+    內容相同的 payload 只存一份；先寫不重複的暫存檔再 os.replace()，正在 mmap 舊檔的行程不受影響。
+    """
+    index = {}
+    offsets: Dict[bytes, list] = {}
+    blob = bytearray()
+    for key, payload in entries.items():
+        location = offsets.get(payload)
+        if location is None:
+            location = offsets[payload] = [len(blob), len(payload)]
+            blob += payload
+        index[key] = location
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "dataset": dataset,
+        "template": template_version(),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "index": index,
+    }, ensure_ascii=False).encode("utf-8")
+
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack(">I", len(header)))
+            f.write(header)
+            f.write(blob)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return len(offsets)
+
+# --- 讀取 ---
+class ReplyBundle:
+    """以 mmap 開啟的回覆包；get(key) 回傳 messages JSON bytes 或 None。"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._mm[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} 不是回覆包檔案")
+            start = len(MAGIC)
+            (header_length,) = struct.unpack(">I", self._mm[start:start + 4])
+            header = json.loads(self._mm[start + 4:start + 4 + header_length])
+            if header.get("format") != FORMAT_VERSION:
+                raise ValueError(f"不支援的回覆包格式：{header.get('format')}")
+        except (ValueError, struct.error):
+            self._mm.close()
+            raise ValueError(f"{path} 不是可用的回覆包檔案") from None
+        self.dataset = header["dataset"]
+        self.template = header.get("template")
+        self.built_at = header.get("built_at")
+        self._index = header["index"]
+        self._base = start + 4 + header_length
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, key: str) -> Optional[bytes]:
+        location = self._index.get(key)
+        if location is None:
+            return None
+        offset, length = location
+        try:
+            return self._mm[self._base + offset:self._base + offset + length]
+        except ValueError: # 其他執行緒重新載入時已關閉這份 mmap：當作沒命中，改為即時產生
+            return None
+
+    def close(self) -> None:
+        self._mm.close()
+
+# --- Web 行程使用的單一實例 ---
+_bundle: Optional[ReplyBundle] = None
+_checked_version = None
+_enabled = bool(REPLY_BUNDLE_PATH)
+_lock = threading.Lock()
+
+def disable() -> None:
+    """建檔時呼叫：改走即時產生的流程，才能錄下真正的回覆內容。"""
+    global _enabled
+    _enabled = False
+
+def get_bundle() -> Optional[ReplyBundle]:
+    """
+    回傳可用的回覆包；沒有檔案、格式不符或與目前資料不一致時回傳 None。
+    資料版本改變（重新載入 CSV）時重新開檔並比對一次。
+    """
+    global _bundle, _checked_version
+    if not _enabled:
+        return None
+    version = data_version()
+    if version == _checked_version:
+        return _bundle
+    with _lock:
+        if version != _checked_version:
+            previous, _bundle = _bundle, _open_bundle()
+            _checked_version = version
+            if previous is not None:
+                previous.close() # 釋放舊檔的 mmap；否則每次重新載入都留下一份對應
+    return _bundle
+
+def _open_bundle() -> Optional[ReplyBundle]:
+    if not os.path.exists(REPLY_BUNDLE_PATH):
+        logger.info("找不到回覆包 %s，全部即時產生回覆", REPLY_BUNDLE_PATH)
+        return None
+    try:
+        bundle = ReplyBundle(REPLY_BUNDLE_PATH)
+    except (OSError, ValueError) as e:
+        logger.warning("回覆包 %s 無法使用：%s", REPLY_BUNDLE_PATH, e)
+        return None
+    if bundle.dataset != dataset_digest():
+        logger.warning("回覆包 %s 與目前的店家資料不符（建於 %s），改為即時產生回覆", REPLY_BUNDLE_PATH, bundle.built_at)
+        bundle.close()
+        return None
+    if bundle.template != template_version():
+        logger.warning("回覆包 %s 的訊息模板版本 %s 與目前程式碼 %s 不符（建於 %s），改為即時產生回覆",
+                       REPLY_BUNDLE_PATH, bundle.template, template_version(), bundle.built_at)
+        bundle.close()
+        return None
+    logger.info("已載入回覆包 %s：%d 個 key（建於 %s）", REPLY_BUNDLE_PATH, len(bundle), bundle.built_at)
+    return bundle
+
+def reply_from_bundle(api, reply_token: str, key: str) -> bool:
+    """key 在回覆包中就直接送出並回傳 True；否則回傳 False，由呼叫端即時產生回覆。"""
+    bundle = get_bundle()
+    reply_raw = getattr(api, "reply_raw", None)
+    if bundle is None or reply_raw is None:
+        return False
+    payload = bundle.get(key)
+    if payload is None:
+        BUNDLE_LOOKUPS.inc("miss")
+        return False
+    BUNDLE_LOOKUPS.inc("hit")
+    reply_raw(encode_prebuilt_reply(reply_token, payload))
+    return True
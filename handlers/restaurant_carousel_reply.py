@@ -3,36 +3,49 @@
 第四層流程：
 - 當使用者選擇「料理類型‑區域」後，回覆對應店家清單 (最多 10 筆) 的 Flex Carousel。
 - 每家店家顯示名稱、營業時間與 3 顆按鈕：查看資訊 / Google 地圖 / 分享店家。
+  postback 按鈕只帶店家 ID（place_id），不帶 URL 編碼的完整店名。
+- 接近回覆期限時只組前幾張卡片；超過期限就不再回覆。
+- 輪播直接組成 LINE API 的 JSON 送出 (handlers/raw_reply.py)，不經 FlexContainer.from_dict 驗證。
+- 組好的輪播放進 LRU 快取，資料重新載入（版本改變）時自動失效。
 """
 # --- 匯入套件與 Logger ---
 import logging
 import urllib.parse
-import pandas as pd
 
 from linebot.v3.messaging import MessagingApi
-from linebot.v3.messaging.models import (
-    TextMessage, FlexMessage, FlexContainer, ReplyMessageRequest
-)
 from linebot.v3.webhooks.models import MessageEvent
 
-from handlers.data_loader import query_by_category_and_district
+from config import DEGRADED_CAROUSEL_SIZE, CAROUSEL_CACHE_SIZE
+from handlers.data_loader import query_by_category_and_district, data_version, store_id
+from handlers.deadline import should_degrade, is_expired
+from handlers.metrics import FLEX_BUILD_SECONDS
+from handlers.postback_handler import postback_data, VIEW_INFO, SHARE_SHOP
+from handlers.raw_reply import flex_message, text_message, send_reply, message_size
+from handlers.render_cache import RenderCache
 
 logger = logging.getLogger(__name__)
 
+# 組合數有限且資料很少變動，同一組 (類型, 區域, 張數) 只在資料版本改變後才重組
+carousel_cache = RenderCache(CAROUSEL_CACHE_SIZE, message_size, name="carousel-cache")
+
 # --- 定義 create_flex_message_by_category_and_district 函式，用於回覆店家輪播 ---
-def create_flex_message_by_category_and_district(category: str, district: str):
+# 計時包含第 1 步的查詢；查詢本身另記在 linebot_data_query_seconds
+@FLEX_BUILD_SECONDS.timed("restaurant_carousel")
+def create_flex_message_by_category_and_district(category: str, district: str, limit: int = 10):
+    """回傳 Flex 訊息的 JSON dict（LINE API 格式）；找不到店家時回傳 None。"""
     # 1. 取資料
-    df = query_by_category_and_district(category, district)
+    stores = query_by_category_and_district(category, district)
 
-    if df.empty:
+    if not stores:
         logger.info(f"找不到 %s 的 %s 店家 😥", district, category)
         return None # 找不到店家時，回傳 None
 
     # 2. 組 Bubble
-    # --- 將前 10 筆資料轉換成 Flex Bubble，組合成 Carousel 並回傳 FlexMessage ---
+    # --- 將前 limit 筆資料轉換成 Flex Bubble，組合成 Carousel 並回傳 FlexMessage ---
     bubbles = []
-    for _, row in df.head(10).iterrows(): # 限制最多 10 筆 (Carousel 上限)
+    for row in stores[:min(limit, 10)]: # 限制最多 10 筆 (Carousel 上限)
         store_name = str(row["店名"])
+        shop_id = store_id(row)
         address = row.get("地址", "")
 
         # 建立 Google Maps 連結：店名 + 地址
@@ -64,7 +77,7 @@ def create_flex_message_by_category_and_district(category: str, district: str):
                     },
                     {
                         "type": "text",
-                        "text": f'營業時間:{str(row["營業時間"])[:60]}' if pd.notna(row["營業時間"]) else "營業時間:無營業時間資料",
+                        "text": f'營業時間:{str(row["營業時間"])[:60]}' if row["營業時間"] is not None else "營業時間:無營業時間資料",
                         "size": "md",
                         "color": "#666666",
                         "wrap": True
@@ -82,7 +95,7 @@ def create_flex_message_by_category_and_district(category: str, district: str):
                                 "action": {
                                     "type": "postback",
                                     "label": "查看資訊",
-                                    "data": f"action=view_info&shop_id={urllib.parse.quote(store_name)}",
+                                    "data": postback_data(VIEW_INFO, shop_id),
                                     "displayText": "查看資訊"
                                 }
                             },
@@ -103,7 +116,7 @@ def create_flex_message_by_category_and_district(category: str, district: str):
                                 "action": {
                                     "type": "postback",
                                     "label": "分享店家",
-                                    "data": f"action=share_shop&shop_name={urllib.parse.quote(store_name)}",
+                                    "data": postback_data(SHARE_SHOP, shop_id),
                                     "displayText": f"分享店家"
                                 }
                             }
@@ -119,11 +132,8 @@ def create_flex_message_by_category_and_district(category: str, district: str):
         logger.info(f"無法建立 Flex Message for %s-%s，bubbles 為空", category, district)
         return None
 
-    # 4. 回傳 FlexMessage 物件，內容是 Carousel
-    return FlexMessage(
-        alt_text=f"{district} 的 {category} 推薦店家",
-        contents=FlexContainer.from_dict({"type": "carousel", "contents": bubbles})
-    )
+    # 4. 回傳 Flex 訊息 (dict)，內容是 Carousel
+    return flex_message(f"{district} 的 {category} 推薦店家", {"type": "carousel", "contents": bubbles})
 
 # --- 對外 API : reply_food_by_type_and_region() ---
 # 由 dispatcher.py 呼叫：若有 FlexMessage → 回覆；若無結果 → 回覆文字提醒
@@ -131,18 +141,19 @@ def reply_food_by_type_and_region(
     category: str, district: str, event: MessageEvent, api: MessagingApi
 ) -> None:
     """依美食類型與區域回覆店家輪播 (Flex Message)。"""
-    carousel = create_flex_message_by_category_and_district(category, district)
+    # 接近 reply token 期限時只組較少張卡片，縮短建構時間
+    limit = DEGRADED_CAROUSEL_SIZE if should_degrade(event, "reply_food_by_type_and_region") else 10
+    carousel = carousel_cache.get_or_compute(
+        (category, district, limit), data_version(),
+        lambda: create_flex_message_by_category_and_district(category, district, limit)
+    )
+
+    if is_expired(event, "reply_food_by_type_and_region"):
+        return # 查詢或組卡片花太久，token 已失效
 
     if carousel is None:
-        api.reply_message(
-            ReplyMessageRequest(
-                reply_token=event.reply_token,
-                messages=[TextMessage(text="目前找不到符合條件的店家喔！")],
-            )
-        )
+        send_reply(api, event.reply_token, [text_message("目前找不到符合條件的店家喔！")])
         logger.debug("類型=%s 區域=%s 找不到店家", category, district)
     else:
-        api.reply_message(
-            ReplyMessageRequest(reply_token=event.reply_token, messages=[carousel])
-        )
+        send_reply(api, event.reply_token, [carousel])
         logger.debug("已回覆 Carousel for %s-%s", category, district)
\ No newline at end of file
@@ -0,0 +1,155 @@
+# router.py
+"""
+文字訊息的路由表：
+- 完全相符 (exact)：dict 查表，O(1)，與已登錄的路由數無關。
+- 後綴 / 前綴 (suffix / prefix)：依長度分組的 dict，只需對每種長度切一次字串查表（長的先查）；
+  成本與後綴的種類數無關，只與不同長度的數目有關。
+- 樣式 (pattern)：正規式，依 priority 由小到大逐一比對，具名群組會交給 handler。
+- 每條路由都有 priority（數字越小越先），不同種類的路由互相衝突時以 priority 決定；
+  完全相符與前後綴只各查一次，樣式只比對 priority 比目前候選更前面的幾條。
+- 每條路由記錄呼叫次數、錯誤次數與累計耗時（stats()），耗時同時記到 linebot_dispatch_seconds{layer=路由名稱}。
+
+handler 的簽名一律為 handler(match, event, messaging_api)，match 為 RouteMatch。
+"""
+# --- 套件匯入 ---
+import re
+import time
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from handlers.metrics import DISPATCH_SECONDS
+
+# --- 路由與比對結果 ---
+class Route:
+    """單一路由：名稱、priority、handler 與統計數字。"""
+    __slots__ = ("name", "priority", "handler", "calls", "errors", "seconds")
+
+    def __init__(self, name: str, priority: int, handler: Callable):
+        self.name = name
+        self.priority = priority
+        self.handler = handler
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+class RouteMatch(NamedTuple):
+    route: Route
+    text: str # 使用者輸入（已去除前後空白）
+    groups: Dict[str, str] # 樣式路由的具名群組；後綴 / 前綴路由為 {"affix": 相符的字串}
+
+# --- Router ---
+class Router:
+    def __init__(self):
+        self._routes: Dict[str, Route] = {}
+        self._exact: Dict[str, Route] = {}
+        self._suffixes: Dict[str, Route] = {}
+        self._prefixes: Dict[str, Route] = {}
+        self._patterns: List[Tuple[int, int, re.Pattern, Route]] = []
+        self._suffix_lengths: Tuple[int, ...] = ()
+        self._prefix_lengths: Tuple[int, ...] = ()
+        self._lock = threading.Lock()
+
+    def _route(self, name: str, priority: int, handler: Callable) -> Route:
+        route = self._routes.get(name)
+        if route is None:
+            route = self._routes[name] = Route(name, priority, handler)
+        elif route.handler is not handler or route.priority != priority:
+            raise ValueError(f"路由 {name} 已登錄為不同的 handler 或 priority")
+        return route
+
+    # --- 登錄 ---
+    def exact(self, texts, handler: Callable, name: str, priority: int = 0) -> None:
+        route = self._route(name, priority, handler)
+        for text in ([texts] if isinstance(texts, str) else texts):
+            self._exact[text] = route
+
+    def suffix(self, suffixes, handler: Callable, name: str, priority: int = 0) -> None:
+        route = self._route(name, priority, handler)
+        for suffix in ([suffixes] if isinstance(suffixes, str) else suffixes):
+            self._suffixes[suffix] = route
+        self._suffix_lengths = self._lengths(self._suffixes)
+
+    def prefix(self, prefixes, handler: Callable, name: str, priority: int = 0) -> None:
+        route = self._route(name, priority, handler)
+        for prefix in ([prefixes] if isinstance(prefixes, str) else prefixes):
+            self._prefixes[prefix] = route
+        self._prefix_lengths = self._lengths(self._prefixes)
+
+    def pattern(self, regex: str, handler: Callable, name: str, priority: int = 0) -> None:
+        route = self._route(name, priority, handler)
+        # 相同 priority 時依登錄順序
+        self._patterns.append((priority, len(self._patterns), re.compile(regex), route))
+        self._patterns.sort(key=lambda item: item[:2])
+
+    @staticmethod
+    def _lengths(affixes: Dict[str, Route]) -> Tuple[int, ...]:
+        # 長的先查，例如同時登錄「的評論」與「評論」時取「的評論」
+        return tuple(sorted({len(a) for a in affixes}, reverse=True))
+
+    # --- 比對 ---
+    def match(self, text: str) -> Optional[RouteMatch]:
+        """找出 priority 最前面的路由；沒有相符時回傳 None。"""
+        best = self._exact.get(text)
+        affix = None
+
+        for length in self._suffix_lengths:
+            route = self._suffixes.get(text[-length:])
+            if route is not None:
+                if best is None or route.priority < best.priority:
+                    best, affix = route, text[-length:]
+                break
+
+        for length in self._prefix_lengths:
+            route = self._prefixes.get(text[:length])
+            if route is not None:
+                if best is None or route.priority < best.priority:
+                    best, affix = route, text[:length]
+                break
+
+        for priority, _, regex, route in self._patterns:
+            if best is not None and priority >= best.priority:
+                break
+            m = regex.fullmatch(text)
+            if m is not None:
+                return RouteMatch(route, text, m.groupdict())
+        if best is None:
+            return None
+        return RouteMatch(best, text, {"affix": affix} if affix is not None else {})
+
+    def dispatch(self, text: str, event, messaging_api) -> Optional[Route]:
+        """比對並執行 handler，回傳被執行的路由；沒有相符時回傳 None（由呼叫端處理 fallback）。"""
+        matched = self.match(text)
+        if matched is None:
+            return None
+        self.call(matched, event, messaging_api)
+        return matched.route
+
+    def call(self, matched: RouteMatch, event, messaging_api) -> None:
+        route = matched.route
+        started = time.perf_counter()
+        failed = False
+        try:
+            route.handler(matched, event, messaging_api)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            DISPATCH_SECONDS.observe(elapsed, route.name)
+            with self._lock:
+                route.calls += 1
+                route.errors += failed
+                route.seconds += elapsed
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {
+                    "priority": route.priority,
+                    "calls": route.calls,
+                    "errors": route.errors,
+                    "seconds_total": round(route.seconds, 6),
+                    "avg_ms": round(route.seconds / route.calls * 1000, 3) if route.calls else 0.0,
+                }
+                for name, route in self._routes.items()
+            }
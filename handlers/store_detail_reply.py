@@ -1,40 +1,34 @@
 # store_detail_reply.py
 """
 第五層流程：
-- 解析『店名 + (地址|電話|評價)』文字指令。
+- 解析『店名 + (地址|電話|評價)』文字指令；postback 已查到資料時直接呼叫 reply_store_info()。
 - 回覆對應欄位的店家詳細資訊 Flex Message。
 - 若 CSV 無該店家，回覆友善文字提示。
+- Flex 直接組成 LINE API 的 JSON 送出 (handlers/raw_reply.py)，不經 FlexContainer.from_dict 驗證。
 """
 # --- 匯入套件與 Logger ---
 import logging
-import pandas as pd
 from typing import Dict, Optional
 
 from linebot.v3.messaging import MessagingApi
-from linebot.v3.messaging.models import (
-    TextMessage, FlexMessage,
-    FlexContainer, ReplyMessageRequest
-)
 from linebot.v3.webhooks.models import MessageEvent
 
-from handlers.data_loader import get_store_info_by_name
+from handlers.data_loader import get_store_info_by_name, REVIEWS_KEY
+from handlers.metrics import FLEX_BUILD_SECONDS
+from handlers.raw_reply import flex_message, text_message, send_reply
 
 logger = logging.getLogger(__name__)
 
 # --- 定義 build_store_detail_flex 函式，用於回覆店家地址 / 電話 / 評價 ---
+@FLEX_BUILD_SECONDS.timed("store_detail")
 def build_store_detail_flex(
-    store_name: str, store_info: Dict[str, str]) -> FlexMessage:
-    """建立店家詳細資訊的 Flex Message。"""
+    store_name: str, store_info: Dict[str, str]) -> dict:
+    """建立店家詳細資訊的 Flex 訊息（LINE API 格式的 dict）。"""
     address = store_info.get("地址", "未知")
     phone = store_info.get("電話", "未知")
 
-    comments = store_info.get("評論", "") or ""
-    # 判斷評論型態，轉成純文字
-    if isinstance(comments, (list, pd.Series)):
-        comments = "\n\n".join(map(str, comments))
-    else:
-        comments = str(comments).strip()
-    preview_lines = comments.split("\n\n")[:2]  # 只取前兩則
+    # 評論在 data_loader 載入時已切成清單
+    preview_lines = store_info.get(REVIEWS_KEY, [])[:2]  # 只取前兩則
     # 因為 Flex Message 文字欄位要是字串，不能是 list，要把 preview_lines 用換行符號串接
     preview_text = "\n".join(preview_lines)
 
@@ -74,10 +68,7 @@ def build_store_detail_flex(
         },
     }
 
-    return FlexMessage(
-        alt_text=f"{store_name} 詳細資訊",
-        contents=FlexContainer.from_dict(bubble)
-    )
+    return flex_message(f"{store_name} 詳細資訊", bubble)
 
 # --- 對外 API : reply_store_detail ---
 # 判斷使用者文字結尾『的地址/電話/評價』→ 擷取店名 → 查資料
@@ -98,18 +89,18 @@ def reply_store_detail(user_text: str, event: MessageEvent, api: MessagingApi) -
     # 2. 查詢資料
     store_info: Optional[dict] = get_store_info_by_name(store_name)
     if not store_info:
-        api.reply_message(
-            ReplyMessageRequest(
-                reply_token=event.reply_token,
-                messages=[TextMessage(text=f"抱歉，找不到 {store_name}{field} 的資訊。")]
-            )
-        )
+        send_reply(api, event.reply_token, [text_message(f"抱歉，找不到 {store_name}{field} 的資訊。")])
         logger.debug("找不到店家：%s", store_name)
         return
 
     # 3. 回覆 Flex Message
+    reply_store_info(store_info, event, api)
+
+# --- 對外 API : reply_store_info ---
+# 呼叫端已經查到整筆資料（例如 postback 以店家 ID 查表）時使用，不再重查
+def reply_store_info(store_info: dict, event: MessageEvent, api: MessagingApi) -> None:
+    """以已查到的店家資料回覆詳細資訊 (Flex Message)。"""
+    store_name = str(store_info["店名"])
     flex_msg = build_store_detail_flex(store_name, store_info)
-    api.reply_message(
-        ReplyMessageRequest(reply_token=event.reply_token, messages=[flex_msg])
-    )
+    send_reply(api, event.reply_token, [flex_msg])
     logger.debug("已回覆店家資訊 detail (Flex): %s", store_name)
\ No newline at end of file
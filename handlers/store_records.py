@@ -0,0 +1,106 @@
+# store_records.py
+"""
+Web 行程使用的店家資料格式（不依賴 pandas）：
+- 以標準函式庫 csv 讀取 TaichungEats_reviews.csv（可為 gzip / zstd 壓縮檔），每家店是一個 StoreRecord（__slots__ + tuple），
+  同一次載入的所有資料共用一份「欄位名稱 → 位置」對照表。
+- 美食類型、區域等重複很多的欄位以 sys.intern() 共用同一個字串物件。
+- 空字串視為沒有資料 (None)；record.get(欄位, 預設值) 在沒有資料時回傳預設值。
+- 評論在讀檔時就依空行切成清單，放在 REVIEWS_KEY 欄。
+"""
+# --- 套件匯入 ---
+import csv
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from handlers.dataset_codec import open_dataset
+
+# 評論依空行切好的清單，放在每筆資料的這個欄位
+REVIEWS_KEY = "評論清單"
+# 值重複很多、以 sys.intern() 共用的欄位
+INTERNED_COLUMNS = ("區域", "美食類型")
+
+def split_reviews(comments: Optional[str]) -> List[str]:
+    """CSV 的「評論」欄（多則以空行分隔）→ 清單；沒有評論時為空清單。"""
+    if not comments:
+        return []
+    return comments.strip().split("\n\n")
+
+# --- 單筆店家資料 ---
+class StoreRecord:
+    """
+    唯讀、類似 dict 的店家資料：record["店名"]、record.get("地址", "")。
+    欄位不存在時 record[欄位] 拋出 KeyError（與 dict 相同）。
+    """
+    __slots__ = ("_columns", "_values")
+
+    def __init__(self, columns: Dict[str, int], values: Sequence[Any]):
+        self._columns = columns
+        self._values = tuple(values)
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._columns[key]]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        index = self._columns.get(key)
+        if index is None:
+            return default
+        value = self._values[index]
+        return default if value is None else value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._columns
+
+    def keys(self):
+        return self._columns.keys()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self._values[index] for key, index in self._columns.items()}
+
+    def __repr__(self) -> str:
+        return f"StoreRecord({self.to_dict()!r})"
+
+# --- 讀取 CSV ---
+def read_store_csv(path: str) -> List[StoreRecord]:
+    """
+    讀取店家 CSV（抓取腳本以 utf-8-sig 輸出，第一欄前有 BOM），回傳依檔案順序的 StoreRecord 清單。
+    gzip / zstd 壓縮檔邊解壓邊解析（handlers/dataset_codec.py）。
+    """
+    with open_dataset(path) as f:
+        return list(iter_store_rows(csv.reader(f)))
+
+def iter_store_rows(rows: Iterator[List[str]]) -> Iterator[StoreRecord]:
+    """第一列為欄位名稱；其餘每列轉成 StoreRecord。"""
+    header = [sys.intern(name.strip()) for name in next(rows, [])]
+    if not header:
+        return
+    columns = {name: index for index, name in enumerate(header)}
+    columns[REVIEWS_KEY] = len(header)
+    width = len(header)
+    name_index = columns.get("店名")
+    review_index = columns.get("評論")
+    interned = [columns[name] for name in INTERNED_COLUMNS if name in columns]
+
+    for row in rows:
+        if not row: # 空白列
+            continue
+        values: List[Any] = [value or None for value in row[:width]]
+        values.extend([None] * (width - len(values)))
+        if name_index is not None:
+            values[name_index] = (values[name_index] or "").strip() # 店名去空白，增進匹配準確度
+        for index in interned:
+            if values[index] is not None:
+                values[index] = sys.intern(values[index])
+        values.append(split_reviews(values[review_index]) if review_index is not None else [])
+        yield StoreRecord(columns, values)
+
+# --- 與快照 (handlers/store_snapshot.py) 互轉 ---
+def to_rows(records: List[StoreRecord]) -> Tuple[List[str], List[tuple]]:
+    """回傳 (依位置排列的欄位名稱, 每筆資料的 tuple)；同一次載入的資料共用欄位對照表。"""
+    if not records:
+        return [], []
+    columns = records[0]._columns
+    return sorted(columns, key=columns.get), [record._values for record in records]
+
+def from_rows(names: Sequence[str], rows: Sequence[Sequence[Any]]) -> List[StoreRecord]:
+    columns = {sys.intern(name): index for index, name in enumerate(names)}
+    return [StoreRecord(columns, row) for row in rows]
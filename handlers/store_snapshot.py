@@ -0,0 +1,98 @@
+# store_snapshot.py
+"""
+店家資料的二進位快照，縮短冷啟動時間：
+- CSV（全部加引號、評論欄跨多行）每次都要逐字解析；快照直接存整理好的 StoreRecord 欄位值，
+  以 marshal 讀回，不必再跑 csv 解析、去空白、切評論。
+- data_loader 第一次從 CSV 載入後寫出快照（fetch_all.py 建回覆包時也會順帶寫出），之後的啟動直接讀快照。
+- 檔頭記錄格式版本、Python/marshal 版本、來源 CSV 的 SHA-256 與 payload 的 CRC32；
+  任何一項不符（格式改版、升級 Python、CSV 已更新、檔案損毀）就視為失效，由呼叫端改讀 CSV。
+
+檔案格式：MAGIC | 檔頭長度 (uint32, big-endian) | 檔頭 JSON | payload
+payload：marshal.dumps((欄位名稱清單, [每筆資料的 tuple, ...]))
+"""
+# --- 套件匯入 ---
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import hashlib
+import marshal
+import tempfile
+from typing import List, Optional, Tuple
+
+from handlers.store_records import StoreRecord, to_rows, from_rows
+
+MAGIC = b"TCSNAPSHOT"
+FORMAT_VERSION = 1
+# marshal 的格式隨 Python 版本變動，版本不同時不讀
+PYTHON_TAG = f"{sys.implementation.cache_tag}/marshal{marshal.version}"
+
+def file_digest(path: str) -> str:
+    """檔案內容的 SHA-256；檔案不存在時回傳空字串。"""
+    if not os.path.exists(path):
+        return ""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# --- 寫入 ---
+def write_snapshot(path: str, records: List[StoreRecord], dataset: str) -> int:
+    """寫出快照並回傳檔案大小；先寫不重複的暫存檔再 os.replace()，讀到的一定是完整的檔案。"""
+    names, rows = to_rows(records)
+    payload = marshal.dumps((names, rows))
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "python": PYTHON_TAG,
+        "dataset": dataset,
+        "rows": len(rows),
+        "crc32": zlib.crc32(payload),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }).encode("utf-8")
+
+    # 每個 worker 都可能在資料更新後重寫快照：各自寫到同目錄下不重複的暫存檔，再以 os.replace() 原子換上
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack(">I", len(header)))
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return len(MAGIC) + 4 + len(header) + len(payload)
+
+# --- 讀取 ---
+def _read_header(f) -> dict:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("不是店家資料快照")
+    (header_length,) = struct.unpack(">I", f.read(4))
+    header = json.loads(f.read(header_length))
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"不支援的快照格式：{header.get('format')}")
+    if header.get("python") != PYTHON_TAG:
+        raise ValueError(f"快照由 {header.get('python')} 建立，目前為 {PYTHON_TAG}")
+    return header
+
+def read_snapshot(path: str, dataset: Optional[str] = None) -> Tuple[List[StoreRecord], dict]:
+    """
+    讀取快照，回傳 (資料, 檔頭)；dataset 不是 None 時要與檔頭記錄的 CSV SHA-256 相同。
+    過期、版本不符或 CRC 錯誤時拋出 ValueError，呼叫端改讀 CSV。
+    """
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        if dataset is not None and header["dataset"] != dataset:
+            raise ValueError("快照與目前的 CSV 不符")
+        payload = f.read()
+    if zlib.crc32(payload) != header["crc32"]:
+        raise ValueError("快照 CRC 檢查失敗")
+    names, rows = marshal.loads(payload)
+    return from_rows(names, rows), header
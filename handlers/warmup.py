@@ -0,0 +1,43 @@
+# warmup.py
+"""
+開機預熱：
+- 先建立靜態 Flex 登錄表 (handlers/flex_registry.py)：歡迎訊息、主選單、三種風格選單、各料理類型的區域輪播，
+  再讀入店家 CSV；背景預熱時靜態回覆不必等資料載入完成。
+- gunicorn 預載模式 (gunicorn.conf.py) 由 master 呼叫，worker fork 後直接共用結果。
+- 其他啟動方式由 main.py 在背景執行緒呼叫。
+- /ready 依 is_ready() 判斷是否已可接收流量。
+"""
+# --- 套件與 Logger 初始化 ---
+import time
+import logging
+import threading
+
+from handlers import flex_registry
+from handlers.data_loader import load_store_data
+# 以下模組在 import 時向登錄表登記各自的靜態訊息
+from handlers import menu_reply, category_reply, region_reply, welcome_flex_message # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+_warm_lock = threading.Lock()
+
+# --- 對外 API ---
+def warm_up() -> None:
+    """載入資料並組好靜態回覆；重複呼叫只會執行一次。"""
+    with _warm_lock:
+        if _ready.is_set():
+            return
+        started = time.perf_counter()
+        count = flex_registry.build() # 靜態回覆先組好，資料載入期間第一～三層就能回覆
+        load_store_data()
+        _ready.set()
+        logger.info("預熱完成：資料已載入、%d 則靜態回覆已建立，耗時 %.1f ms",
+                    count, (time.perf_counter() - started) * 1000)
+
+def start_background_warm_up() -> None:
+    """非預載模式使用：在背景執行緒預熱，不阻塞 import。"""
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+def is_ready() -> bool:
+    return _ready.is_set()
@@ -0,0 +1,38 @@
+# webhook_events.py
+"""
+Webhook 事件的共用工具：
+- main.py (Flask) 與 main_async.py (ASGI) 共用，避免兩個入口各寫一份。
+- 依使用者分組，讓不同使用者平行處理、同一使用者維持順序。
+- 驗章計時。
+"""
+from typing import List, Optional
+
+from linebot.v3.webhook import SignatureValidator
+
+from handlers.metrics import SIGNATURE_SECONDS
+
+# --- 驗章計時 ---
+class TimedSignatureValidator(SignatureValidator):
+    """與 SDK 相同的 HMAC-SHA256 驗章，另外把耗時記到 linebot_signature_verify_seconds。"""
+
+    def validate(self, body, signature):
+        with SIGNATURE_SECONDS.time():
+            return super().validate(body, signature)
+
+# --- 分組 key ---
+def event_owner(event) -> Optional[str]:
+    """事件所屬對象：source.user_id，群組/聊天室沒有 user_id 時改用 group_id / room_id。"""
+    source = getattr(event, "source", None)
+    return (
+        getattr(source, "user_id", None)
+        or getattr(source, "group_id", None)
+        or getattr(source, "room_id", None)
+    )
+
+# --- 依使用者分組 ---
+def partition_events(events) -> List[list]:
+    """依 event_owner() 分組，組內保留 LINE 傳來的原始順序。"""
+    groups = {}
+    for event in events:
+        groups.setdefault(event_owner(event), []).append(event)
+    return list(groups.values())
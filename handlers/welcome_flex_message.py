@@ -3,16 +3,18 @@
 好友加入 Bot 時的歡迎訊息：
 - 建立簡易歡迎 Flex Bubble，提示使用關鍵字「美食推薦」。
 - 由 reply_welcome() 在 FollowEvent 觸發時呼叫。
+- 內容固定，開機時組好一次放進 handlers/flex_registry.py。
 """
 # --- 匯入套件 ---
 from linebot.v3.messaging import MessagingApi
-from linebot.v3.messaging.models import (
-    FlexMessage, ReplyMessageRequest, FlexContainer
-)
 from linebot.v3.webhooks.models import FollowEvent
 
-# --- 定義 get_welcome_flex_message 函式，用於回覆歡迎訊息 ---
-def get_welcome_flex_message() -> dict:
+from handlers import flex_registry
+from handlers.raw_reply import flex_message, send_reply
+from handlers.cold_start import record_first_reply, STATIC
+
+# --- 組歡迎訊息（只在建立登錄表時執行一次）---
+def _build_welcome_message() -> dict:
     bubble = {
         "type": "bubble",
         "body": {
@@ -36,24 +38,22 @@ def get_welcome_flex_message() -> dict:
             ]
         }
     }
-    return FlexMessage(
-        alt_text="歡迎訊息",
-        contents=FlexContainer.from_dict(bubble)
-    )
+    return flex_message("歡迎訊息", bubble)
+
+flex_registry.register("welcome", _build_welcome_message)
+
+# --- 定義 get_welcome_flex_message 函式，用於回覆歡迎訊息 ---
+def get_welcome_flex_message() -> dict:
+    return flex_registry.get("welcome")
 
 # --- 對外 API : reply_welcome ---
 def reply_welcome(event: FollowEvent, messaging_api: MessagingApi) -> None:
     """
     使用者第一次把 Bot 加為好友時的自動回覆。
     FollowEvent 觸發時調用：
-    - 取得 FlexMessage
+    - 取得組好的歡迎訊息
     - 使用 Reply API 回覆
     """
-    flex_msg = get_welcome_flex_message()
-
-    messaging_api.reply_message(
-            ReplyMessageRequest(
-                reply_token=event.reply_token, # 每個事件都有一個唯一的 reply_token，用於回覆該事件
-                messages=[flex_msg] # 回覆的訊息內容，必須是一個訊息物件的list (即使只有一個)
-            )
-        )
\ No newline at end of file
+    # 每個事件都有一個唯一的 reply_token，用於回覆該事件
+    send_reply(messaging_api, event.reply_token, [get_welcome_flex_message()])
+    record_first_reply(STATIC)
\ No newline at end of file
@@ -1,13 +1,14 @@
 # main.py
 # 主程式
 # Flask 與 WebhookHandler 初始化
-# 只在主程式設定 @handler.add() 裝飾器，把事件分派到 dispatcher.py 和 postback_handler.py
+# 只在主程式以 _route() 對照事件型別與處理函式，把事件分派到 dispatcher.py 和 postback_handler.py
 import os
+import time
 import logging # 引入日誌模組，方便除錯與追蹤
+from concurrent.futures import ThreadPoolExecutor # 同一批事件依使用者分組後平行處理
 from flask import Flask, request, abort, jsonify # 建置 webhook 的 HTTP 伺服器
 
 # Line Bot SDK——Messaging API 與 Webhook 驗章/事件
-from linebot.v3.messaging import MessagingApi, Configuration, ApiClient
 from linebot.v3.webhook import WebhookHandler
 from linebot.v3.webhooks.models import (
     MessageEvent, TextMessageContent, PostbackEvent, FollowEvent
@@ -15,25 +16,77 @@ from linebot.v3.webhooks.models import (
 from linebot.v3.exceptions import InvalidSignatureError # 驗證失敗時會用到
 
 # 自訂的設定與各種業務邏輯 handler
-from config import LINE_CHANNEL_SECRET, LINE_CHANNEL_ACCESS_TOKEN
+from config import (
+    LINE_CHANNEL_SECRET, LINE_CHANNEL_ACCESS_TOKEN,
+    WEBHOOK_ASYNC, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE,
+    WEBHOOK_ENQUEUE_TIMEOUT, WEBHOOK_DRAIN_TIMEOUT, WEBHOOK_BATCH_WORKERS, WEBHOOK_FAST_PATH,
+    EVENT_DEDUP_TTL, EVENT_DEDUP_MAX_ENTRIES, EVENT_DEDUP_DB, log_stats, LazyLogArg,
+    LINE_API_POOL_SIZE, LINE_API_CONNECT_TIMEOUT, LINE_API_READ_TIMEOUT, LINE_API_WARM_CONNECTIONS, LINE_API_BASE_URL,
+    RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, RATE_LIMIT_MAX_USERS, RATE_LIMIT_MODE,
+    WARMUP_IN_MASTER, DATA_RELOAD_INTERVAL, DATA_RELOAD_REMOTE_INTERVAL
+)
 from handlers.welcome_flex_message import reply_welcome # 首次加入好友歡迎訊息
-from handlers.dispatcher import dispatch_event # 文字訊息總調度
+from handlers.dispatcher import dispatch_event, router # 文字訊息總調度與路由表
 from handlers.postback_handler import handle_postback_event # postback 事件處理
+from handlers.event_queue import EventWorkerPool, install_drain_hooks # 背景工作池
+from handlers.event_dedup import EventDeduplicator # 重送事件去重
+from handlers.webhook_events import partition_events, event_owner, TimedSignatureValidator # 依使用者分組、驗章計時
+from handlers.rate_limiter import UserRateLimiter, reply_throttled # 每位使用者的頻率限制
+from handlers.warmup import is_ready, start_background_warm_up # 開機預熱與 readiness
+from handlers.deadline import is_expired, deadline_stats # 回覆期限
+from handlers.line_api_client import create_api_client, InstrumentedMessagingApi # 共用連線池
+from handlers import metrics # Prometheus 指標
+from handlers.fast_webhook import FastWebhookParser # 快速解析路徑
+from handlers.restaurant_carousel_reply import carousel_cache # 店家輪播快取
+from handlers.data_loader import dataset_stats # 店家資料版本與重新載入統計
+from handlers.data_reloader import start_reloader # 背景重新載入店家資料
+from handlers import cold_start # 冷啟動的第一則回覆時間
 
 logger = logging.getLogger(__name__)
 
 # --- Flask 與 WebhookHandler 初始化 ---
 app = Flask(__name__) # 建立 Flask 應用，供 LINE Webhook 呼叫
 handler = WebhookHandler(LINE_CHANNEL_SECRET)
-# WebhookHandler 會驗證 X-Line-Signature，確保請求真正來自 LINE 平台
+# WebhookHandler 會驗證 X-Line-Signature，確保請求真正來自 LINE 平台；換成會計時的驗章器
+handler.parser.signature_validator = TimedSignatureValidator(LINE_CHANNEL_SECRET)
+# WEBHOOK_FAST_PATH=True 時改用快速解析：對原始 bytes 驗章，常見事件不經 pydantic 驗證
+fast_parser = FastWebhookParser(LINE_CHANNEL_SECRET or "")
 
 # --- 建立 LINE Messaging API 用戶端 ---
-configuration = Configuration(access_token=LINE_CHANNEL_ACCESS_TOKEN)
-# 建立 Configuration 實例
+# ApiClient 用於發送 HTTP 請求到 LINE API；連線池大小由 LINE_API_POOL_SIZE 決定
+api_client = create_api_client(LINE_CHANNEL_ACCESS_TOKEN, LINE_API_POOL_SIZE, LINE_API_BASE_URL)
+
+# --- 建立 MessagingApi 實例 ---
+# 提供 reply_message / push_message 等方法；reply_message 會帶上明確逾時並統計延遲
+messaging_api = InstrumentedMessagingApi(
+    api_client, LINE_API_POOL_SIZE, (LINE_API_CONNECT_TIMEOUT, LINE_API_READ_TIMEOUT)
+)
+if not WARMUP_IN_MASTER:
+    # 預載模式下 TLS 連線改由 gunicorn.conf.py 的 post_fork 在各 worker 建立，避免 fork 後共用 socket
+    messaging_api.warm_up(LINE_API_WARM_CONNECTIONS) # 背景預先建立 TLS 連線
+
+# --- 背景工作池 (WEBHOOK_ASYNC=True 時啟用) ---
+# 驗章後事件進佇列、立即回 200；由背景執行緒呼叫 process_event()
+event_pool = EventWorkerPool(WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, WEBHOOK_ENQUEUE_TIMEOUT)
+if WEBHOOK_ASYNC:
+    install_drain_hooks(event_pool, WEBHOOK_DRAIN_TIMEOUT)
+
+# --- 重送事件去重 ---
+event_dedup = EventDeduplicator(EVENT_DEDUP_TTL, EVENT_DEDUP_MAX_ENTRIES, EVENT_DEDUP_DB)
 
-# --- 建立 ApiClient 和 MessagingApi 實例 ---
-api_client = ApiClient(configuration) # ApiClient 用於發送 HTTP 請求到 LINE API
-messaging_api = MessagingApi(api_client) # 提供 reply_message / push_message 等方法
+# --- 每位使用者的頻率限制 ---
+rate_limiter = UserRateLimiter(RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, RATE_LIMIT_MAX_USERS)
+
+# --- 開機預熱 ---
+# gunicorn 預載模式由 master 預熱 (gunicorn.conf.py)；其他啟動方式在背景執行緒預熱
+# 背景重新載入的執行緒不會跟著 fork，預載模式改由 post_fork 在各 worker 啟動
+if not WARMUP_IN_MASTER:
+    start_background_warm_up()
+    start_reloader(DATA_RELOAD_INTERVAL, DATA_RELOAD_REMOTE_INTERVAL)
+
+# --- 批次事件執行緒池 ---
+# 一次 webhook 可能帶多位使用者的事件：不同使用者平行處理，同一使用者維持原順序
+batch_executor = ThreadPoolExecutor(max_workers=WEBHOOK_BATCH_WORKERS, thread_name_prefix="webhook-batch")
 
 # --- Webhook 入口 ---
 @app.route("/callback", methods=['POST'])
@@ -42,32 +95,91 @@ def callback():
     LINE 平台會把所有事件 (文字、貼圖、追蹤、退追蹤 …) 以 POST 請求的形式傳送到 /callback 端點。
 
     1. 先抓 `X-Line-Signature` 進行「防偽」驗證
-    2. 驗證通過後交給 `handler.handle()` 解析 JSON 並分派到對應的 `handler.add` 裝飾器 (FollowEvent / MessageEvent / PostbackEvent …)。
+    2. 驗證通過後解析 JSON，依使用者分組，再依 `_route()` 分派到對應的處理函式 (FollowEvent / MessageEvent / PostbackEvent …)。
+    3. WEBHOOK_ASYNC=True 時每組事件放進背景佇列後立即回 200；佇列滿時退回同步處理。
     """
     # 取得 LINE 傳來的 X-Line-Signature HTTP Header，用於驗證訊息來源
     signature = request.headers.get('X-Line-Signature')
 
     # 取得請求的原始 request body 內容 (JSON 格式的事件數據)
-    body = request.get_data(as_text=True)
-    logger.info("[Webhook 收到訊息] body= %s", body)
+    body = request.get_data()
+    # 過長的 body 由 config.setup_logging 的 formatter 截斷；decode 只在真的輸出時才做
+    logger.info("[Webhook 收到訊息] body= %s", LazyLogArg(lambda: body.decode("utf-8", "replace")))
 
+    started = time.perf_counter()
     try:
-        # 使用 handler 處理收到的 body 和 signature
-        # 解析訊息事件: handler.handle() 會解析 JSON 格式的訊息內容，並觸發對應的事件處理函式
-        handler.handle(body, signature)
+        # 驗章 + 解析：簽章錯誤時 parse() 會拋出 InvalidSignatureError
+        if WEBHOOK_FAST_PATH:
+            events = fast_parser.parse(body, signature)
+        else:
+            events = handler.parser.parse(body.decode("utf-8"), signature, as_payload=True).events
+
+        if WEBHOOK_ASYNC:
+            # 每位使用者的事件為一組交給背景工作池，佇列滿時由本執行緒直接處理（背壓）
+            for group in partition_events(events):
+                if not event_pool.submit(process_events, group):
+                    process_events(group)
+        else:
+            dispatch_batch(events)
     except InvalidSignatureError:
         logger.warning("LINE 簽名無效 - 請求被拒絕")
+        metrics.WEBHOOK_REQUESTS.inc("invalid_signature")
         # 如果簽章無效，表示訊息可能不是來自 LINE 平台或被篡改，返回 400 錯誤
         abort(400)
     except Exception as e:
         # 處理其他可能發生的異常，例如處理邏輯中的錯誤
         logger.error("[處理時發生錯誤] %s", e, exc_info=True)
+        metrics.WEBHOOK_REQUESTS.inc("error")
         abort(500) # 返回 500 錯誤表示請求處理失敗
+    finally:
+        metrics.WEBHOOK_SECONDS.observe(time.perf_counter() - started, "async" if WEBHOOK_ASYNC else "sync")
 
+    metrics.WEBHOOK_REQUESTS.inc("ok")
     return jsonify({"status": "ok"}) # 200 OK 回應，告訴 LINE 已成功接收
 
+# --- 單一事件分派 (背景工作池使用) ---
+def process_event(event) -> None:
+    """
+    依事件型別找出 _route() 對應的處理函式並執行；沒有對應的事件型別（貼圖、退追蹤 …）直接略過。
+    已處理過的 webhookEventId（LINE 重送）直接略過。
+    """
+    event_id = getattr(event, "webhook_event_id", None)
+    if event_dedup.seen(event_id):
+        logger.info("略過重送事件 %s", event_id)
+        return
+
+    func = _route(event)
+    if func is None:
+        logger.debug("沒有對應 %s 的處理函式，略過", type(event).__name__)
+        return
+    if is_expired(event, func.__name__):
+        return # 在佇列中等太久，reply token 已失效
+    func(event)
+
+# 依序處理同一位使用者的事件；單一事件出錯不影響後面的事件
+def process_events(events) -> None:
+    for event in events:
+        try:
+            process_event(event)
+        except Exception:
+            logger.exception("處理 %s 事件時出錯", type(event).__name__)
+
+# --- 批次分派：不同使用者平行、同一使用者依序 ---
+def dispatch_batch(events) -> None:
+    started = time.perf_counter()
+    groups = partition_events(events)
+    if len(groups) <= 1:
+        for group in groups:
+            process_events(group)
+    else:
+        # list() 會等待所有分組完成，確保回 200 前事件都已處理
+        list(batch_executor.map(process_events, groups))
+    logger.info(
+        "[Webhook 批次] %d 筆事件 / %d 組，耗時 %.1f ms",
+        len(events), len(groups), (time.perf_counter() - started) * 1000
+    )
+
 # --- FollowEvent：使用者把 Bot 加為好友 ---
-@handler.add(FollowEvent)
 def handle_follow(event: FollowEvent):
     """
     使用者第一次「加好友」或「解除封鎖後重新開啟」會觸發。
@@ -79,30 +191,79 @@ def handle_follow(event: FollowEvent):
     reply_welcome(event, messaging_api)
 
 # --- 文字訊息 (MessageEvent + Text) → 交給 dispatcher.py 分流 ---
-@handler.add(MessageEvent, message=TextMessageContent)
 def handle_message(event):
     """
     任何文字訊息都走這裡，再交由 dispatcher.py 決定要回覆哪一個事件。
     分層好處： main.py 只負責「收→丟」，商業邏輯集中在 dispatcher.py。
+    超過每位使用者的頻率限制時，不進 dispatcher。
     """
+    if not rate_limiter.allow(event_owner(event)):
+        reply_throttled(event, messaging_api, RATE_LIMIT_MODE)
+        return
     try:
         dispatch_event(event, messaging_api)
     except Exception:
         logger.exception("調度程序處理事件時出錯")
 
 # --- Postback 事件 : 不會模擬使用者輸入 ---
-@handler.add(PostbackEvent)
 def on_postback(event):
     """
     任何 postback data (action=xxx&...) 都進來這裡，再交給 postback_handler.py 去解析 data 字串做事情。
+    與文字訊息共用同一個頻率限制。
     """
+    if not rate_limiter.allow(event_owner(event)):
+        reply_throttled(event, messaging_api, RATE_LIMIT_MODE)
+        return
     handle_postback_event(event, messaging_api)
 
+# --- 事件型別 → 處理函式（與 main_async._route() 相同）---
+def _route(event):
+    if isinstance(event, MessageEvent):
+        if isinstance(event.message, TextMessageContent):
+            return handle_message
+        return None
+    if isinstance(event, PostbackEvent):
+        return on_postback
+    if isinstance(event, FollowEvent):
+        return handle_follow
+    return None
+
 # 健康檢查：確認伺服器是否正常啟動並回應
 @app.route("/", methods=["GET"])
 def index():
     return "LINE Bot is running.", 200
 
+# 就緒檢查：資料載入與靜態回覆預熱完成前回 503，部署平台不會把流量導進來
+@app.route("/ready", methods=["GET"])
+def ready():
+    if not is_ready():
+        return jsonify({"status": "warming up"}), 503
+    return jsonify({"status": "ready"}), 200
+
+# 執行狀態：背景佇列深度、溢位次數等計數器
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify(collect_stats())
+
+# Prometheus 格式的指標：各層延遲直方圖，加上 /stats 的數值
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return metrics.render(collect_stats()), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+def collect_stats() -> dict:
+    return {
+        "webhook_queue": event_pool.stats(),
+        "event_dedup": event_dedup.stats(),
+        "logging": log_stats(),
+        "line_api": messaging_api.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "reply_deadline": deadline_stats(),
+        "carousel_cache": carousel_cache.stats(),
+        "routes": router.stats(),
+        "dataset": dataset_stats(),
+        "cold_start": cold_start.stats(),
+    }
+
 # --- 應用程式啟動點 (僅在直接執行 python main.py 時啟動) ---
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))  # 雲端會自動給 PORT
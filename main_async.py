@@ -0,0 +1,278 @@
+# main_async.py
+# 非同步主程式 (ASGI)
+# 與 main.py 共用 handlers/ 的業務邏輯，差別在於 webhook 接收與 reply_message 都走 asyncio：
+# reply 呼叫等待 LINE API 回應時不佔用 OS 執行緒，一個 worker 可同時有上百個呼叫在進行中。
+# 啟動方式：uvicorn main_async:app --host 0.0.0.0 --port $PORT
+import os
+import time
+import json
+import asyncio
+import logging
+
+# Line Bot SDK——非同步 Messaging API 與 Webhook 驗章/事件
+from linebot.v3.messaging import AsyncApiClient, AsyncMessagingApi, Configuration
+from linebot.v3.webhook import WebhookParser
+from linebot.v3.webhooks.models import (
+    MessageEvent, TextMessageContent, PostbackEvent, FollowEvent
+)
+from linebot.v3.exceptions import InvalidSignatureError
+from linebot.v3.messaging.exceptions import ApiException
+from linebot.v3.messaging.async_rest import RESTResponse as AsyncRESTResponse
+
+# 自訂的設定與各種業務邏輯 handler（與 main.py 相同）
+from config import (
+    LINE_CHANNEL_SECRET, LINE_CHANNEL_ACCESS_TOKEN,
+    EVENT_DEDUP_TTL, EVENT_DEDUP_MAX_ENTRIES, EVENT_DEDUP_DB, log_stats, LazyLogArg,
+    ASYNC_API_MAX_CONNECTIONS, WEBHOOK_FAST_PATH, LINE_API_BASE_URL,
+    RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, RATE_LIMIT_MAX_USERS, RATE_LIMIT_MODE,
+    DATA_RELOAD_INTERVAL, DATA_RELOAD_REMOTE_INTERVAL
+)
+from handlers.welcome_flex_message import reply_welcome
+from handlers.dispatcher import dispatch_event, router
+from handlers.postback_handler import handle_postback_event
+from handlers.event_dedup import EventDeduplicator
+from handlers.webhook_events import partition_events, event_owner, TimedSignatureValidator
+from handlers.rate_limiter import UserRateLimiter, reply_throttled
+from handlers.deadline import is_expired, deadline_stats
+from handlers import metrics
+from handlers.fast_webhook import FastWebhookParser
+from handlers.restaurant_carousel_reply import carousel_cache
+from handlers.data_loader import dataset_stats
+from handlers.data_reloader import start_reloader
+from handlers.warmup import start_background_warm_up
+from handlers import cold_start
+
+logger = logging.getLogger(__name__)
+
+parser = WebhookParser(LINE_CHANNEL_SECRET) # 只負責驗章與解析，分派由本檔處理
+parser.signature_validator = TimedSignatureValidator(LINE_CHANNEL_SECRET)
+fast_parser = FastWebhookParser(LINE_CHANNEL_SECRET or "") # WEBHOOK_FAST_PATH=True 時使用
+event_dedup = EventDeduplicator(EVENT_DEDUP_TTL, EVENT_DEDUP_MAX_ENTRIES, EVENT_DEDUP_DB)
+rate_limiter = UserRateLimiter(RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, RATE_LIMIT_MAX_USERS)
+
+# --- 非同步 Messaging API 用戶端 ---
+# AsyncApiClient 內部會建立 aiohttp ClientSession，必須在事件迴圈啟動後才建立
+_api_client = None
+_messaging_api = None
+
+def get_messaging_api() -> AsyncMessagingApi:
+    global _api_client, _messaging_api
+    if _messaging_api is None:
+        configuration = Configuration(access_token=LINE_CHANNEL_ACCESS_TOKEN, host=LINE_API_BASE_URL or None)
+        configuration.connection_pool_maxsize = ASYNC_API_MAX_CONNECTIONS
+        _api_client = AsyncApiClient(configuration)
+        _messaging_api = AsyncMessagingApi(_api_client)
+    return _messaging_api
+
+# 背景處理中的 task；保留參考避免被 GC，關閉時等待它們完成
+_pending_tasks = set()
+_stats = {"events": 0, "replies": 0, "reply_errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+# --- 回覆收集器 ---
+class _ReplyCollector:
+    """
+    傳給既有 handler 的 messaging_api 替身：
+    handler 照常呼叫 reply_message() / reply_raw()，這裡只收下 ReplyMessageRequest 或序列化好的 bytes，
+    真正送出交給事件迴圈 await。
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def reply_message(self, reply_message_request, *args, **kwargs):
+        self.requests.append(reply_message_request)
+
+    def reply_raw(self, body: bytes):
+        self.requests.append(body)
+
+async def _post_reply(body: bytes) -> None:
+    """以共用的 aiohttp session 送出預先序列化的 reply body；非 2xx 時拋出 ApiException。"""
+    get_messaging_api()
+    url = (_api_client.configuration.host or _messaging_api.line_base_path) + "/v2/bot/message/reply"
+    headers = dict(_api_client.default_headers)
+    headers["Content-Type"] = "application/json"
+    async with _api_client.rest_client.pool_manager.post(url, data=body, headers=headers) as response:
+        data = await response.read()
+        if not 200 <= response.status <= 299:
+            raise ApiException(http_resp=AsyncRESTResponse(response, data))
+
+# --- 事件型別 → 既有的同步 handler ---
+def _route(event):
+    if isinstance(event, MessageEvent):
+        if isinstance(event.message, TextMessageContent):
+            return dispatch_event
+        return None
+    if isinstance(event, PostbackEvent):
+        return handle_postback_event
+    if isinstance(event, FollowEvent):
+        return reply_welcome
+    return None
+
+async def process_event(event) -> None:
+    """組回覆（在執行緒中跑既有 handler，避免讀檔與組訊息阻塞事件迴圈）→ 非同步送出。"""
+    event_id = getattr(event, "webhook_event_id", None)
+    if event_dedup.seen(event_id):
+        logger.info("略過重送事件 %s", event_id)
+        return
+
+    func = _route(event)
+    if func is None:
+        logger.debug("沒有對應 %s 的處理函式，略過", type(event).__name__)
+        return
+
+    if is_expired(event, func.__name__):
+        return # reply token 已失效
+
+    _stats["events"] += 1
+    collector = _ReplyCollector()
+    if func is not reply_welcome and not rate_limiter.allow(event_owner(event)):
+        reply_throttled(event, collector, RATE_LIMIT_MODE) # 超過頻率限制：不進 handler
+    else:
+        await asyncio.to_thread(func, event, collector)
+
+    api = get_messaging_api()
+    if collector.requests and is_expired(event, func.__name__):
+        return # 組回覆花太久，token 已失效
+    for reply_request in collector.requests:
+        _stats["in_flight"] += 1
+        _stats["max_in_flight"] = max(_stats["max_in_flight"], _stats["in_flight"])
+        started = time.perf_counter()
+        result = "ok"
+        try:
+            if isinstance(reply_request, bytes):
+                await _post_reply(reply_request)
+            else:
+                await api.reply_message(reply_request)
+            _stats["replies"] += 1
+        except Exception:
+            result = "error"
+            _stats["reply_errors"] += 1
+            logger.exception("非同步 reply_message 失敗")
+        finally:
+            _stats["in_flight"] -= 1
+            metrics.REPLY_SECONDS.observe(time.perf_counter() - started, result)
+
+# 依序處理同一位使用者的事件；單一事件出錯不影響後面的事件
+async def process_events(events) -> None:
+    for event in events:
+        try:
+            await process_event(event)
+        except Exception:
+            logger.exception("處理 %s 事件時出錯", type(event).__name__)
+
+async def dispatch_batch(events) -> None:
+    """不同使用者平行、同一使用者依序，完成後記錄整批耗時。"""
+    started = time.perf_counter()
+    groups = partition_events(events)
+    await asyncio.gather(*(process_events(group) for group in groups))
+    logger.info(
+        "[Webhook 批次] %d 筆事件 / %d 組，耗時 %.1f ms",
+        len(events), len(groups), (time.perf_counter() - started) * 1000
+    )
+
+# --- Webhook 入口 ---
+async def callback(body: bytes, signature: str):
+    """
+    驗章與解析在請求中完成（簽章錯誤回 400），
+    事件處理排成背景 task 後立即回 200，LINE 不必等 reply_message 完成。
+    """
+    started = time.perf_counter()
+    logger.info("[Webhook 收到訊息] body= %s", LazyLogArg(lambda: body.decode("utf-8", "replace")))
+    try:
+        if WEBHOOK_FAST_PATH:
+            events = fast_parser.parse(body, signature)
+        else:
+            events = parser.parse(body.decode("utf-8"), signature, as_payload=True).events
+    except InvalidSignatureError:
+        logger.warning("LINE 簽名無效 - 請求被拒絕")
+        metrics.WEBHOOK_REQUESTS.inc("invalid_signature")
+        return 400, {"status": "invalid signature"}
+    except Exception as e:
+        logger.error("[處理時發生錯誤] %s", e, exc_info=True)
+        metrics.WEBHOOK_REQUESTS.inc("error")
+        return 500, {"status": "error"}
+    finally:
+        metrics.WEBHOOK_SECONDS.observe(time.perf_counter() - started, "asgi")
+
+    metrics.WEBHOOK_REQUESTS.inc("ok")
+    task = asyncio.create_task(dispatch_batch(events))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+    return 200, {"status": "ok"}
+
+def stats() -> dict:
+    return {
+        "async_dispatch": dict(_stats, pending_batches=len(_pending_tasks)),
+        "event_dedup": event_dedup.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "reply_deadline": deadline_stats(),
+        "logging": log_stats(),
+        "carousel_cache": carousel_cache.stats(),
+        "routes": router.stats(),
+        "dataset": dataset_stats(),
+        "cold_start": cold_start.stats(),
+    }
+
+# --- ASGI 介面 ---
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+async def _respond(send, status: int, body, content_type: str = "application/json") -> None:
+    if not isinstance(body, bytes):
+        body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            get_messaging_api() # 在事件迴圈內建立連線池
+            start_background_warm_up() # 靜態回覆先組好、店家資料在背景載入，不延後開始接收請求
+            start_reloader(DATA_RELOAD_INTERVAL, DATA_RELOAD_REMOTE_INTERVAL) # 背景檢查店家資料是否更新
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            # 先等背景中的事件處理完，再關閉 aiohttp session
+            if _pending_tasks:
+                await asyncio.wait(set(_pending_tasks), timeout=10)
+            if _api_client is not None:
+                await _api_client.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    """最小化的 ASGI app：/callback、/（健康檢查）、/stats、/metrics。"""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    path, method = scope["path"], scope["method"]
+    if path == "/callback" and method == "POST":
+        headers = dict(scope["headers"])
+        signature = headers.get(b"x-line-signature", b"").decode()
+        status, payload = await callback(await _read_body(receive), signature)
+        await _respond(send, status, payload)
+    elif path == "/" and method in ("GET", "HEAD"):
+        await _respond(send, 200, "LINE Bot is running.".encode("utf-8"), "text/plain; charset=utf-8")
+    elif path == "/stats" and method == "GET":
+        await _respond(send, 200, stats())
+    elif path == "/metrics" and method == "GET":
+        await _respond(send, 200, metrics.render(stats()).encode("utf-8"), metrics.CONTENT_TYPE)
+    else:
+        await _respond(send, 404, {"status": "not found"})
+
+# --- 應用程式啟動點 (僅在直接執行 python main_async.py 時啟動) ---
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 5000)))
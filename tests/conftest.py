@@ -0,0 +1,12 @@
+# conftest.py
+"""
+測試共用設定：把專案根目錄加入 sys.path，並提供假的 LINE 憑證讓 config 可以匯入。
+WARMUP_IN_MASTER=true：匯入 main 時不啟動背景預熱與重新載入，測試不會連到 LINE API，也不會在背景改動店家資料。
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LINE_CHANNEL_SECRET", "test-secret")
+os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "test-token")
+os.environ.setdefault("WARMUP_IN_MASTER", "true")
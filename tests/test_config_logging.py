@@ -0,0 +1,25 @@
+# test_config_logging.py
+"""config 的日誌 QueueListener：已停止的 listener 在 flush_logs() 或行程結束時不會再被 stop() 一次。"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_exit_after_listener_already_stopped():
+    script = (
+        "import logging, config\n"
+        "logging.getLogger('t').warning('before stop')\n"
+        "config._stop_log_listener()\n" # 例如 fork hook 或 flush_logs() 已先停掉
+        "config._stop_log_listener()\n"
+        "config.flush_logs()\n"
+        "config._stop_log_listener()\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=dict(os.environ),
+        capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Error in atexit" not in result.stderr
+    assert "Traceback" not in result.stderr
+    assert "before stop" in result.stdout
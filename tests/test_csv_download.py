@@ -0,0 +1,92 @@
+# test_csv_download.py
+"""handlers/csv_download.py：以 127.0.0.1 上的 http.server 當作雲端，驗證條件請求與下載失敗時不動到本地檔案。"""
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from handlers.csv_download import DownloadError, download_file
+
+BODY = "\ufeff\"店名\",\"評論\"\n\"測試店\",\"好吃\"\n".encode("utf-8") * 50
+ETAG = '"v1"'
+
+class _Handler(BaseHTTPRequestHandler):
+    mode = "ok" # ok / truncate
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        type(self).requests_seen.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", "Sat, 17 Oct 2026 00:00:00 GMT")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        if type(self).mode == "truncate":
+            self.wfile.write(BODY[:len(BODY) // 2]) # 宣告完整長度，只送一半就斷線
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(BODY)
+
+@pytest.fixture
+def server():
+    _Handler.mode = "ok"
+    _Handler.requests_seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}/stores.csv"
+    httpd.shutdown()
+    httpd.server_close()
+
+def _leftovers(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith((".part", ".tmp")))
+
+def test_second_fetch_is_conditional_and_not_modified(server, tmp_path):
+    path = str(tmp_path / "stores.csv")
+
+    assert download_file(server, path) is True
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+    assert _leftovers(tmp_path) == []
+
+    assert download_file(server, path) is False # 304：本地檔案已是最新
+    assert _Handler.requests_seen[-1].get("If-None-Match") == ETAG
+    assert _Handler.requests_seen[-1].get("If-Modified-Since")
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+
+def test_truncated_body_keeps_existing_csv(server, tmp_path):
+    path = tmp_path / "stores.csv"
+    path.write_bytes(b"old data")
+    _Handler.mode = "truncate"
+
+    with pytest.raises((DownloadError, requests.RequestException)):
+        download_file(server, str(path))
+
+    assert path.read_bytes() == b"old data"
+    assert _leftovers(tmp_path) == []
+
+def test_checksum_mismatch_keeps_existing_csv(server, tmp_path):
+    path = tmp_path / "stores.csv"
+    path.write_bytes(b"old data")
+
+    with pytest.raises(DownloadError):
+        download_file(server, str(path), expected_sha256="0" * 64)
+
+    assert path.read_bytes() == b"old data"
+    assert _leftovers(tmp_path) == []
+
+    # 正確的 SHA-256 才會換上
+    assert download_file(server, str(path), expected_sha256=hashlib.sha256(BODY).hexdigest()) is True
+    assert path.read_bytes() == BODY
@@ -0,0 +1,82 @@
+# test_data_loader.py
+"""data_loader 的並行載入：第一次載入只跑一次、載入失敗不會蓋掉已換上的資料。"""
+import csv
+import threading
+
+import pytest
+
+from handlers import data_loader
+from handlers.store_records import read_store_csv
+
+HEADER = ["place_id", "區域", "美食類型", "店名", "營業時間", "地址", "電話", "評論"]
+
+def _write_csv(path, count):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(HEADER)
+        for i in range(count):
+            writer.writerow([f"pid{i}", "北區", "必吃便當", f"店{i}", "", f"地址{i}", "", "好吃\n\n再來"])
+
+@pytest.fixture
+def loader(tmp_path, monkeypatch):
+    """指向暫存目錄的 CSV，且不使用快照、不下載；結束後還原模組狀態。"""
+    csv_path = tmp_path / "stores.csv"
+    monkeypatch.setattr(data_loader, "CSV_FILE_PATH", str(csv_path))
+    monkeypatch.setattr(data_loader, "STORE_SNAPSHOT_PATH", "")
+    monkeypatch.setattr(data_loader, "CSV_DOWNLOAD_URL", "")
+    monkeypatch.setattr(data_loader, "_dataset", None)
+    monkeypatch.setattr(data_loader, "_retry_at", 0.0)
+    monkeypatch.setattr(data_loader, "_retry_delay", 0.0)
+    monkeypatch.setattr(data_loader, "_reload_stats", dict(data_loader._reload_stats, loads=0, load_waits=0, load_failures=0))
+    data_loader._loaded.clear()
+    yield csv_path
+    data_loader._loaded.clear()
+
+def test_concurrent_first_requests_load_once(loader, monkeypatch):
+    _write_csv(loader, 5000)
+    parses = []
+    def counting_read(path):
+        parses.append(path)
+        return read_store_csv(path)
+    monkeypatch.setattr(data_loader, "read_store_csv", counting_read)
+
+    start = threading.Barrier(32)
+    results = []
+    def first_request():
+        start.wait()
+        results.append(len(data_loader.all_store_names()))
+    threads = [threading.Thread(target=first_request) for _ in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(parses) == 1
+    assert results == [5000] * 32
+    assert data_loader.data_version() == 1
+    assert data_loader.dataset_stats()["loads"] == 1
+
+def test_failed_load_keeps_published_dataset(loader):
+    _write_csv(loader, 3)
+    good = data_loader.StoreDataset(read_store_csv(str(loader)), "digest", "csv")
+    data_loader._publish(good)
+
+    # 重試失敗時，背景重新載入剛換上的資料不能被空資料蓋掉
+    data_loader._load_failed()
+
+    assert data_loader._dataset is good
+    assert len(data_loader.all_store_names()) == 3
+
+def test_failed_first_load_publishes_empty_and_retries(loader):
+    data_loader.load_store_data() # CSV 不存在
+    assert data_loader._dataset.source == "empty"
+    assert data_loader.dataset_stats()["load_failures"] == 1
+
+    _write_csv(loader, 2)
+    data_loader._retry_at = 0.0
+    data_loader._start_retry()
+    for thread in threading.enumerate():
+        if thread.name == "store-data-retry":
+            thread.join(5)
+    assert data_loader._dataset.source == "csv"
+    assert len(data_loader.all_store_names()) == 2
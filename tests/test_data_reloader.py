@@ -0,0 +1,44 @@
+# test_data_reloader.py
+"""data_reloader：多個 worker 同時到了重新下載的時間，只有一個真的下載。"""
+import threading
+
+import pytest
+
+from handlers import data_loader
+from handlers.data_reloader import DataReloader
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    """指向暫存目錄的 CSV，download_csv() 只記錄呼叫次數。"""
+    calls = []
+    monkeypatch.setattr(data_loader, "CSV_FILE_PATH", str(tmp_path / "stores.csv"))
+    monkeypatch.setattr(data_loader, "CSV_DOWNLOAD_URL", "http://example.invalid/stores.csv")
+    monkeypatch.setattr(data_loader, "download_csv", lambda: calls.append(1) or True)
+    monkeypatch.setattr(data_loader, "load_store_data", lambda: True)
+    monkeypatch.setattr(data_loader, "reload_store_data", lambda: False)
+    return calls
+
+def test_only_one_worker_downloads_per_interval(downloads):
+    workers = [DataReloader(interval=60, remote_interval=1800) for _ in range(4)]
+    for worker in workers:
+        worker._next_download = 0 # 全部都到了下載時間
+    threads = [threading.Thread(target=worker.check) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(downloads) == 1
+
+    workers[0]._next_download = 0
+    workers[0].check() # 同一個間隔內再輪到：不再下載
+    assert len(downloads) == 1
+
+def test_downloads_again_after_interval(downloads):
+    worker = DataReloader(interval=60, remote_interval=0.01)
+    worker._next_download = 0
+    worker.check()
+    with open(data_loader.CSV_FILE_PATH + ".download.lock", "w") as f:
+        f.write("0") # 上次下載已是很久以前
+    worker._next_download = 0
+    worker.check()
+    assert len(downloads) == 2
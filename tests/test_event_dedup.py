@@ -0,0 +1,44 @@
+# test_event_dedup.py
+"""handlers/event_dedup.py：記憶體層與 SQLite 持久層的去重，以及 SQLite 查詢不佔用記憶體層的鎖。"""
+import threading
+
+from handlers.event_dedup import EventDeduplicator
+
+def test_memory_dedup():
+    dedup = EventDeduplicator(ttl=60, max_entries=10)
+    assert dedup.seen("e1") is False
+    assert dedup.seen("e1") is True
+    assert dedup.seen(None) is False
+    assert dedup.stats()["hits"] == 1
+
+def test_sqlite_dedup_across_instances(tmp_path):
+    db_path = str(tmp_path / "events.db")
+    first = EventDeduplicator(ttl=60, max_entries=10, db_path=db_path)
+    second = EventDeduplicator(ttl=60, max_entries=10, db_path=db_path) # 另一個 worker
+    assert first.seen("e1") is False
+    assert second.seen("e1") is True
+    assert second.stats()["db_hits"] == 1
+
+def test_sqlite_query_runs_outside_lock(tmp_path, monkeypatch):
+    dedup = EventDeduplicator(ttl=60, max_entries=10, db_path=str(tmp_path / "events.db"))
+    entered, release = threading.Event(), threading.Event()
+    original = dedup._seen_in_db
+
+    def slow_seen_in_db(event_id, prune):
+        entered.set()
+        release.wait(5)
+        return original(event_id, prune)
+
+    monkeypatch.setattr(dedup, "_seen_in_db", slow_seen_in_db)
+    results = []
+    worker = threading.Thread(target=lambda: results.append(dedup.seen("e1")))
+    worker.start()
+    assert entered.wait(5)
+    try:
+        # 第一次的 SQLite 查詢還卡著：重送的同一事件仍由記憶體層立即擋下，stats() 也不必等待
+        assert dedup.seen("e1") is True
+        assert dedup.stats()["size"] == 1
+    finally:
+        release.set()
+        worker.join()
+    assert results == [False]
@@ -0,0 +1,39 @@
+# test_fast_webhook.py
+"""handlers/fast_webhook.py：快速解析與 SDK 的 WebhookParser 對同一份 body 回傳相同型別的事件。"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from linebot.v3.webhook import WebhookParser
+
+from handlers.fast_webhook import FastWebhookParser
+
+SECRET = "test-secret"
+
+def _event(event_type, **content):
+    event = {
+        "type": event_type, "mode": "active", "timestamp": int(time.time() * 1000),
+        "source": {"type": "user", "userId": "U1"}, "webhookEventId": f"E{time.time_ns()}",
+        "deliveryContext": {"isRedelivery": False}, "replyToken": "reply-token",
+    }
+    event.update(content)
+    return event
+
+def _signed(events):
+    body = json.dumps({"destination": "D", "events": events}, ensure_ascii=False).encode("utf-8")
+    signature = base64.b64encode(hmac.new(SECRET.encode(), body, hashlib.sha256).digest()).decode()
+    return body, signature
+
+def test_unknown_event_type_matches_sdk():
+    body, signature = _signed([
+        _event("message", message={"type": "text", "id": "1", "text": "美食推薦", "quoteToken": "q"}),
+        _event("brandNewType", brandNew={"value": 1}), # SDK 也不認得的型別
+        _event("postback", postback={"data": "action=share_shop"}),
+        _event("unfollow"),
+    ])
+    fast = FastWebhookParser(SECRET).parse(body, signature)
+    sdk = WebhookParser(SECRET).parse(body.decode("utf-8"), signature)
+    assert [type(event) for event in fast] == [type(event) for event in sdk]
+    assert type(fast[1]).__name__ == "UnknownEvent"
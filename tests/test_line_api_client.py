@@ -0,0 +1,44 @@
+# test_line_api_client.py
+"""handlers/line_api_client.py：連線預熱透過公開的 urlopen() 建立多條連線，並全部歸還連線池。"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from linebot.v3.messaging import ApiClient, Configuration
+
+from handlers.line_api_client import InstrumentedMessagingApi
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive：連線留在 urllib3 的連線池
+    peers = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        type(self).peers.add(self.client_address)
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+@pytest.fixture
+def server():
+    _Handler.peers = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_warm_up_opens_and_returns_connections(server):
+    configuration = Configuration(access_token="test-token", host=server)
+    configuration.connection_pool_maxsize = 4
+    api = InstrumentedMessagingApi(ApiClient(configuration), pool_size=4, timeout=(2.0, 2.0))
+
+    api._warm_up(3)
+
+    assert len(_Handler.peers) == 3
+    pool = api._api_client.rest_client.pool_manager.connection_from_url(server)
+    assert pool.num_connections == 3
+    assert pool.pool.qsize() == 4 # 預熱的連線都已放回，沒有佔住連線池的位置
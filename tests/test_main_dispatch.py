@@ -0,0 +1,41 @@
+# test_main_dispatch.py
+"""main.process_event：依 _route() 的事件型別對照表分派，不支援的事件略過。"""
+import json
+import time
+
+import pytest
+
+import main
+
+def _event(event_type, **content):
+    event = {
+        "type": event_type, "mode": "active", "timestamp": int(time.time() * 1000),
+        "source": {"type": "user", "userId": "U1"}, "webhookEventId": f"E{time.time_ns()}",
+        "deliveryContext": {"isRedelivery": False}, "replyToken": "reply-token",
+    }
+    event.update(content)
+    return event
+
+def _parse(event):
+    body = json.dumps({"destination": "D", "events": [event]}, ensure_ascii=False)
+    return main.handler.parser.parse(body, "", as_payload=True).events[0]
+
+@pytest.fixture
+def called(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main.handler.parser.signature_validator, "validate", lambda body, signature: True)
+    for name in ("handle_message", "on_postback", "handle_follow"):
+        monkeypatch.setattr(main, name, lambda event, name=name: calls.append(name))
+    return calls
+
+@pytest.mark.parametrize("event, expected", [
+    (_event("message", message={"type": "text", "id": "1", "text": "美食推薦", "quoteToken": "q"}), ["handle_message"]),
+    (_event("postback", postback={"data": "action=share_shop"}), ["on_postback"]),
+    (_event("follow", follow={"isUnblocked": False}), ["handle_follow"]),
+    (_event("message", message={"type": "sticker", "id": "2", "packageId": "1", "stickerId": "1",
+                                 "stickerResourceType": "STATIC", "quoteToken": "q"}), []),
+    (_event("unfollow"), []),
+])
+def test_process_event_routes_by_type(called, event, expected):
+    main.process_event(_parse(event))
+    assert called == expected
@@ -0,0 +1,59 @@
+# test_reply_bundle.py
+"""handlers/reply_bundle.py：檔頭的模板版本檢查、重新載入時關閉舊的 mmap、暫存檔不殘留。"""
+import os
+import json
+
+import pytest
+
+from handlers import reply_bundle
+
+ENTRIES = {"美食推薦": b'[{"type":"text","text":"menu"}]', "postback:a": b'[{"type":"text","text":"a"}]'}
+
+@pytest.fixture
+def bundle_env(tmp_path, monkeypatch):
+    """回覆包路徑指到 tmp_path，data_loader 的版本與 digest 由測試控制。"""
+    path = str(tmp_path / "reply_bundle.bin")
+    state = {"version": 1, "digest": "digest-1"}
+    monkeypatch.setattr(reply_bundle, "REPLY_BUNDLE_PATH", path)
+    monkeypatch.setattr(reply_bundle, "_enabled", True)
+    monkeypatch.setattr(reply_bundle, "_bundle", None)
+    monkeypatch.setattr(reply_bundle, "_checked_version", None)
+    monkeypatch.setattr(reply_bundle, "data_version", lambda: state["version"])
+    monkeypatch.setattr(reply_bundle, "dataset_digest", lambda: state["digest"])
+    return path, state
+
+def test_write_and_read_back(bundle_env, tmp_path):
+    path, state = bundle_env
+    assert reply_bundle.write_bundle(path, ENTRIES, state["digest"]) == 2
+    bundle = reply_bundle.get_bundle()
+    assert bundle is not None
+    assert bundle.get("美食推薦") == ENTRIES["美食推薦"]
+    assert bundle.get("postback:b") is None
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+def test_rejects_bundle_built_from_other_templates(bundle_env, monkeypatch):
+    path, state = bundle_env
+    reply_bundle.write_bundle(path, ENTRIES, state["digest"])
+    monkeypatch.setattr(reply_bundle, "_template_version", "templates-changed")
+    assert reply_bundle.get_bundle() is None
+
+def test_rejects_other_format_version(bundle_env):
+    path, state = bundle_env
+    header = json.dumps({"format": 1, "dataset": state["digest"], "index": {}}).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(reply_bundle.MAGIC + len(header).to_bytes(4, "big") + header)
+    assert reply_bundle.get_bundle() is None
+
+def test_reload_closes_previous_mapping(bundle_env):
+    path, state = bundle_env
+    reply_bundle.write_bundle(path, ENTRIES, state["digest"])
+    first = reply_bundle.get_bundle()
+
+    state.update(version=2, digest="digest-2")
+    reply_bundle.write_bundle(path, ENTRIES, state["digest"])
+    second = reply_bundle.get_bundle()
+
+    assert second is not first
+    assert first._mm.closed
+    assert first.get("美食推薦") is None # 仍拿著舊實例的執行緒只會當作沒命中
+    assert second.get("美食推薦") == ENTRIES["美食推薦"]
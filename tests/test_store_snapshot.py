@@ -0,0 +1,33 @@
+# test_store_snapshot.py
+"""handlers/store_snapshot.py：多個 worker 同時重寫快照時，留下的一定是完整可讀的檔案。"""
+import os
+import threading
+
+from handlers.store_records import from_rows
+from handlers.store_snapshot import read_snapshot, write_snapshot
+
+def _records(count, tag):
+    return from_rows(["店名", "評論"], [(f"{tag}-{i}", "好吃" * 50) for i in range(count)])
+
+def test_concurrent_writers_leave_a_valid_snapshot(tmp_path):
+    path = str(tmp_path / "stores.snapshot")
+    errors = []
+
+    def writer(tag):
+        try:
+            for _ in range(20):
+                write_snapshot(path, _records(2000, tag), f"digest-{tag}")
+        except Exception as e: # 失敗時由下面的斷言回報
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(tag,)) for tag in "abcd"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    records, header = read_snapshot(path) # CRC 與內容都要完整
+    assert len(records) == 2000
+    assert header["dataset"] == "digest-" + records[0]["店名"].split("-")[0]
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []